@@ -0,0 +1,160 @@
+"""Checkpoints that let an interrupted audit resume where it stopped.
+
+With checkpointing on, every resource listing appends its pages to a
+gzipped JSON lines file under `<output_dir>/checkpoints/` and saves the
+paginator's NextToken every few pages, and each analyzer's reports are
+kept there once it finishes. Running again on the same output directory
+with `resume=True` (`--resume` on the command line) reads the saved pages
+back, continues every listing from its last saved token and skips the
+analyzers that already finished. Checkpoints are removed once an audit
+completes.
+
+    AWSResourceAuditor(output_dir='aws_audit_big', checkpoint=True).run_audit()
+    # ...interrupted; later:
+    AWSResourceAuditor(output_dir='aws_audit_big', resume=True).run_audit()
+"""
+import gzip
+import json
+import logging
+import os
+import pickle
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from botocore.paginate import TokenEncoder
+
+# Listed pages buffered between saves
+DEFAULT_SAVE_EVERY_PAGES = 10
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    raise TypeError(f"Can't checkpoint {type(value).__name__} values")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and '$datetime' in obj:
+        return datetime.fromisoformat(obj['$datetime'])
+    return obj
+
+
+class AuditCheckpoint:
+    """Pagination state and finished analyzer results for one output directory."""
+
+    def __init__(self, directory: str, resume: bool = False, save_every_pages: int = DEFAULT_SAVE_EVERY_PAGES,
+                 logger: Optional[logging.Logger] = None):
+        self.directory = directory
+        self.resume = resume
+        self.save_every_pages = save_every_pages
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        if not resume:
+            self._clear_files()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f'{key}.{suffix}')
+
+    def _read_state(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key, 'json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_state(self, key: str, state: Dict[str, Any]):
+        # Written aside and renamed, so a crash never leaves a half-written state behind
+        path = self._path(key, 'json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def paginate(self, key: str, paginator, result_key: str, **kwargs) -> Iterator[List[Dict[str, Any]]]:
+        """Yield each page's `result_key` items, saving progress every `save_every_pages` pages.
+
+        When resuming a listing of the same parameters, the saved items come
+        first as one page, then listing continues after the last saved page.
+        """
+        params = json.dumps(kwargs, sort_keys=True, default=_encode)
+        items_path = self._path(key, 'jsonl.gz')
+        state = self._read_state(key) if self.resume else None
+        if state is None or state['params'] != params:
+            state = {'params': params, 'next_token': None, 'items': 0, 'offset': 0, 'complete': False}
+        else:
+            if state['items']:
+                self.logger.info(f"Resuming {key} after {state['items']} checkpointed items")
+                yield self._load_items(items_path, state['items'])
+            if state['complete']:
+                return
+
+        if state['next_token']:
+            kwargs['PaginationConfig'] = {'StartingToken': TokenEncoder().encode({'NextToken': state['next_token']})}
+        with open(items_path, 'r+b' if os.path.exists(items_path) else 'wb') as f:
+            # Anything past the last saved offset was written after the last checkpoint
+            f.truncate(state['offset'])
+            f.seek(state['offset'])
+            buffered: List[Dict[str, Any]] = []
+            pages = 0
+            for page in paginator.paginate(**kwargs):
+                items = page.get(result_key, [])
+                buffered.extend(items)
+                pages += 1
+                yield items
+                next_token = page.get('NextToken')
+                if next_token is None or pages % self.save_every_pages == 0:
+                    self._save_items(key, f, state, buffered, next_token)
+                    buffered = []
+            if buffered or not state['complete']:
+                self._save_items(key, f, state, buffered, None)
+
+    def _save_items(self, key: str, f, state: Dict[str, Any], items: List[Dict[str, Any]],
+                    next_token: Optional[str]):
+        if items:
+            lines = ''.join(json.dumps(item, default=_encode) + '\n' for item in items)
+            # Each save is a complete gzip member, so the file is readable up to any saved offset
+            f.write(gzip.compress(lines.encode('utf-8'), compresslevel=6))
+            f.flush()
+            os.fsync(f.fileno())
+        state.update(next_token=next_token, items=state['items'] + len(items), offset=f.tell(),
+                     complete=next_token is None)
+        self._write_state(key, state)
+
+    @staticmethod
+    def _load_items(path: str, count: int) -> List[Dict[str, Any]]:
+        items = []
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                items.append(json.loads(line, object_hook=_decode))
+                if len(items) == count:
+                    break
+        return items
+
+    def load_results(self, key: str) -> Optional[Dict[str, Any]]:
+        """A finished analyzer's saved reports, when resuming."""
+        if not self.resume:
+            return None
+        try:
+            with open(self._path(key, 'pkl'), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def save_results(self, key: str, results: Dict[str, Any]):
+        path = self._path(key, 'pkl')
+        with self._lock:
+            with open(path + '.tmp', 'wb') as f:
+                pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+
+    def _clear_files(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+
+    def clear(self):
+        """Remove every checkpoint once the audit they belong to has completed."""
+        with self._lock:
+            self._clear_files()
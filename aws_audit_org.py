@@ -0,0 +1,438 @@
+"""Audit every account in an AWS Organization from one machine.
+
+Each account and region is a work item in a local SQLite queue in the
+output directory. Worker processes claim items, assume a role in the
+item's account through STS (one set of credentials per account and
+worker, refreshed before it expires), run the analyzers and write the
+results as a partial under `partials/`. Items are independent, so
+throughput grows with the number of workers until the API rate limits of
+the accounts are reached. Once the queue is drained, the partials are
+merged into per-account reports under `accounts/<account>/` and
+consolidated reports, with `Account` and `Region` columns, plus an
+`account_savings` report ranking accounts by savings.
+
+    python aws_audit_org.py --regions us-east-1 eu-west-1 --workers 8 --price-index ec2_prices.db
+
+Running again on the same `--output-dir` continues an interrupted audit:
+finished items are kept, and items a dead worker had claimed are retried.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import boto3
+from botocore.credentials import CredentialProvider, CredentialResolver, Credentials, RefreshableCredentials
+from botocore.session import get_session
+
+DEFAULT_ROLE_NAME = 'OrganizationAccountAccessRole'
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_ATTEMPTS = 3
+# Lifetime of assumed-role credentials; botocore refreshes them shortly before they expire
+ROLE_SESSION_SECONDS = 3600
+ROLE_SESSION_NAME = 'aws-cost-saver'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work (
+    account_id TEXT NOT NULL,
+    region TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_at TEXT,
+    finished_at TEXT,
+    error TEXT,
+    PRIMARY KEY (account_id, region)
+);
+CREATE INDEX IF NOT EXISTS work_by_status ON work (status);
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class WorkQueue:
+    """SQLite queue of (account, region) work items, safe to share between processes.
+
+    Items move from 'pending' to 'running' when a worker claims them, then to
+    'done', or back to 'pending' on failure until `max_attempts` is reached
+    and they are marked 'failed'.
+    """
+
+    def __init__(self, path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        # Autocommit, so claims can take the write lock up front with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def enqueue(self, items: Iterable[Tuple[str, str]]) -> int:
+        """Add (account, region) items, ignoring ones already queued; returns how many were added."""
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.conn.executemany("INSERT OR IGNORE INTO work (account_id, region) VALUES (?, ?)", items)
+            self.conn.execute('COMMIT')
+            return self.conn.total_changes - before
+
+    def requeue_running(self) -> int:
+        """Put items claimed by workers that are gone back in the queue; call before starting workers."""
+        with self._lock:
+            return self.conn.execute(
+                "UPDATE work SET status = 'pending', worker = NULL WHERE status = 'running'"
+            ).rowcount
+
+    def claim(self, worker: str, prefer_account: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """Take the next pending item, preferring `prefer_account` so its credentials are reused."""
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.conn.execute(
+                    "SELECT account_id, region FROM work WHERE status = 'pending' "
+                    "ORDER BY account_id = ? DESC, rowid LIMIT 1", (prefer_account,)
+                ).fetchone()
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE work SET status = 'running', worker = ?, attempts = attempts + 1, claimed_at = ? "
+                        "WHERE account_id = ? AND region = ?", (worker, _now(), *row)
+                    )
+                self.conn.execute('COMMIT')
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+        return tuple(row) if row is not None else None
+
+    def complete(self, account_id: str, region: str):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE work SET status = 'done', finished_at = ?, error = NULL WHERE account_id = ? AND region = ?",
+                (_now(), account_id, region)
+            )
+
+    def fail(self, account_id: str, region: str, error: str):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE work SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, finished_at = ?, error = ? WHERE account_id = ? AND region = ?",
+                (self.max_attempts, _now(), error, account_id, region)
+            )
+
+    def items(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT account_id, region, status, attempts, error FROM work "
+                "WHERE ? IS NULL OR status = ? ORDER BY account_id, region", (status, status)
+            )
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM work GROUP BY status").fetchall())
+
+    def close(self):
+        self.conn.close()
+
+
+class _ResolvedCredentialProvider(CredentialProvider):
+    """Hands a botocore session credentials that were already resolved, refreshable or not."""
+
+    METHOD = 'resolved'
+    CANONICAL_NAME = 'aws-cost-saver-resolved'
+
+    def __init__(self, credentials: Credentials):
+        super().__init__()
+        self._credentials = credentials
+
+    def load(self) -> Credentials:
+        return self._credentials
+
+
+class CredentialCache:
+    """Sessions in member accounts, assuming `role_name` once per account and refreshing before expiry.
+
+    `home_account` (the account `base_session` belongs to) is audited with
+    `base_session`'s own credentials, since the role usually doesn't exist there.
+    """
+
+    def __init__(self, base_session: boto3.session.Session, role_name: str = DEFAULT_ROLE_NAME,
+                 external_id: Optional[str] = None, home_account: Optional[str] = None):
+        self.base_session = base_session
+        self.role_name = role_name
+        self.external_id = external_id
+        self.home_account = home_account
+        self._sts = base_session.client('sts')
+        self._credentials: Dict[str, RefreshableCredentials] = {}
+        self._lock = threading.Lock()
+        self.assumed = 0
+
+    def _assume_role(self, account_id: str) -> Dict[str, str]:
+        kwargs = {'ExternalId': self.external_id} if self.external_id else {}
+        credentials = self._sts.assume_role(
+            RoleArn=f'arn:aws:iam::{account_id}:role/{self.role_name}', RoleSessionName=ROLE_SESSION_NAME,
+            DurationSeconds=ROLE_SESSION_SECONDS, **kwargs
+        )['Credentials']
+        self.assumed += 1
+        return {
+            'access_key': credentials['AccessKeyId'], 'secret_key': credentials['SecretAccessKey'],
+            'token': credentials['SessionToken'], 'expiry_time': credentials['Expiration'].isoformat()
+        }
+
+    def credentials(self, account_id: str) -> RefreshableCredentials:
+        with self._lock:
+            credentials = self._credentials.get(account_id)
+            if credentials is None:
+                credentials = self._credentials[account_id] = RefreshableCredentials.create_from_metadata(
+                    metadata=self._assume_role(account_id), refresh_using=lambda: self._assume_role(account_id),
+                    method='sts-assume-role'
+                )
+            return credentials
+
+    def session(self, account_id: str, region: str) -> boto3.session.Session:
+        if account_id == self.home_account:
+            credentials = self.base_session.get_credentials()
+        else:
+            credentials = self.credentials(account_id)
+        botocore_session = get_session()
+        # The only provider, so credentials from the environment or config files can't take precedence
+        botocore_session.register_component(
+            'credential_provider', CredentialResolver([_ResolvedCredentialProvider(credentials)])
+        )
+        return boto3.session.Session(botocore_session=botocore_session, region_name=region)
+
+
+def _partial_path(output_dir: str, account_id: str, region: str) -> str:
+    return os.path.join(output_dir, 'partials', f'{account_id}.{region}', 'results.pkl')
+
+
+def _audit_item(config: Dict[str, Any], session: boto3.session.Session, account_id: str, region: str):
+    """Run the analyzers for one account and region and save their results as a partial."""
+    from aws_resource_auditor import AWSResourceAuditor
+
+    path = _partial_path(config['output_dir'], account_id, region)
+    auditor = AWSResourceAuditor(region_name=region, output_dir=os.path.dirname(path), session=session,
+                                 **config['auditor_options'])
+    results = auditor.run_analyzers(max_workers=config['max_workers'], analyzer_timeout=config['analyzer_timeout'],
+                                    save=False, analyzers=config['analyzers'])
+    auditor.metrics.save(auditor.output_dir)
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump({'results': results, 'pricing_fallbacks': auditor.pricing_fallbacks}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+def _worker(config: Dict[str, Any]):
+    """Claim and audit work items until the queue is empty."""
+    from aws_resource_auditor import configure_logging
+
+    configure_logging()
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    queue = WorkQueue(config['queue_path'], config['max_attempts'])
+    session_for = config['session_factory']
+    if session_for is None:
+        base_session = boto3.session.Session(profile_name=config['profile_name'])
+        session_for = CredentialCache(base_session, config['role_name'], config['external_id'],
+                                      config['home_account']).session
+    account_id = None
+    try:
+        while True:
+            item = queue.claim(name, prefer_account=account_id)
+            if item is None:
+                return
+            account_id, region = item
+            logger.info(f"[{account_id}/{region}] Auditing...")
+            try:
+                _audit_item(config, session_for(account_id, region), account_id, region)
+            except Exception as e:
+                logger.error(f"[{account_id}/{region}] Audit failed: {e}")
+                queue.fail(account_id, region, str(e))
+            else:
+                queue.complete(account_id, region)
+    finally:
+        queue.close()
+
+
+class OrgAuditor:
+    """Queue, audit and merge every account and region of an organization."""
+
+    def __init__(self, output_dir: Optional[str] = None, role_name: str = DEFAULT_ROLE_NAME,
+                 external_id: Optional[str] = None, profile_name: Optional[str] = None,
+                 workers: int = DEFAULT_WORKERS, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 auditor_options: Optional[Dict[str, Any]] = None,
+                 session_factory: Optional[Callable[[str, str], boto3.session.Session]] = None):
+        """`auditor_options` are passed to every AWSResourceAuditor (e.g. `price_index`, `output_formats`).
+
+        `session_factory(account_id, region)`, a picklable function, replaces
+        role assumption, e.g. to audit replayed fleets offline.
+        """
+        self.output_dir = output_dir or f"aws_org_audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.role_name = role_name
+        self.external_id = external_id
+        self.profile_name = profile_name
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.auditor_options = auditor_options or {}
+        self.session_factory = session_factory
+        self.queue = WorkQueue(os.path.join(self.output_dir, 'queue.db'), max_attempts)
+        self._session: Optional[boto3.session.Session] = None
+
+    @property
+    def session(self) -> boto3.session.Session:
+        if self._session is None:
+            self._session = boto3.session.Session(profile_name=self.profile_name)
+        return self._session
+
+    def accounts(self) -> List[str]:
+        """IDs of the organization's active accounts."""
+        paginator = self.session.client('organizations').get_paginator('list_accounts')
+        return sorted(account['Id'] for page in paginator.paginate() for account in page['Accounts']
+                      if account['Status'] == 'ACTIVE')
+
+    def enqueue(self, accounts: Optional[List[str]] = None, regions: Optional[List[str]] = None) -> int:
+        """Queue every account (default: the whole organization) in every region (default: all enabled here)."""
+        accounts = accounts or self.accounts()
+        regions = regions or sorted(
+            region['RegionName'] for region in self.session.client('ec2').describe_regions()['Regions']
+        )
+        added = self.queue.enqueue((account, region) for account in accounts for region in regions)
+        logger.info(f"Queued {added} new work items for {len(accounts)} accounts in {len(regions)} regions")
+        return added
+
+    def run_workers(self, analyzers: Optional[List[str]] = None, max_workers: int = 4,
+                    analyzer_timeout: Optional[float] = None):
+        """Drain the queue with `workers` processes, each running `max_workers` analyzers at a time."""
+        requeued = self.queue.requeue_running()
+        if requeued:
+            logger.info(f"Retrying {requeued} work items left running by an earlier run")
+        config = {
+            'queue_path': self.queue.path, 'output_dir': self.output_dir, 'max_attempts': self.max_attempts,
+            'role_name': self.role_name, 'external_id': self.external_id, 'profile_name': self.profile_name,
+            'home_account': None if self.session_factory else self.session.client('sts').get_caller_identity()['Account'],
+            'session_factory': self.session_factory, 'auditor_options': self.auditor_options,
+            'analyzers': analyzers, 'max_workers': max_workers, 'analyzer_timeout': analyzer_timeout,
+        }
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=_worker, args=(config,), name=f'org-worker-{i}')
+                     for i in range(self.workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        logger.info(f"Work items: {self.queue.counts()}")
+
+    def merge(self) -> Dict[str, Any]:
+        """Merge every finished partial into per-account and consolidated reports."""
+        import pandas as pd
+        from aws_resource_auditor import AWSResourceAuditor, CostModel
+
+        by_account: Dict[str, Dict[str, List[pd.DataFrame]]] = {}
+        fallbacks: Dict[str, List[str]] = {}
+        for item in self.queue.items('done'):
+            account_id, region = item['account_id'], item['region']
+            with open(_partial_path(self.output_dir, account_id, region), 'rb') as f:
+                partial = pickle.load(f)
+            fallbacks.setdefault(account_id, []).extend(partial['pricing_fallbacks'])
+            reports = by_account.setdefault(account_id, {})
+            for report_name, df in partial['results'].items():
+                frames = reports.setdefault(report_name, [])
+                if not df.empty:
+                    frames.append(df.assign(Region=region)[['Region'] + list(df.columns)])
+
+        def merger(output_dir: str, pricing_fallbacks: List[str]) -> AWSResourceAuditor:
+            options = {key: self.auditor_options[key] for key in ('output_formats', 'compression', 'markdown_max_rows')
+                       if key in self.auditor_options}
+            auditor = AWSResourceAuditor(output_dir=output_dir, pricing_cache=False, **options)
+            auditor.pricing_fallbacks = sorted(set(pricing_fallbacks))
+            return auditor
+
+        consolidated: Dict[str, List[pd.DataFrame]] = {}
+        savings = []
+        for account_id, reports in sorted(by_account.items()):
+            account_results = {report_name: pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+                               for report_name, frames in reports.items()}
+            auditor = merger(os.path.join(self.output_dir, 'accounts', account_id), fallbacks[account_id])
+            auditor.save_merged_reports(account_results)
+            row = {'Account': account_id}
+            for category, _, monthly_cost in auditor._waste_rows(account_results):
+                row[category] = row.get(category, 0.0) + monthly_cost
+            savings.append(row)
+            for report_name, df in account_results.items():
+                if not df.empty:
+                    consolidated.setdefault(report_name, []).append(
+                        df.assign(Account=account_id)[['Account'] + list(df.columns)]
+                    )
+
+        org_results = {report_name: pd.concat(frames, ignore_index=True)
+                       for report_name, frames in consolidated.items()}
+        for report_name in {name for reports in by_account.values() for name in reports}:
+            org_results.setdefault(report_name, pd.DataFrame())
+        auditor = merger(self.output_dir, [f"{account_id}: {fallback}" for account_id, account_fallbacks
+                                           in fallbacks.items() for fallback in account_fallbacks])
+        auditor.save_merged_reports(org_results)
+
+        savings_df = pd.DataFrame(savings).fillna(0.0) if savings else pd.DataFrame(columns=['Account'])
+        categories = [column for column in savings_df.columns if column != 'Account']
+        savings_df['MonthlySavings'] = savings_df[categories].sum(axis=1)
+        savings_df['YearlySavings'] = CostModel.yearly(savings_df['MonthlySavings'])
+        auditor.save_to_files(savings_df.sort_values('MonthlySavings', ascending=False, ignore_index=True),
+                              'account_savings')
+        failed = self.queue.items('failed')
+        if failed:
+            logger.warning(f"{len(failed)} work items failed; see failed_work_items.csv")
+            auditor.save_to_files(pd.DataFrame(failed), 'failed_work_items')
+        logger.info(f"Merged {len(by_account)} accounts into {self.output_dir}/")
+        return org_results
+
+    def run(self, accounts: Optional[List[str]] = None, regions: Optional[List[str]] = None,
+            analyzers: Optional[List[str]] = None, max_workers: int = 4,
+            analyzer_timeout: Optional[float] = None) -> Dict[str, Any]:
+        self.enqueue(accounts, regions)
+        self.run_workers(analyzers, max_workers, analyzer_timeout)
+        return self.merge()
+
+
+def main(argv: Optional[List[str]] = None):
+    from aws_resource_auditor import AWSResourceAuditor, DEFAULT_OUTPUT_FORMATS, REPORT_WRITERS, configure_logging
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--accounts', nargs='+', metavar='ACCOUNT', help="account IDs (default: every active account)")
+    parser.add_argument('--regions', nargs='+', metavar='REGION', help="regions (default: every enabled region)")
+    parser.add_argument('--role-name', default=DEFAULT_ROLE_NAME, help="role assumed in each account")
+    parser.add_argument('--external-id')
+    parser.add_argument('--profile', help="AWS named profile of the management account")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="worker processes")
+    parser.add_argument('--max-workers', type=int, default=4, help="analyzer threads per worker")
+    parser.add_argument('--analyzer-timeout', type=float)
+    analyzer_names = list(AWSResourceAuditor.ANALYZERS)
+    parser.add_argument('--only', nargs='+', choices=analyzer_names, metavar='ANALYZER')
+    parser.add_argument('--output-dir', help="continue the audit in this directory, or start one there")
+    parser.add_argument('--formats', nargs='+', default=list(DEFAULT_OUTPUT_FORMATS),
+                        choices=list(REPORT_WRITERS) + ['md'])
+    parser.add_argument('--price-index', help="price database built by aws_price_index.py")
+    parser.add_argument('--shard-listings', action='store_true')
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    auditor_options = {'output_formats': args.formats, 'shard_listings': args.shard_listings}
+    if args.price_index:
+        auditor_options['price_index'] = args.price_index
+    OrgAuditor(args.output_dir, role_name=args.role_name, external_id=args.external_id, profile_name=args.profile,
+               workers=args.workers, auditor_options=auditor_options).run(
+        args.accounts, args.regions, args.only, args.max_workers, args.analyzer_timeout
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+"""Record and replay the AWS API responses an audit reads, for offline runs and benchmarks.
+
+Record a live audit once:
+
+    python aws_audit_replay.py record fleet.jsonl.gz --region us-east-1
+
+or generate a synthetic fleet of any size:
+
+    python aws_audit_replay.py synthetic fleet.jsonl.gz --instances 100000 --snapshots 1000000
+
+and audit it with no AWS account:
+
+    replayer = Replayer.load('fleet.jsonl.gz')
+    AWSResourceAuditor(session=replayer.session(), pricing_cache=False).run_audit()
+
+Recordings are gzipped JSON lines, one API response page per line. Replayed
+calls are answered from botocore's before-call hook, the same one Stubber
+uses, so no request is signed or sent, and pages are matched by operation
+and parameters rather than call order, which lets concurrent analyzers
+replay safely.
+"""
+import argparse
+import copy
+import gzip
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import boto3
+from botocore.awsrequest import AWSResponse
+
+# Service name -> operations whose responses are recorded
+RECORDED_OPERATIONS = {
+    'ec2': {'DescribeInstances', 'DescribeVolumes', 'DescribeSnapshots', 'DescribeAddresses', 'DescribeRegions'},
+    'pricing': {'GetProducts'},
+    'cloudwatch': {'GetMetricData'},
+}
+
+# Parameters that change on every run and are ignored when matching a recorded page
+VOLATILE_PARAMS = {'StartTime', 'EndTime'}
+
+# On-demand Linux hourly prices of the synthetic fleet's instance types
+SYNTHETIC_INSTANCE_PRICES = {'t3.micro': 0.0104, 't3.large': 0.0832, 'm5.xlarge': 0.192, 'c5.2xlarge': 0.34, 'r5.large': 0.126}
+
+# Page sizes the EC2 API uses without MaxResults
+SYNTHETIC_PAGE_SIZES = {'DescribeInstances': 1000, 'DescribeVolumes': 500, 'DescribeSnapshots': 1000}
+
+# Synthetic operations that answer ID-prefix filters ('snap-a*'), as sharded listings send:
+# operation -> (result key, ID key, ID filter)
+SYNTHETIC_ID_FILTERS = {
+    'DescribeVolumes': ('Volumes', 'VolumeId', 'volume-id'),
+    'DescribeSnapshots': ('Snapshots', 'SnapshotId', 'snapshot-id'),
+}
+
+_PARAMS_KEY = 'audit_replay_params'
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    raise TypeError(f"Can't record {type(value).__name__} values")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and '$datetime' in obj:
+        return datetime.fromisoformat(obj['$datetime'])
+    return obj
+
+
+def _params_key(params: Optional[Dict[str, Any]]) -> str:
+    stable = {key: value for key, value in params.items() if key not in VOLATILE_PARAMS} if params else params
+    return json.dumps(stable, sort_keys=True, default=_encode)
+
+
+def save_records(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Write recorded or generated response pages to a gzipped JSON lines file."""
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        for record in records:
+            f.write(json.dumps(record, default=_encode))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def load_records(path: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line, object_hook=_decode)
+
+
+def _stash_params(params, context, **kwargs):
+    # The API parameters aren't passed to before-call/after-call, so carry them in the request context
+    context[_PARAMS_KEY] = copy.deepcopy(params)
+
+
+def _attach_handlers(events, before_call=None, after_call=None):
+    for service, operations in RECORDED_OPERATIONS.items():
+        for operation in operations:
+            events.register(f'before-parameter-build.{service}.{operation}', _stash_params)
+            if before_call:
+                events.register(f'before-call.{service}.{operation}', before_call)
+            if after_call:
+                events.register(f'after-call.{service}.{operation}', after_call)
+
+
+class Recorder:
+    """Captures the audit's API responses from a boto3 session or client."""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def attach(self, target):
+        """Record calls from a boto3 Session (clients created afterwards) or an existing client."""
+        events = target.meta.events if hasattr(target, 'meta') else target.events
+        _attach_handlers(events, after_call=self._after_call)
+        return target
+
+    def _after_call(self, http_response, parsed, model, context, **kwargs):
+        if http_response.status_code >= 300:
+            return
+        response = {key: value for key, value in parsed.items() if key != 'ResponseMetadata'}
+        record = {
+            'service': model.service_model.service_name,
+            'operation': model.name,
+            'region': context.get('client_region'),
+            'params': context.get(_PARAMS_KEY),
+            'response': response
+        }
+        with self._lock:
+            self.records.append(record)
+
+    def save(self, path: str) -> int:
+        with self._lock:
+            return save_records(path, self.records)
+
+
+class Replayer:
+    """Serves recorded responses back to boto3 clients, counting every call.
+
+    A page is matched on its exact parameters first. Pages recorded with
+    `params` set to None (as synthetic fleets are) match any call to their
+    operation with the same NextToken, whatever its filters, except that
+    volume and snapshot listings filtered by ID prefix are answered with just
+    the matching items, paged afresh. Unmatched calls fail with a
+    `ReplayMissing` ClientError.
+
+    `latency` seconds are slept on every call, to stand in for the round trip.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]], latency: float = 0.0):
+        self._exact: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._by_token: Dict[Tuple[str, str, Optional[str]], Dict[str, Any]] = {}
+        self.region_name: Optional[str] = None
+        for record in records:
+            service, operation, params = record['service'], record['operation'], record['params']
+            if service == 'ec2' and not self.region_name:
+                self.region_name = record.get('region')
+            if params is None:
+                self._by_token[(service, operation, record.get('next_token'))] = record['response']
+            else:
+                self._exact[(service, operation, _params_key(params))] = record['response']
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.missing: Counter = Counter()
+        self._lock = threading.Lock()
+        # (operation, ID prefix length) -> ID prefix -> synthetic items with that prefix
+        self._id_groups: Dict[Tuple[str, int], Dict[str, List[Dict[str, Any]]]] = {}
+        self._id_groups_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, latency: float = 0.0) -> 'Replayer':
+        return cls(load_records(path), latency)
+
+    def attach(self, target):
+        """Answer calls from a boto3 Session (clients created afterwards) or an existing client."""
+        events = target.meta.events if hasattr(target, 'meta') else target.events
+        _attach_handlers(events, before_call=self._before_call)
+        return target
+
+    def session(self, region_name: Optional[str] = None) -> boto3.session.Session:
+        """A session with dummy credentials whose clients replay this recording."""
+        session = boto3.session.Session(
+            aws_access_key_id='replay', aws_secret_access_key='replay',
+            region_name=region_name or self.region_name or 'us-east-1'
+        )
+        return self.attach(session)
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls.clear()
+            self.missing.clear()
+
+    def _before_call(self, model, context, **kwargs):
+        service, operation = model.service_model.service_name, model.name
+        params = context.get(_PARAMS_KEY) or {}
+        response = self._exact.get((service, operation, _params_key(params)))
+        if response is None and operation in SYNTHETIC_ID_FILTERS:
+            response = self._id_filtered_page(service, operation, params)
+        if response is None:
+            response = self._by_token.get((service, operation, params.get('NextToken')))
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[operation] += 1
+            if response is None:
+                self.missing[operation] += 1
+        if response is None:
+            error = {'Error': {'Code': 'ReplayMissing', 'Message': f"No recorded {operation} response for {params}"}}
+            return AWSResponse(None, 400, {}, None), error
+        return AWSResponse(None, 200, {}, None), response
+
+    def _id_filtered_page(self, service: str, operation: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        result_key, id_key, filter_name = SYNTHETIC_ID_FILTERS[operation]
+        values = [value for f in params.get('Filters', []) if f['Name'] == filter_name for value in f['Values']]
+        if len(values) != 1 or not values[0].endswith('*') or (service, operation, None) not in self._by_token:
+            return None
+        prefix = values[0][:-1]
+        with self._id_groups_lock:
+            groups = self._id_groups.get((operation, len(prefix)))
+            if groups is None:
+                groups = self._id_groups[(operation, len(prefix))] = {}
+                response = self._by_token[(service, operation, None)]
+                while True:
+                    for item in response[result_key]:
+                        groups.setdefault(item[id_key][:len(prefix)], []).append(item)
+                    if 'NextToken' not in response:
+                        break
+                    response = self._by_token[(service, operation, response['NextToken'])]
+        items = groups.get(prefix, [])
+        token = params.get('NextToken')
+        start = int(token.rsplit('-', 1)[1]) if token else 0
+        stop = start + SYNTHETIC_PAGE_SIZES[operation]
+        page = {result_key: items[start:stop]}
+        if stop < len(items):
+            page['NextToken'] = f'{operation}-{prefix}-{stop}'
+        return page
+
+
+def _synthetic_id(prefix: str, n: int) -> str:
+    """A unique 17-hex-digit ID whose leading digits are spread evenly, like real resource IDs."""
+    return f'{prefix}-{n * 0x9E3779B97F4A7C15 % (1 << 68):017x}'
+
+
+def _pages(operation: str, count: int, make_page, region_name: str) -> Iterator[Dict[str, Any]]:
+    """Split `count` items into token-linked pages; `make_page(start, stop)` builds one page's response body."""
+    page_size = SYNTHETIC_PAGE_SIZES[operation]
+    for start in range(0, max(count, 1), page_size):
+        response = make_page(start, min(start + page_size, count))
+        if start + page_size < count:
+            response['NextToken'] = f'{operation}-{start + page_size}'
+        yield {
+            'service': 'ec2', 'operation': operation, 'region': region_name, 'params': None,
+            'next_token': f'{operation}-{start}' if start else None, 'response': response
+        }
+
+
+def _price_item(usagetype: str, usd: float) -> str:
+    return json.dumps({
+        'product': {'attributes': {'usagetype': usagetype}},
+        'terms': {'OnDemand': {'SKU.TERM': {'priceDimensions': {'SKU.TERM.DIM': {'pricePerUnit': {'USD': str(usd)}}}}}}
+    })
+
+
+def synthetic_fleet(instances: int = 100000, snapshots: int = 1000000, region_name: str = 'us-east-1',
+                    seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Generate response pages for a fleet of the given size.
+
+    About a quarter of the instances are stopped, each instance has one or
+    two volumes of mixed types, 5% of volumes are unattached, snapshots are
+    spread over the volumes, and one Elastic IP in four is unassociated.
+    Every GetMetricData batch gets the same answer, in which one resource in
+    five is idle.
+    """
+    from aws_resource_auditor import AWSResourceAuditor, DEFAULT_PRICES
+
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    zones = [f'{region_name}{zone}' for zone in 'abc']
+
+    instance_list, volume_list = [], []
+    for i in range(instances):
+        instance_id = f'i-{i:017x}'
+        launch_time = now - timedelta(seconds=rng.randrange(5 * 365 * 86400))
+        instance = {
+            'InstanceId': instance_id,
+            'InstanceType': rng.choice(sorted(SYNTHETIC_INSTANCE_PRICES)),
+            'LaunchTime': launch_time,
+            'VpcId': f'vpc-{i % 50:017x}',
+            'Placement': {'AvailabilityZone': rng.choice(zones)},
+            'Tags': [{'Key': 'Name', 'Value': f'synthetic-{i}'}],
+        }
+        if rng.random() < 0.25:
+            stop_time = launch_time + (now - launch_time) * rng.random()
+            instance['State'] = {'Code': 80, 'Name': 'stopped'}
+            instance['StateTransitionReason'] = f"User initiated ({stop_time.strftime('%Y-%m-%d %H:%M:%S')} GMT)"
+        else:
+            instance['State'] = {'Code': 16, 'Name': 'running'}
+            instance['StateTransitionReason'] = ''
+        instance_list.append(instance)
+        for _ in range(rng.choice([1, 1, 2])):
+            volume_list.append(instance_id)
+
+    volumes = []
+    for v, instance_id in enumerate(volume_list + [None] * (len(volume_list) // 19)):
+        volume_type = rng.choices(['gp2', 'gp3', 'io1', 'st1'], weights=[50, 40, 5, 5])[0]
+        volume_id = _synthetic_id('vol', v)
+        volume = {
+            'VolumeId': volume_id, 'Size': rng.choice([8, 30, 100, 500, 1000]),
+            'VolumeType': volume_type, 'State': 'in-use' if instance_id else 'available',
+            'AvailabilityZone': rng.choice(zones), 'CreateTime': now - timedelta(days=rng.randrange(1, 1800)),
+            'Attachments': [{'InstanceId': instance_id, 'VolumeId': volume_id, 'State': 'attached',
+                             'Device': '/dev/xvda'}] if instance_id else []
+        }
+        if volume_type == 'io1':
+            volume['Iops'] = rng.choice([1000, 3000, 10000])
+        volumes.append(volume)
+
+    descriptions = ['Created by CreateImage', 'Daily backup', 'Weekly backup', '']
+
+    def snapshot_page(start: int, stop: int) -> Dict[str, Any]:
+        # Generated page by page so a 1M-snapshot fleet is never held in memory at once
+        page = []
+        for s in range(start, stop):
+            volume = volumes[rng.randrange(len(volumes))] if volumes else None
+            page.append({
+                'SnapshotId': _synthetic_id('snap', s), 'VolumeId': volume['VolumeId'] if volume else 'vol-ffffffff',
+                'VolumeSize': volume['Size'] if volume else 8, 'State': 'completed', 'OwnerId': '123456789012',
+                'StartTime': now - timedelta(seconds=rng.randrange(3 * 365 * 86400)),
+                'Description': rng.choice(descriptions)
+            })
+        return {'Snapshots': page}
+
+    addresses = []
+    for a in range(max(instances // 100, 1)):
+        address = {'PublicIp': f'198.51.{a // 256 % 256}.{a % 256}', 'AllocationId': f'eipalloc-{a:017x}',
+                   'Domain': 'vpc'}
+        if rng.random() >= 0.25 and instance_list:
+            address['AssociationId'] = f'eipassoc-{a:017x}'
+            address['InstanceId'] = instance_list[rng.randrange(len(instance_list))]['InstanceId']
+        addresses.append(address)
+
+    def reservation_page(start: int, stop: int) -> Dict[str, Any]:
+        return {'Reservations': [
+            {'ReservationId': f"r-{instance_list[i]['InstanceId'][2:]}", 'Instances': instance_list[i:min(i + 10, stop)]}
+            for i in range(start, stop, 10)
+        ]}
+
+    yield from _pages('DescribeInstances', len(instance_list), reservation_page, region_name)
+    yield from _pages('DescribeVolumes', len(volumes), lambda start, stop: {'Volumes': volumes[start:stop]}, region_name)
+    yield from _pages('DescribeSnapshots', snapshots, snapshot_page, region_name)
+    days = [now.replace(hour=0, minute=0, second=0) - timedelta(days=d) for d in range(14, 0, -1)]
+    metric_data = {'MetricDataResults': [{
+        'Id': f'q{q}', 'Label': f'q{q}', 'StatusCode': 'Complete', 'Timestamps': days,
+        'Values': [0.5 if rng.random() < 0.2 else 40.0] * len(days)
+    } for q in range(500)]}
+
+    for operation, response in (('DescribeAddresses', {'Addresses': addresses}),
+                                ('DescribeRegions', {'Regions': [{'RegionName': region_name}]}),
+                                ('GetMetricData', metric_data)):
+        service = 'cloudwatch' if operation == 'GetMetricData' else 'ec2'
+        yield {'service': service, 'operation': operation, 'region': region_name, 'params': None, 'response': response}
+
+    region_prefix = region_name.split('-')[0].upper()
+    for name, filters in AWSResourceAuditor._pricing_queries(region_name).items():
+        usagetype = f'{region_prefix}-EBS:SnapshotUsage' if name == 'snapshot' else f'{region_prefix}-{name}'
+        yield {
+            'service': 'pricing', 'operation': 'GetProducts',
+            'params': {'ServiceCode': 'AmazonEC2', 'Filters': filters},
+            'response': {'PriceList': [_price_item(usagetype, DEFAULT_PRICES[name])], 'FormatVersion': 'aws_v1'}
+        }
+    for instance_type, usd in SYNTHETIC_INSTANCE_PRICES.items():
+        yield {
+            'service': 'pricing', 'operation': 'GetProducts',
+            'params': {'ServiceCode': 'AmazonEC2',
+                       'Filters': AWSResourceAuditor._instance_pricing_query(region_name, instance_type, 'Linux')},
+            'response': {'PriceList': [_price_item(f'{region_prefix}-BoxUsage:{instance_type}', usd)],
+                         'FormatVersion': 'aws_v1'}
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help="run a live audit and record its API responses")
+    record.add_argument('output')
+    record.add_argument('--region')
+    synthetic = commands.add_parser('synthetic', help="generate a synthetic fleet recording")
+    synthetic.add_argument('output')
+    synthetic.add_argument('--instances', type=int, default=100000)
+    synthetic.add_argument('--snapshots', type=int, default=1000000)
+    synthetic.add_argument('--region', default='us-east-1')
+    synthetic.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'record':
+        from aws_resource_auditor import AWSResourceAuditor
+        recorder = Recorder()
+        session = recorder.attach(boto3.session.Session(region_name=args.region))
+        AWSResourceAuditor(session=session, pricing_cache=False).run_audit()
+        count = recorder.save(args.output)
+    else:
+        count = save_records(args.output, synthetic_fleet(args.instances, args.snapshots, args.region, args.seed))
+    logging.info(f"Wrote {count} response pages to {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,512 @@
+"""Keep one region's audit warm in memory and serve it over a local HTTP/JSON API.
+
+The service audits once, then keeps its clients, prices and resource
+inventory for as long as it runs. Resource change events, as EventBridge
+delivers them (EC2 instance state changes, EBS volume and snapshot
+notifications, and EC2 API calls via CloudTrail), are read from an SQS
+queue, or from a local JSON lines file or in-process queue when testing.
+Each batch of events re-describes only the resources it mentions, patches
+them into the inventory and re-runs only the analyzers that read them.
+Everything is listed afresh every `--full-refresh-hours`, to catch changes
+no event was received for.
+
+    python aws_audit_service.py --sqs-queue-url https://sqs.us-east-1.amazonaws.com/123456789012/ec2-changes
+    python aws_audit_service.py --events-file events.jsonl --port 8787
+    curl localhost:8787/summary
+
+Routes:
+    GET  /health                latest refresh, events applied and analyzers waiting to re-run
+    GET  /summary               the savings summary (as in savings_summary.json)
+    GET  /reports               every report with its row count
+    GET  /reports/<name>        a report's rows, paged with ?limit=&offset=
+    GET  /metrics               API call metrics in the Prometheus text format
+    POST /refresh               re-run every analyzer; ?full=1 also lists everything afresh
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import re
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8787
+DEFAULT_POLL_SECONDS = 1.0
+# Analyzers whose resources changed re-run at most this often, so a burst of events costs one refresh
+DEFAULT_REFRESH_SECONDS = 5.0
+DEFAULT_FULL_REFRESH_HOURS = 24.0
+DEFAULT_REPORT_LIMIT = 1000
+FILE_POLL_SECONDS = 0.2
+SQS_MAX_MESSAGES = 10
+# Receive calls per poll while the queue keeps returning full batches
+SQS_MAX_BATCHES = 10
+DESCRIBE_BATCH_SIZE = 200
+# Longest wait between retries while reading or applying events keeps failing
+MAX_EVENT_RETRY_SECONDS = 60.0
+
+# Instance, volume and snapshot IDs anywhere in an event's resources or detail
+RESOURCE_ID_PATTERN = re.compile(r'\b(i|vol|snap)-[0-9a-f]{8,17}\b')
+ID_PREFIX_RESOURCES = {'i': 'instances', 'vol': 'volumes', 'snap': 'snapshots'}
+
+# Inventory resource -> analyzers that read it. Idle analysis looks at 14 days of metrics, which
+# one event hardly moves, so it only re-runs on full refreshes and requested ones.
+DEPENDENT_ANALYZERS = {
+    'instances': ('stopped_instances', 'oldest_instances', 'top_gp2_instances'),
+    'volumes': ('stopped_instances', 'top_gp2_instances'),
+    'snapshots': ('duplicate_snapshots',),
+    'addresses': ('unused_elastic_ips',),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _decode_event(text, source: str) -> Optional[Dict[str, Any]]:
+    """An EventBridge event from a JSON document, unwrapping SNS notifications; None when it isn't one."""
+    try:
+        event = json.loads(text)
+        if isinstance(event, dict) and 'detail-type' not in event and isinstance(event.get('Message'), str):
+            event = json.loads(event['Message'])
+    except ValueError as e:
+        logger.warning(f"Skipping undecodable event from {source}: {e}")
+        return None
+    if not isinstance(event, dict):
+        logger.warning(f"Skipping event from {source} that isn't a JSON object")
+        return None
+    return event
+
+
+class FileEventSource:
+    """Events appended to a local JSON lines file, one per line; a stand-in for SQS when testing."""
+
+    def __init__(self, path: str, from_start: bool = True):
+        self.path = path
+        self._offset = 0 if from_start or not os.path.exists(path) else os.path.getsize(path)
+
+    def poll(self, timeout: float) -> List[Dict[str, Any]]:
+        """Events appended since the last poll, waiting up to `timeout` seconds for the first one."""
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self._read()
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                return events
+            time.sleep(min(FILE_POLL_SECONDS, remaining))
+
+    def _read(self) -> List[Dict[str, Any]]:
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return []
+        with f:
+            if os.fstat(f.fileno()).st_size < self._offset:
+                # Truncated or replaced; read the new file from its start
+                self._offset = 0
+            f.seek(self._offset)
+            data = f.read()
+        # A partly written last line is read on the next poll
+        complete = data.rfind(b'\n') + 1
+        self._offset += complete
+        events = (_decode_event(line, self.path) for line in data[:complete].splitlines() if line.strip())
+        return [event for event in events if event is not None]
+
+    def ack(self):
+        pass
+
+    def discard(self):
+        pass
+
+
+class QueueEventSource:
+    """Events put on an in-process queue.Queue, for tests and embedding the service."""
+
+    def __init__(self, events: Optional[queue.Queue] = None):
+        self.queue = events or queue.Queue()
+
+    def put(self, event: Dict[str, Any]):
+        self.queue.put(event)
+
+    def poll(self, timeout: float) -> List[Dict[str, Any]]:
+        try:
+            events = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def ack(self):
+        pass
+
+    def discard(self):
+        pass
+
+
+class SqsEventSource:
+    """Events an EventBridge rule (directly or through SNS) delivers to an SQS queue.
+
+    Messages are deleted by `ack` once their batch has been applied, so
+    events are never lost to a crash; one applied twice changes nothing. A
+    batch that failed is `discard`ed instead, and SQS delivers it again once
+    its visibility timeout runs out.
+    """
+
+    def __init__(self, queue_url: str, session=None, region_name: Optional[str] = None):
+        import boto3
+
+        self.queue_url = queue_url
+        self.sqs = (session or boto3.session.Session()).client('sqs', region_name=region_name)
+        self._receipts: List[str] = []
+
+    def poll(self, timeout: float) -> List[Dict[str, Any]]:
+        events = []
+        wait_seconds = min(20, max(0, int(timeout)))
+        for _ in range(SQS_MAX_BATCHES):
+            messages = self.sqs.receive_message(
+                QueueUrl=self.queue_url, MaxNumberOfMessages=SQS_MAX_MESSAGES, WaitTimeSeconds=wait_seconds
+            ).get('Messages', [])
+            for message in messages:
+                # Undecodable messages are acknowledged too; they would never decode on a retry either
+                self._receipts.append(message['ReceiptHandle'])
+                event = _decode_event(message['Body'], self.queue_url)
+                if event is not None:
+                    events.append(event)
+            if len(messages) < SQS_MAX_MESSAGES:
+                break
+            wait_seconds = 0
+        return events
+
+    def ack(self):
+        receipts, self._receipts = self._receipts, []
+        for start in range(0, len(receipts), SQS_MAX_MESSAGES):
+            entries = [{'Id': str(n), 'ReceiptHandle': receipt}
+                       for n, receipt in enumerate(receipts[start:start + SQS_MAX_MESSAGES])]
+            failed = self.sqs.delete_message_batch(QueueUrl=self.queue_url, Entries=entries).get('Failed', [])
+            if failed:
+                logger.warning(f"Could not delete {len(failed)} messages from {self.queue_url}; they will be redelivered")
+
+    def discard(self):
+        """Forget the polled batch without deleting it, so its messages are delivered again."""
+        self._receipts = []
+
+
+class AuditService:
+    """One region's analyzer results, kept current from change events on a warm auditor.
+
+    `auditor` is an AWSResourceAuditor; its clients, prices and inventory are
+    reused for the life of the service. Only the `analyzers` named (default:
+    all) are run.
+    """
+
+    def __init__(self, auditor, analyzers: Optional[List[str]] = None, max_workers: int = 4,
+                 analyzer_timeout: Optional[float] = None, poll_seconds: float = DEFAULT_POLL_SECONDS,
+                 refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 full_refresh_hours: float = DEFAULT_FULL_REFRESH_HOURS):
+        self.auditor = auditor
+        self.analyzers = auditor._select_analyzers(analyzers)
+        self.max_workers = max_workers
+        self.analyzer_timeout = analyzer_timeout
+        self.poll_seconds = poll_seconds
+        self.refresh_seconds = refresh_seconds
+        self.full_refresh_seconds = full_refresh_hours * 3600
+        self.region = auditor.ec2.meta.region_name
+        self.events_applied = 0
+        self.refreshed_at: Optional[str] = None
+        self.full_refreshed_at: Optional[str] = None
+        # Results are replaced whole under the lock, so requests always see one consistent refresh
+        self._lock = threading.Lock()
+        self._results: Dict[str, Any] = {}
+        self._summary_body = b'{}'
+        self._stale: set = set()
+        self._last_refresh = 0.0
+        self._last_full_refresh = 0.0
+        self._full_refresh_requested = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def refresh(self, analyzers: Optional[Iterable[str]] = None, full: bool = False):
+        """Re-run `analyzers` (default: all) on the warm inventory; `full` lists every resource afresh first."""
+        if full:
+            self.auditor._reset_inventory()
+            analyzers = None
+        names = [name for name in self.analyzers if analyzers is None or name in analyzers]
+        logger.info(f"Refreshing {', '.join(names)}{' after listing every resource' if full else ''}...")
+        results = self.auditor.run_analyzers(max_workers=self.max_workers, analyzer_timeout=self.analyzer_timeout,
+                                             save=False, analyzers=names)
+        with self._lock:
+            results = dict(self._results, **results)
+        summary = self.auditor.summarize(results)
+        try:
+            summary.save(self.auditor.output_dir)
+        except Exception as e:
+            logger.error(f"Error saving savings summaries: {e}")
+        now = _now()
+        with self._lock:
+            self._results = results
+            self._summary_body = json.dumps(dict(summary.to_dict(), refreshed_at=now)).encode('utf-8')
+            self._stale.difference_update(names)
+            self.refreshed_at = now
+            self._last_refresh = time.monotonic()
+            if full:
+                self.full_refreshed_at = now
+                self._last_full_refresh = self._last_refresh
+
+    def changed_resources(self, event: Dict[str, Any]) -> Dict[str, set]:
+        """Inventory resources an event touches, as resource -> IDs; addresses are always listed whole."""
+        if event.get('region') not in (None, self.region):
+            return {}
+        detail = event.get('detail') or {}
+        text = json.dumps([event.get('resources', []), detail], default=str)
+        changes: Dict[str, set] = {}
+        for match in RESOURCE_ID_PATTERN.finditer(text):
+            changes.setdefault(ID_PREFIX_RESOURCES[match.group(1)], set()).add(match.group(0))
+        # Stopping or terminating an instance can leave its Elastic IP unassociated
+        if 'instances' in changes or 'eipalloc-' in text or str(detail.get('eventName', '')).endswith('Address'):
+            changes['addresses'] = set()
+        return changes
+
+    def apply_events(self, events: List[Dict[str, Any]]) -> List[str]:
+        """Patch the resources a batch of events mentions into the inventory; returns the analyzers now stale."""
+        changes: Dict[str, set] = {}
+        for event in events:
+            for resource, ids in self.changed_resources(event).items():
+                changes.setdefault(resource, set()).update(ids)
+        if changes.get('instances') and self.auditor.inventory.volumes_loaded:
+            # Volumes deleted with a terminated instance or detached from it
+            attached = self.auditor.inventory.volumes_for_instances(sorted(changes['instances']))
+            changes.setdefault('volumes', set()).update(
+                volume['VolumeId'] for volumes in attached.values() for volume in volumes
+            )
+        for resource, ids in changes.items():
+            self._apply(resource, ids)
+        stale = [name for name in self.analyzers
+                 if any(name in DEPENDENT_ANALYZERS[resource] for resource in changes)]
+        with self._lock:
+            self.events_applied += len(events)
+            self._stale.update(stale)
+        if changes:
+            changed = ', '.join(f"{len(ids) or 'all'} {resource}" for resource, ids in sorted(changes.items()))
+            logger.info(f"Applied {len(events)} events changing {changed}")
+        return stale
+
+    def _apply(self, resource: str, ids: set):
+        inventory = self.auditor.inventory
+        if resource == 'addresses':
+            inventory.invalidate('addresses')
+            return
+        try:
+            found = self._describe(resource, sorted(ids))
+        except Exception as e:
+            logger.warning(f"Could not describe changed {resource}, listing them all afresh: {e}")
+            inventory.invalidate(resource)
+            return
+        # IDs no longer described were deleted (or, for instances, terminated)
+        inventory.apply_changes(resource, found, removed=ids)
+        if resource == 'instances':
+            self.auditor.names.forget(ids)
+
+    def _describe(self, resource: str, ids: List[str]) -> List[Dict[str, Any]]:
+        from aws_resource_auditor import LIVE_INSTANCE_STATES
+
+        operation, result_key, filter_name, kwargs = {
+            'instances': ('describe_instances', 'Reservations', 'instance-id',
+                          {'Filters': [{'Name': 'instance-state-name', 'Values': LIVE_INSTANCE_STATES}]}),
+            'volumes': ('describe_volumes', 'Volumes', 'volume-id', {}),
+            'snapshots': ('describe_snapshots', 'Snapshots', 'snapshot-id', {'OwnerIds': ['self']}),
+        }[resource]
+        paginator = self.auditor.ec2.get_paginator(operation)
+        items = []
+        # ID filters rather than ID arguments, so IDs that no longer exist are left out instead of failing the call
+        for start in range(0, len(ids), DESCRIBE_BATCH_SIZE):
+            filters = kwargs.get('Filters', []) + [{'Name': filter_name, 'Values': ids[start:start + DESCRIBE_BATCH_SIZE]}]
+            for page in paginator.paginate(**dict(kwargs, Filters=filters)):
+                items.extend(page[result_key])
+        if resource == 'instances':
+            items = [instance for reservation in items for instance in reservation['Instances']]
+        return items
+
+    def request_refresh(self, full: bool = False):
+        """Re-run every analyzer (after listing everything afresh when `full`) on the next turn of `run`."""
+        with self._lock:
+            self._stale.update(self.analyzers)
+            self._full_refresh_requested |= full
+            self._last_refresh = 0.0
+        self._wake.set()
+
+    def run(self, source=None):
+        """Audit once, then apply events from `source` and refresh as due until `stop` is called."""
+        self.refresh(full=True)
+        failures = 0
+        while not self._stop.is_set():
+            if source is not None:
+                try:
+                    events = source.poll(self.poll_seconds)
+                    if events:
+                        self.apply_events(events)
+                    source.ack()
+                    failures = 0
+                except Exception as e:
+                    # Discarded rather than acknowledged, so SQS delivers them again; refreshes still run as due
+                    source.discard()
+                    failures += 1
+                    delay = min(self.poll_seconds * 2 ** failures, MAX_EVENT_RETRY_SECONDS)
+                    logger.error(f"Error reading or applying events, retrying in {delay:.1f}s: {e}")
+                    self._stop.wait(delay)
+            else:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+            if self._stop.is_set():
+                break
+            now = time.monotonic()
+            with self._lock:
+                full = self._full_refresh_requested or now - self._last_full_refresh >= self.full_refresh_seconds
+                stale = set(self._stale)
+                due = stale and now - self._last_refresh >= self.refresh_seconds
+                self._full_refresh_requested = False
+            try:
+                if full or due:
+                    self.refresh(None if full else stale, full=full)
+            except Exception as e:
+                logger.error(f"Error refreshing the audit, serving the previous results: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def handle(self, method: str, path: str) -> Tuple[int, bytes, str]:
+        """Answer one API request: (HTTP status, body, content type)."""
+        url = urlparse(path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = url.path.rstrip('/') or '/'
+        if method == 'POST' and route == '/refresh':
+            full = query.get('full', '') in ('1', 'true')
+            self.request_refresh(full=full)
+            return self._json(202, {'refresh': 'full' if full else 'analyzers'})
+        if method != 'GET':
+            return self._json(405, {'error': f"{method} is not supported on {route}"})
+        if route == '/health':
+            with self._lock:
+                return self._json(200 if self.refreshed_at else 503, {
+                    'status': 'ok' if self.refreshed_at else 'starting', 'region': self.region,
+                    'refreshed_at': self.refreshed_at, 'full_refreshed_at': self.full_refreshed_at,
+                    'events_applied': self.events_applied, 'stale_analyzers': sorted(self._stale),
+                })
+        if route == '/summary':
+            with self._lock:
+                return 200, self._summary_body, 'application/json'
+        if route == '/metrics':
+            return 200, self.auditor.metrics.to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4'
+        with self._lock:
+            results = self._results
+        if route == '/reports':
+            return self._json(200, {name: len(df) for name, df in results.items()})
+        if route.startswith('/reports/'):
+            name = route[len('/reports/'):]
+            if name not in results:
+                return self._json(404, {'error': f"No report named {name}"})
+            try:
+                limit = int(query.get('limit', DEFAULT_REPORT_LIMIT))
+                offset = int(query.get('offset', 0))
+            except ValueError:
+                return self._json(400, {'error': "limit and offset must be integers"})
+            df = results[name]
+            records = df.iloc[max(offset, 0):max(offset, 0) + max(limit, 0)].to_json(orient='records', date_format='iso')
+            return self._json(200, {'report': name, 'rows': len(df), 'offset': offset,
+                                    'records': json.loads(records)})
+        return self._json(404, {'error': f"No route {route}"})
+
+    @staticmethod
+    def _json(status: int, body: Dict[str, Any]) -> Tuple[int, bytes, str]:
+        return status, json.dumps(body, default=str).encode('utf-8'), 'application/json'
+
+    def serve_http(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+        """Serve the API from a background thread; call `shutdown()` on the returned server to stop it."""
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, method: str):
+                status, body, content_type = service.handle(method, self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._respond('GET')
+
+            def do_POST(self):
+                self._respond('POST')
+
+            def log_message(self, format, *args):
+                logger.debug(f"{self.address_string()} {format % args}")
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='audit-api', daemon=True).start()
+        logger.info(f"Serving the audit on http://{host}:{server.server_address[1]}/")
+        return server
+
+
+def main(argv: Optional[List[str]] = None):
+    import boto3
+
+    from aws_resource_auditor import AWSResourceAuditor, configure_logging
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--region')
+    parser.add_argument('--profile', help="AWS named profile")
+    events = parser.add_mutually_exclusive_group()
+    events.add_argument('--sqs-queue-url', help="SQS queue an EventBridge rule sends EC2 and EBS events to")
+    events.add_argument('--events-file', help="JSON lines file of events to follow instead, e.g. for testing")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--analyzer-timeout', type=float)
+    parser.add_argument('--only', nargs='+', choices=list(AWSResourceAuditor.ANALYZERS), metavar='ANALYZER')
+    parser.add_argument('--refresh-seconds', type=float, default=DEFAULT_REFRESH_SECONDS,
+                        help="least time between re-runs of analyzers whose resources changed")
+    parser.add_argument('--full-refresh-hours', type=float, default=DEFAULT_FULL_REFRESH_HOURS,
+                        help="list every resource afresh this often")
+    parser.add_argument('--output-dir', help="where the latest savings summaries are written")
+    parser.add_argument('--price-index', help="price database built by aws_price_index.py")
+    parser.add_argument('--shard-listings', action='store_true')
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    session = boto3.session.Session(profile_name=args.profile, region_name=args.region)
+    auditor = AWSResourceAuditor(region_name=args.region, output_dir=args.output_dir, session=session,
+                                 price_index=args.price_index, shard_listings=args.shard_listings)
+    service = AuditService(auditor, analyzers=args.only, max_workers=args.max_workers,
+                           analyzer_timeout=args.analyzer_timeout, refresh_seconds=args.refresh_seconds,
+                           full_refresh_hours=args.full_refresh_hours)
+    source = None
+    if args.sqs_queue_url:
+        source = SqsEventSource(args.sqs_queue_url, session, region_name=auditor.ec2.meta.region_name)
+    elif args.events_file:
+        source = FileEventSource(args.events_file)
+    server = service.serve_http(args.host, args.port)
+    signal.signal(signal.SIGTERM, lambda signum, frame: service.stop())
+    try:
+        service.run(source)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        logger.info("Audit service stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Persistent local inventory for incremental audits.
+
+Snapshots never change once created, so they are kept in SQLite between
+runs and later runs only list the ones started since the last sync. Stored
+snapshots that would be reported as duplicates are checked to still exist,
+and a full listing runs every `full_sync_interval_days`. Each
+run's waste (resource, category, monthly cost) is recorded too, so a run
+can be compared with the one before it.
+
+    AWSResourceAuditor(inventory_store='aws_inventory.db').run_audit()
+"""
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_FULL_SYNC_INTERVAL_DAYS = 7
+
+# describe_snapshots accepts up to 200 values per filter
+MAX_FILTER_VALUES = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    scope TEXT NOT NULL,
+    snapshot_id TEXT NOT NULL,
+    volume_id TEXT,
+    start_time TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    description TEXT,
+    PRIMARY KEY (scope, snapshot_id)
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    scope TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    full_sync_at TEXT,
+    last_sync_at TEXT NOT NULL,
+    PRIMARY KEY (scope, resource)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    monthly_waste REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waste (
+    run_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    monthly_cost REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS waste_by_run ON waste (run_id);
+"""
+
+
+class InventoryStore:
+    """SQLite store of known snapshots and per-run waste, scoped by region."""
+
+    def __init__(self, path: str, full_sync_interval_days: int = DEFAULT_FULL_SYNC_INTERVAL_DAYS):
+        self.path = path
+        self.full_sync_interval = timedelta(days=full_sync_interval_days)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _sync_times(self, scope: str, resource: str) -> Tuple[Optional[datetime], Optional[datetime]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT full_sync_at, last_sync_at FROM syncs WHERE scope = ? AND resource = ?", (scope, resource)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None, None
+        return datetime.fromisoformat(row[0]), datetime.fromisoformat(row[1])
+
+    def snapshot_start_time_filter(self, scope: str, now: Optional[datetime] = None) -> Optional[List[str]]:
+        """`start-time` filter values covering every day since the last sync, or None when a full listing is due."""
+        now = now or datetime.now(timezone.utc)
+        full_sync_at, last_sync_at = self._sync_times(scope, 'snapshots')
+        if full_sync_at is None or now - full_sync_at >= self.full_sync_interval:
+            return None
+        # Overlap by a day so snapshots started just before the last sync but not yet listed aren't missed
+        day = (last_sync_at - timedelta(days=1)).date()
+        values = []
+        while day <= now.date():
+            values.append(f"{day.isoformat()}T*")
+            day += timedelta(days=1)
+        return values if len(values) <= MAX_FILTER_VALUES else None
+
+    def load_snapshots(self, scope: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT snapshot_id, volume_id, start_time, size, description FROM snapshots WHERE scope = ?", (scope,)
+            ).fetchall()
+        snapshots = []
+        for snapshot_id, volume_id, start_time, size, description in rows:
+            snapshot = {'SnapshotId': snapshot_id, 'StartTime': datetime.fromisoformat(start_time), 'VolumeSize': size}
+            if volume_id is not None:
+                snapshot['VolumeId'] = volume_id
+            if description is not None:
+                snapshot['Description'] = description
+            snapshots.append(snapshot)
+        return snapshots
+
+    def save_snapshots(self, scope: str, snapshots: List[Dict[str, Any]], full: bool,
+                       synced_at: Optional[datetime] = None):
+        """Record listed snapshots; a full listing replaces everything known for the scope."""
+        synced_at = (synced_at or datetime.now(timezone.utc)).isoformat()
+        rows = [(
+            scope, snapshot['SnapshotId'], snapshot.get('VolumeId'), snapshot['StartTime'].isoformat(),
+            snapshot['VolumeSize'], snapshot.get('Description')
+        ) for snapshot in snapshots]
+        with self._lock, self.conn:
+            if full:
+                self.conn.execute("DELETE FROM snapshots WHERE scope = ?", (scope,))
+            self.conn.executemany("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute(
+                "INSERT INTO syncs VALUES (?, 'snapshots', ?, ?) ON CONFLICT (scope, resource) DO UPDATE SET "
+                "full_sync_at = COALESCE(excluded.full_sync_at, full_sync_at), last_sync_at = excluded.last_sync_at",
+                (scope, synced_at if full else None, synced_at)
+            )
+
+    def delete_snapshots(self, scope: str, snapshot_ids: Iterable[str]):
+        """Forget snapshots found to be deleted between full listings."""
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM snapshots WHERE scope = ? AND snapshot_id = ?",
+                                  [(scope, snapshot_id) for snapshot_id in snapshot_ids])
+
+    def record_run(self, scope: str, waste: List[Tuple[str, str, float]],
+                   started_at: Optional[datetime] = None) -> int:
+        """Store one run's waste as (category, resource ID, monthly cost) rows and return its run ID."""
+        started_at = (started_at or datetime.now(timezone.utc)).isoformat()
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (scope, started_at, monthly_waste) VALUES (?, ?, ?)",
+                (scope, started_at, sum(cost for _, _, cost in waste))
+            )
+            run_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO waste VALUES (?, ?, ?, ?)",
+                [(run_id, category, resource_id, cost) for category, resource_id, cost in waste]
+            )
+        return run_id
+
+    def delta(self, scope: str, run_id: int, trend_runs: int = 10) -> Dict[str, Any]:
+        """Compare a run's waste with the previous run in the same scope.
+
+        Returns 'new' and 'resolved' lists of (category, resource ID, monthly
+        cost) and 'trend', the (started_at, monthly waste) of the latest runs.
+        """
+        with self._lock:
+            previous = self.conn.execute(
+                "SELECT MAX(run_id) FROM runs WHERE scope = ? AND run_id < ?", (scope, run_id)
+            ).fetchone()[0]
+            current = self.conn.execute(
+                "SELECT category, resource_id, monthly_cost FROM waste WHERE run_id = ?", (run_id,)
+            ).fetchall()
+            before = self.conn.execute(
+                "SELECT category, resource_id, monthly_cost FROM waste WHERE run_id = ?", (previous,)
+            ).fetchall() if previous is not None else []
+            trend = self.conn.execute(
+                "SELECT started_at, monthly_waste FROM runs WHERE scope = ? AND run_id <= ? "
+                "ORDER BY run_id DESC LIMIT ?", (scope, run_id, trend_runs)
+            ).fetchall()
+
+        current_keys = {(category, resource_id) for category, resource_id, _ in current}
+        before_keys = {(category, resource_id) for category, resource_id, _ in before}
+        return {
+            'has_previous': previous is not None,
+            'new': [row for row in current if (row[0], row[1]) not in before_keys],
+            'resolved': [row for row in before if (row[0], row[1]) not in current_keys],
+            'trend': list(reversed(trend))
+        }
@@ -0,0 +1,324 @@
+"""Local price store built from the AWS bulk AmazonEC2 offer file.
+
+The offer file (https://pricing.us-east-1.amazonaws.com/offers/v1.0/aws/AmazonEC2/current/index.json)
+is several gigabytes, so it is parsed as a stream, one product or term at a
+time, and only the EBS, snapshot, Elastic IP and on-demand instance prices
+the auditor can use are written to SQLite.
+
+    python aws_price_index.py index.json ec2_prices.db
+
+The resulting database is then passed to the auditor:
+
+    AWSResourceAuditor(price_index='ec2_prices.db').run_audit()
+"""
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.request import pathname2url
+
+READ_CHUNK_SIZE = 1 << 20
+INSERT_BATCH_SIZE = 10000
+
+# Product families the auditor prices; everything else in the offer file is skipped
+PRODUCT_FAMILIES = {
+    'Storage', 'Storage Snapshot', 'System Operation', 'Provisioned Throughput', 'IP Address', 'Compute Instance'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    sku TEXT PRIMARY KEY,
+    product_family TEXT NOT NULL,
+    region_code TEXT NOT NULL,
+    location_type TEXT,
+    usagetype TEXT,
+    volume_api_name TEXT,
+    group_name TEXT,
+    instance_type TEXT,
+    operating_system TEXT
+);
+CREATE TABLE IF NOT EXISTS prices (
+    sku TEXT NOT NULL,
+    unit TEXT,
+    usd REAL NOT NULL,
+    begin_range REAL
+);
+CREATE INDEX IF NOT EXISTS products_by_region ON products (region_code, product_family);
+CREATE INDEX IF NOT EXISTS products_by_instance_type ON products (region_code, instance_type);
+CREATE INDEX IF NOT EXISTS prices_by_sku ON prices (sku);
+"""
+
+_decoder = json.JSONDecoder()
+NUMBER_CHARS = '0123456789+-.eE'
+
+
+class _JSONStream:
+    """Incremental reader over a large JSON document.
+
+    Objects can be walked member by member with `members()`, while any
+    value small enough to hold in memory is decoded with `value()`. Only the
+    current read chunk plus the value being decoded is ever buffered.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        data = self.f.read(READ_CHUNK_SIZE)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of offer file")
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos} of the read buffer")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number followed by nothing but number characters up to the buffer edge may be
+                # truncated: '1.' decodes as 1 and '1.5e' as 1.5
+                truncated = (isinstance(value, (int, float)) and not isinstance(value, bool)
+                             and not self.buf[end:].strip(NUMBER_CHARS))
+                if not truncated or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def skip(self):
+        if self._peek() == '{':
+            for _ in self.members():
+                self.skip()
+        else:
+            self.value()
+
+    def members(self) -> Iterator[str]:
+        """Yield each key of the object at the current position.
+
+        The caller must consume the member's value (with `value()`,
+        `members()` or `skip()`) before asking for the next key.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            separator = self._peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Malformed object near member '{key}'")
+
+
+def iter_offer_file(path: str) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """Stream ('product', sku, product) and ('term', sku, on-demand terms) records from an offer file."""
+    with open(path, encoding='utf-8') as f:
+        stream = _JSONStream(f)
+        for section in stream.members():
+            if section == 'products':
+                for sku in stream.members():
+                    yield 'product', sku, stream.value()
+            elif section == 'terms':
+                for term_type in stream.members():
+                    if term_type != 'OnDemand':
+                        stream.skip()
+                        continue
+                    for sku in stream.members():
+                        yield 'term', sku, stream.value()
+            else:
+                stream.skip()
+
+
+def _product_row(sku: str, product: Dict[str, Any]) -> Optional[Tuple]:
+    family = product.get('productFamily')
+    attributes = product.get('attributes', {})
+    region_code = attributes.get('regionCode')
+    if family not in PRODUCT_FAMILIES or not region_code:
+        return None
+    if family == 'Compute Instance':
+        # Only plain on-demand capacity: shared tenancy, no pre-installed software, no reservations
+        if (attributes.get('tenancy') != 'Shared' or attributes.get('preInstalledSw', 'NA') != 'NA'
+                or attributes.get('capacitystatus', 'Used') != 'Used'):
+            return None
+    return (
+        sku, family, region_code, attributes.get('locationType'), attributes.get('usagetype'),
+        attributes.get('volumeApiName'), attributes.get('group'), attributes.get('instanceType'),
+        attributes.get('operatingSystem')
+    )
+
+
+# Lookups only price products of AWS Regions, not of Local Zones, Outposts or Wavelength Zones sharing a region code
+REGION_PRODUCTS = "p.location_type = 'AWS Region'"
+
+
+class PriceIndex:
+    """SQLite-backed, indexed EC2 price store answering the auditor's pricing lookups offline.
+
+    Opened read-only, as the auditor does, the database must already exist;
+    pass `read_only=False` to create or rebuild one with `ingest`.
+    """
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None, read_only: bool = True):
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        if read_only:
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"No price index at {path}; build one with aws_price_index.py")
+            self.conn = sqlite3.connect(f'file:{pathname2url(os.path.abspath(path))}?mode=ro', uri=True,
+                                        check_same_thread=False)
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(products)")}
+            if 'location_type' not in columns:
+                self.conn.close()
+                raise ValueError(f"{path} isn't a price index built by this version of aws_price_index.py; rebuild it")
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def ingest(self, offer_path: str) -> Dict[str, int]:
+        """Load an AmazonEC2 offer file, replacing any previously ingested prices."""
+        self.logger.info(f"Ingesting EC2 offer file {offer_path}...")
+        counts = {'products': 0, 'prices': 0}
+        # Products precede terms in the offer file, so this set decides which terms to keep
+        wanted_skus = set()
+        product_rows, price_rows = [], []
+
+        def flush():
+            self.conn.executemany("INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", product_rows)
+            self.conn.executemany("INSERT INTO prices VALUES (?, ?, ?, ?)", price_rows)
+            counts['products'] += len(product_rows)
+            counts['prices'] += len(price_rows)
+            del product_rows[:], price_rows[:]
+
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM products")
+            self.conn.execute("DELETE FROM prices")
+            for kind, sku, record in iter_offer_file(offer_path):
+                if kind == 'product':
+                    row = _product_row(sku, record)
+                    if row:
+                        wanted_skus.add(sku)
+                        product_rows.append(row)
+                elif sku in wanted_skus:
+                    for term in record.values():
+                        for dimension in term.get('priceDimensions', {}).values():
+                            price_rows.append((
+                                sku, dimension.get('unit'), float(dimension['pricePerUnit'].get('USD', 0)),
+                                float(dimension.get('beginRange', 0) or 0)
+                            ))
+                if len(product_rows) + len(price_rows) >= INSERT_BATCH_SIZE:
+                    flush()
+            flush()
+
+        self.logger.info(f"Indexed {counts['products']} products and {counts['prices']} prices")
+        return counts
+
+    def _query(self, sql: str, params: Tuple) -> list:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def ebs_prices(self, region_code: str) -> Dict[str, float]:
+        """Monthly EBS prices for a region.
+
+        Keys are volume types for GB-month storage (e.g. 'io1'), plus
+        '<type>_iops' per provisioned IOPS-month and '<type>_throughput' per
+        provisioned MiB/s-month where the volume type charges for them.
+        """
+        prices = {}
+        # Highest first, so where several products share a price name the lowest is kept, as for instances
+        rows = self._query(
+            "SELECT p.product_family, p.volume_api_name, pr.unit, pr.usd FROM products p "
+            "JOIN prices pr ON pr.sku = p.sku "
+            f"WHERE p.region_code = ? AND {REGION_PRODUCTS} AND p.volume_api_name IS NOT NULL AND pr.begin_range = 0 "
+            "AND (p.product_family IN ('Storage', 'Provisioned Throughput') "
+            "     OR (p.product_family = 'System Operation' AND p.group_name = 'EBS IOPS')) "
+            "ORDER BY pr.usd DESC, p.sku",
+            (region_code,)
+        )
+        for family, volume_type, unit, usd in rows:
+            if family == 'Storage':
+                prices[volume_type] = usd
+            elif family == 'System Operation':
+                prices[f'{volume_type}_iops'] = usd
+            else:
+                # Throughput is published per GiBps-month in some offer files
+                prices[f'{volume_type}_throughput'] = usd / 1024 if (unit or '').lower().startswith('gibps') else usd
+        return prices
+
+    def snapshot_price(self, region_code: str) -> Optional[float]:
+        rows = self._query(
+            "SELECT pr.usd FROM products p JOIN prices pr ON pr.sku = p.sku "
+            f"WHERE p.region_code = ? AND {REGION_PRODUCTS} AND p.product_family = 'Storage Snapshot' "
+            "AND p.usagetype LIKE '%EBS:SnapshotUsage' ORDER BY pr.usd DESC LIMIT 1",
+            (region_code,)
+        )
+        return rows[0][0] if rows else None
+
+    def eip_price(self, region_code: str) -> Optional[float]:
+        rows = self._query(
+            "SELECT pr.usd FROM products p JOIN prices pr ON pr.sku = p.sku "
+            f"WHERE p.region_code = ? AND {REGION_PRODUCTS} AND p.product_family = 'IP Address' "
+            "AND p.usagetype LIKE '%IdleAddress%' AND pr.usd > 0 ORDER BY pr.begin_range LIMIT 1",
+            (region_code,)
+        )
+        return rows[0][0] if rows else None
+
+    def instance_hourly_price(self, region_code: str, instance_type: str,
+                              operating_system: str = 'Linux') -> Optional[float]:
+        rows = self._query(
+            "SELECT pr.usd FROM products p JOIN prices pr ON pr.sku = p.sku "
+            f"WHERE p.region_code = ? AND {REGION_PRODUCTS} AND p.instance_type = ? AND p.operating_system = ? "
+            "AND p.product_family = 'Compute Instance' AND pr.usd > 0 ORDER BY pr.usd LIMIT 1",
+            (region_code, instance_type, operating_system)
+        )
+        return rows[0][0] if rows else None
+
+    def pricing_data(self, region_code: str) -> Dict[str, float]:
+        """Every price the auditor uses for a region, in the same shape as its Pricing API lookups."""
+        prices = self.ebs_prices(region_code)
+        snapshot = self.snapshot_price(region_code)
+        if snapshot is not None:
+            prices['snapshot'] = snapshot
+        eip = self.eip_price(region_code)
+        if eip is not None:
+            prices['eip'] = eip
+        return prices
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python aws_price_index.py <AmazonEC2 offer file> <output database>")
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    PriceIndex(sys.argv[2], read_only=False).ingest(sys.argv[1])
@@ -1,367 +1,2201 @@
-import boto3
-import pandas as pd
-from datetime import datetime, timezone
+from __future__ import annotations
+
+import argparse
+import importlib
+from array import array
+from datetime import datetime, timedelta, timezone
 import os
-from botocore.exceptions import ClientError
-from botocore.config import Config
+import bz2
+import cProfile
+import glob
+import gzip
+import heapq
+import json
 import logging
-from typing import Dict, Any
+import lzma
+import queue
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from operator import itemgetter, methodcaller
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
 
-my_config = Config(
-    region_name='us-east-1',
-    retries={'max_attempts': 10}
-)
+try:
+    import fcntl
+    import resource
+except ImportError:  # Windows
+    fcntl = resource = None
+
+
+class _LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    pandas, numpy and boto3 take most of a second to import; deferring them
+    lets the CLI parse arguments and start work straight away. Annotations
+    that mention them stay unevaluated thanks to `from __future__ import annotations`.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+boto3 = _LazyModule('boto3')
+# `except botocore_exceptions.ClientError` only resolves the class once an exception is being matched
+botocore_exceptions = _LazyModule('botocore.exceptions')
+np = _LazyModule('numpy')
+pd = _LazyModule('pandas')
+
+PRICING_CLIENT_CONFIG = {
+    'region_name': 'us-east-1',
+    'retries': {'max_attempts': 10}
+}
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def _client_config(**kwargs):
+    from botocore.config import Config
+    return Config(**kwargs)
+
+
+# boto3 sessions aren't safe to create clients from concurrently, so every auditor sharing a session
+# (e.g. the regional auditors of a multi-region audit) creates its clients under that session's lock
+_session_locks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_session_locks_guard = threading.Lock()
+
+
+def _session_lock(session) -> threading.RLock:
+    with _session_locks_guard:
+        lock = _session_locks.get(session)
+        if lock is None:
+            lock = _session_locks[session] = threading.RLock()
+        return lock
+
+
+def configure_logging(level: int = logging.INFO):
+    """Log to the console; audits also write audit.log to their output directory while they run."""
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+
+
+# Everything but 'terminated', so describe_instances drops terminated instances server-side
+LIVE_INSTANCE_STATES = ['pending', 'running', 'shutting-down', 'stopping', 'stopped']
+
+VOLUME_TYPES = ('gp2', 'gp3', 'io1', 'io2', 'st1', 'sc1', 'standard')
+# Volume types that also charge per provisioned IOPS-month ('<type>_iops') or MiB/s-month ('<type>_throughput')
+IOPS_PRICED_VOLUME_TYPES = ('gp3', 'io1', 'io2')
+THROUGHPUT_PRICED_VOLUME_TYPES = ('gp3',)
+# Provisioned IOPS and MiB/s included in the storage price
+INCLUDED_IOPS = {'gp3': 3000}
+INCLUDED_THROUGHPUT = {'gp3': 125}
+
+# Used when a price can't be fetched or found in the pricing cache; EBS prices are per GB-, IOPS- or MiB/s-month,
+# eip per hour
+DEFAULT_PRICES = {
+    'gp2': 0.10, 'gp3': 0.08, 'gp3_iops': 0.005, 'gp3_throughput': 0.04, 'io1': 0.125, 'io1_iops': 0.065,
+    'io2': 0.125, 'io2_iops': 0.065, 'st1': 0.045, 'sc1': 0.015, 'standard': 0.05,
+    'eip': 0.005, 'snapshot': 0.05
+}
+# Every price CostModel.volume_costs needs
+EBS_PRICE_NAMES = VOLUME_TYPES + tuple(f'{t}_iops' for t in IOPS_PRICED_VOLUME_TYPES) + tuple(
+    f'{t}_throughput' for t in THROUGHPUT_PRICED_VOLUME_TYPES)
+# GB-month price for volume types no price is known for
+UNKNOWN_VOLUME_TYPE_PRICE = DEFAULT_PRICES['gp2']
+
+DEFAULT_PRICING_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'aws-cost-saver', 'pricing.json')
+DEFAULT_PRICING_CACHE_TTL = 7 * 24 * 3600
+
+DEFAULT_OUTPUT_FORMATS = ('csv', 'md')
+DEFAULT_MARKDOWN_MAX_ROWS = 500
+# Rows per Parquet row group and per chunk converted for the other data formats
+REPORT_ROW_GROUP_SIZE = 100000
+
+# Sized for the analyzer pool plus paginators sharing one client
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+# describe_volumes accepts up to 200 values per filter
+ATTACHMENT_FILTER_BATCH_SIZE = 200
+INSTANCE_ID_BATCH_SIZE = 1000
+
+# Sharded listings page each leading hex digit of the resource ID as its own filtered stream
+LISTING_SHARDS = tuple('0123456789abcdef')
+# Sharded operation -> (ID filter, ID prefix, ID key)
+SHARDED_LISTINGS = {
+    'describe_volumes': ('volume-id', 'vol-', 'VolumeId'),
+    'describe_snapshots': ('snapshot-id', 'snap-', 'SnapshotId'),
+}
+
+# Inventory resource -> ID key, for applying changes to one resource at a time
+RESOURCE_ID_KEYS = {'instances': 'InstanceId', 'volumes': 'VolumeId', 'snapshots': 'SnapshotId'}
+# Checking stored snapshots by ID filter (200 values a call) is only cheaper than listing them all
+# (up to 1000 a page) while few enough of them need checking
+MAX_SNAPSHOT_FILTER_VALUES = 200
+SNAPSHOT_LISTING_PAGE_SIZE = 1000
+
+# Idle running instances and attached volumes, judged on daily CloudWatch datapoints
+IDLE_LOOKBACK_DAYS = 14
+IDLE_CPU_PERCENT = 5.0
+IDLE_NETWORK_MIB_PER_DAY = 5.0
+IDLE_VOLUME_OPS_PER_DAY = 1.0
+# GetMetricData accepts up to 500 queries per call
+METRIC_QUERIES_PER_CALL = 500
+DEFAULT_METRIC_WORKERS = 8
+HOURS_PER_MONTH = 730
+MONTHS_PER_YEAR = 12
+
+# API latency histogram buckets in seconds (the Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Starting point for each API action's request rate; EC2 refills its describe buckets at about 20/s
+DEFAULT_ACTION_RATE = 20.0
+
+THROTTLE_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled', 'RequestThrottledException',
+    'RequestLimitExceeded', 'TooManyRequestsException', 'SlowDown'
+}
+
+# ColumnBuilder column kinds -> array typecode ('' for a plain list)
+COLUMN_KINDS = {'object': '', 'category': '', 'int': 'q', 'float': 'd', 'datetime': ''}
+# Items ColumnBuilder.extend reads per pass over its columns
+COLUMN_CHUNK_ROWS = 10000
+
+
+def _field(key: str, default: Any = None) -> Callable[[Dict[str, Any]], Any]:
+    # methodcaller runs item.get(key, default) without a Python-level frame per item
+    return methodcaller('get', key, default)
+
+
+class ColumnBuilder:
+    """Accumulates analyzer rows straight into per-column arrays and builds one DataFrame from them.
+
+    'int' and 'float' columns append to typed arrays; the others hold
+    references to the inventory's own strings and datetimes. At build time
+    'category' columns (instance types, VPCs, platforms) are interned into
+    integer codes over sorted categories and 'datetime' columns are parsed
+    in one bulk conversion. Call build() once, after the last row.
+    """
+
+    def __init__(self, kinds: Dict[str, str]):
+        unknown = set(kinds.values()) - set(COLUMN_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown column kinds: {', '.join(sorted(unknown))}")
+        self.kinds = kinds
+        self._columns = {name: array(COLUMN_KINDS[kind]) if COLUMN_KINDS[kind] else []
+                         for name, kind in kinds.items()}
+
+    def extend(self, items: Iterable[Any], *getters: Callable[[Any], Any]):
+        """Append a row per item, reading each column's value (in column order) with its getter.
+
+        Each column is filled by one map() over a chunk of items, so no
+        per-row dict or tuple is created for the garbage collector to chase.
+        """
+        # zip() would silently leave columns short, misaligning every later row
+        if len(getters) != len(self._columns):
+            raise ValueError(f"Expected {len(self._columns)} getters, got {len(getters)}")
+        items = iter(items)
+        while True:
+            chunk = list(islice(items, COLUMN_CHUNK_ROWS))
+            if not chunk:
+                return
+            for column, getter in zip(self._columns.values(), getters):
+                column.extend(map(getter, chunk))
+
+    def append(self, *values):
+        """Append one row, its values in column order."""
+        for column, value in zip(self._columns.values(), values):
+            column.append(value)
+
+    def __len__(self) -> int:
+        return len(next(iter(self._columns.values()), ()))
+
+    def build(self) -> pd.DataFrame:
+        data = {}
+        for name, kind in self.kinds.items():
+            column = self._columns[name]
+            if kind == 'category':
+                data[name] = pd.Categorical(column)
+            elif kind == 'datetime':
+                data[name] = pd.to_datetime(column, utc=True)
+            elif kind in ('int', 'float'):
+                data[name] = np.frombuffer(column, dtype=np.int64 if kind == 'int' else np.float64)
+            else:
+                data[name] = column
+        return pd.DataFrame(data, copy=False)
+
+
+def _age_days(times: pd.Series, now: Optional[pd.Timestamp] = None) -> pd.Series:
+    """Days elapsed since each UTC timestamp, to two decimals."""
+    now = now or pd.Timestamp.now(tz=timezone.utc)
+    return ((now - times).dt.total_seconds() / (24 * 3600)).round(2)
+
+
+def _report_timestamps(times: pd.Series) -> pd.Series:
+    # Whole-second naive UTC timestamps render as '%Y-%m-%d %H:%M:%S' without building a string per row
+    return times.dt.tz_convert(None).dt.floor('s').astype('datetime64[s]')
+
+
+def _factorize(values):
+    if not isinstance(values, (pd.Series, pd.Index, pd.Categorical, np.ndarray)):
+        values = np.asarray(values, dtype=object)
+    return pd.factorize(values)
+
+
+class CostModel:
+    """Monthly costs of whole columns of resources, looked up in a per-region price table.
+
+    `prices` maps region -> price name -> price, as returned by
+    AWSResourceAuditor.load_pricing; names a region lacks fall back to
+    DEFAULT_PRICES. Methods take array-likes (lists, arrays, Series,
+    categoricals) and return float64 arrays. `regions` is a matching column
+    of region names, or None to price every row in the first region.
+    """
+
+    def __init__(self, prices: Dict[str, Dict[str, float]]):
+        if not prices:
+            raise ValueError("A cost model needs the prices of at least one region")
+        self.regions = pd.Index(list(prices))
+        names = list(dict.fromkeys(list(DEFAULT_PRICES) + [name for table in prices.values() for name in table]))
+        self._columns = {name: i for i, name in enumerate(names)}
+        self._table = np.array([
+            [table.get(name, DEFAULT_PRICES.get(name, np.nan)) for name in names] for table in prices.values()
+        ], dtype=np.float64)
+
+    def _region_codes(self, regions, length: int) -> np.ndarray:
+        if regions is None:
+            return np.zeros(length, dtype=np.intp)
+        codes, uniques = _factorize(regions)
+        unique_codes = self.regions.get_indexer(uniques)
+        if (unique_codes < 0).any():
+            raise ValueError(f"No prices for regions: {', '.join(sorted(uniques[unique_codes < 0]))}")
+        return unique_codes[codes]
+
+    def _type_prices(self, type_names, suffix: str, default: float) -> np.ndarray:
+        """(region x volume type) matrix of each type's `<type><suffix>` price."""
+        matrix = np.full((len(self.regions), len(type_names)), default, dtype=np.float64)
+        for t, type_name in enumerate(type_names):
+            column = self._columns.get(f'{type_name}{suffix}')
+            if column is not None:
+                matrix[:, t] = self._table[:, column]
+        return matrix
+
+    def price(self, name: str, regions=None):
+        """One price: a scalar for the first region, or a column matching `regions`."""
+        column = self._table[:, self._columns[name]]
+        return column[0] if regions is None else column[self._region_codes(regions, 0)]
+
+    def volume_costs(self, types, sizes, iops=None, throughput=None, regions=None) -> np.ndarray:
+        """EBS volumes' storage, plus provisioned IOPS and throughput beyond what their type includes.
+
+        Volume types without a known storage price cost UNKNOWN_VOLUME_TYPE_PRICE
+        per GB-month; missing IOPS or throughput (NaN) count as the included baseline.
+        """
+        sizes = np.asarray(sizes, dtype=np.float64)
+        if len(sizes) == 0:
+            return np.zeros(0)
+        type_codes, type_names = _factorize(types)
+        region_codes = self._region_codes(regions, len(sizes))
+        costs = sizes * self._type_prices(type_names, '', UNKNOWN_VOLUME_TYPE_PRICE)[region_codes, type_codes]
+        for provisioned, suffix, included in ((iops, '_iops', INCLUDED_IOPS),
+                                              (throughput, '_throughput', INCLUDED_THROUGHPUT)):
+            if provisioned is None:
+                continue
+            baseline = np.array([included.get(type_name, 0) for type_name in type_names], dtype=np.float64)[type_codes]
+            billable = np.fmax(np.asarray(provisioned, dtype=np.float64) - baseline, 0.0)
+            costs += np.nan_to_num(billable) * self._type_prices(type_names, suffix, 0.0)[region_codes, type_codes]
+        return costs
+
+    def conversion_savings(self, from_type: str, to_type: str, sizes, iops=None, throughput=None,
+                           regions=None) -> np.ndarray:
+        """Monthly saving of moving volumes between types at the same size and provisioned performance."""
+        types = pd.Categorical.from_codes(np.zeros(len(sizes), dtype=np.int8), [from_type])
+        new_types = pd.Categorical.from_codes(np.zeros(len(sizes), dtype=np.int8), [to_type])
+        return (self.volume_costs(types, sizes, iops, throughput, regions)
+                - self.volume_costs(new_types, sizes, iops, throughput, regions))
+
+    def snapshot_costs(self, sizes, regions=None) -> np.ndarray:
+        return np.asarray(sizes, dtype=np.float64) * self.price('snapshot', regions)
+
+    def eip_costs(self, count: int, regions=None) -> np.ndarray:
+        """Monthly cost of `count` unassociated Elastic IPs."""
+        hourly = self.price('eip', regions) if regions is not None else np.full(count, self.price('eip'))
+        return hourly * HOURS_PER_MONTH
+
+    @staticmethod
+    def instance_costs(hourly_prices) -> np.ndarray:
+        """Monthly cost of running instances at their on-demand hourly prices (NaN where unknown)."""
+        return np.asarray(hourly_prices, dtype=np.float64) * HOURS_PER_MONTH
+
+    @staticmethod
+    def yearly(monthly_costs):
+        return monthly_costs * MONTHS_PER_YEAR
+
+
+def find_duplicate_snapshots(snapshots: pd.DataFrame, snapshot_price: float,
+                             now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """Snapshots of volumes with more than one, the newest of each flagged and the others costed as savings.
+
+    `snapshots` needs SnapshotId, VolumeId, StartTime, Size and Description columns.
+    """
+    if snapshots.empty:
+        return pd.DataFrame()
+
+    volume_codes, volumes = pd.factorize(snapshots['VolumeId'], sort=True)
+    volume_counts = np.bincount(volume_codes)[volume_codes]
+    rows = np.flatnonzero(volume_counts > 1)
+    if len(rows) == 0:
+        return pd.DataFrame()
+
+    start_times = pd.DatetimeIndex(pd.to_datetime(snapshots['StartTime'], utc=True))[rows]
+    codes = volume_codes[rows]
+    counts = volume_counts[rows]
+    order = np.lexsort((start_times.asi8, codes, -counts))
+    rows, codes, counts, start_times = rows[order], codes[order], counts[order], start_times[order]
+
+    # Each volume's snapshots are now contiguous and oldest first, so its newest start time is the last one
+    group_starts = np.r_[True, codes[1:] != codes[:-1]]
+    group_ends = np.r_[group_starts[1:], True]
+    group_index = np.cumsum(group_starts) - 1
+    times = start_times.asi8
+    is_newest = times == times[group_ends][group_index]
+
+    sizes = snapshots['Size'].to_numpy()[rows]
+    monthly_cost = sizes * snapshot_price
+    now = now or pd.Timestamp.now(tz=timezone.utc)
+    age_days = (now - start_times).total_seconds().to_numpy() / (24 * 3600)
+
+    return pd.DataFrame({
+        'SnapshotId': snapshots['SnapshotId'].array.take(rows),
+        'VolumeId': pd.Categorical.from_codes(codes, volumes),
+        # Whole-second naive UTC timestamps render as '%Y-%m-%d %H:%M:%S' without building a string per row
+        'StartTime': start_times.tz_convert(None).floor('s').as_unit('s'),
+        'Size': sizes,
+        'Description': snapshots['Description'].array.take(rows).astype('category'),
+        'DuplicateCount': counts,
+        'IsNewest': is_newest,
+        'MonthlyCost': monthly_cost,
+        'PotentialMonthlySavings': np.where(is_newest, 0.0, monthly_cost),
+        'Age_Days': age_days.round(2)
+    }, copy=False)
+
+
+# Report -> (monthly savings column, storage column) totalled by its ReportSummary
+SUMMARY_COLUMNS = {
+    'all_stopped_instances': ('MonthlyCost', 'TotalStorageGB'),
+    'old_stopped_instances': ('MonthlyCost', 'TotalStorageGB'),
+    'oldest_instances': (None, None),
+    'duplicate_snapshots': ('PotentialMonthlySavings', 'Size'),
+    'top_gp2_instances': ('MonthlySavings', 'TotalGP2Storage'),
+    'unused_elastic_ips': ('MonthlyCost', None),
+    'idle_instances': ('MonthlyCost', None),
+    'idle_volumes': ('MonthlyCost', None),
+}
+# Reports whose savings add up to the total; old stopped instances are already among all stopped instances
+SAVINGS_REPORTS = ('all_stopped_instances', 'duplicate_snapshots', 'top_gp2_instances', 'unused_elastic_ips',
+                   'idle_instances', 'idle_volumes')
+
+
+@dataclass
+class ReportSummary:
+    """Totals of one report.
+
+    `actionable` counts the rows there is something to do about: every row,
+    except that the newest copy of each duplicated snapshot is kept.
+    `storage_gb` covers the actionable rows and `unpriced` counts rows whose
+    cost is unknown.
+    """
+    rows: int = 0
+    actionable: int = 0
+    monthly_savings: float = 0.0
+    storage_gb: float = 0
+    unpriced: int = 0
+    avg_age_days: Optional[float] = None
+    avg_stopped_days: Optional[float] = None
+
+    @classmethod
+    def of(cls, df: pd.DataFrame, savings_column: Optional[str] = None,
+           storage_column: Optional[str] = None) -> 'ReportSummary':
+        """Summarize a report, reading each column it needs once."""
+        if df.empty:
+            return cls()
+        actionable = ~df['IsNewest'].to_numpy(dtype=bool) if 'IsNewest' in df else None
+        summary = cls(rows=len(df), actionable=len(df) if actionable is None else int(np.count_nonzero(actionable)))
+        if savings_column:
+            savings = df[savings_column].to_numpy(dtype=np.float64)
+            unpriced = np.isnan(savings)
+            summary.unpriced = int(np.count_nonzero(unpriced))
+            summary.monthly_savings = float(savings[~unpriced].sum()) if summary.unpriced else float(savings.sum())
+        if storage_column:
+            storage = df[storage_column].to_numpy()
+            summary.storage_gb = (storage if actionable is None else storage[actionable]).sum().item()
+        if 'Age_Days' in df and 'StoppedDays' in df:
+            age_days, stopped_days = df['Age_Days'].mean(), df['StoppedDays'].mean()
+            summary.avg_age_days = None if pd.isna(age_days) else float(age_days)
+            summary.avg_stopped_days = None if pd.isna(stopped_days) else float(stopped_days)
+        return summary
+
+    @property
+    def yearly_savings(self) -> float:
+        return CostModel.yearly(self.monthly_savings)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields and yearly savings, rounded to two places so float noise never shows up as a change."""
+        values = dict(asdict(self), yearly_savings=self.yearly_savings)
+        return {name: round(value, 2) if isinstance(value, float) else value for name, value in values.items()}
+
+
+@dataclass
+class Recommendation:
+    title: str
+    monthly_savings: float
+    action: str
+
+
+@dataclass
+class AuditSummary:
+    """Every summary figure of an audit, computed once from its reports.
+
+    savings_summary.md, savings_summary.json, savings_summary.csv and
+    stopped_instances_summary.md are all rendered from it.
+    """
+    reports: Dict[str, ReportSummary]
+    pricing_fallbacks: List[str] = field(default_factory=list)
+    generated_at: datetime = field(default_factory=datetime.now)
+
+    @classmethod
+    def from_results(cls, audit_results: Dict[str, pd.DataFrame],
+                     pricing_fallbacks: Iterable[str] = ()) -> 'AuditSummary':
+        return cls(
+            reports={report_name: ReportSummary.of(df, *SUMMARY_COLUMNS.get(report_name, (None, None)))
+                     for report_name, df in audit_results.items()},
+            pricing_fallbacks=list(pricing_fallbacks)
+        )
+
+    def report(self, report_name: str) -> ReportSummary:
+        return self.reports.get(report_name) or ReportSummary()
+
+    @property
+    def monthly_savings(self) -> float:
+        return sum(self.report(report_name).monthly_savings for report_name in SAVINGS_REPORTS)
+
+    @property
+    def yearly_savings(self) -> float:
+        return CostModel.yearly(self.monthly_savings)
+
+    def recommendations(self) -> List[Recommendation]:
+        """Recommended actions, largest monthly savings first."""
+        old_stopped, duplicates = self.report('old_stopped_instances'), self.report('duplicate_snapshots')
+        gp2, eips = self.report('top_gp2_instances'), self.report('unused_elastic_ips')
+        idle_instances, idle_volumes = self.report('idle_instances'), self.report('idle_volumes')
+        recommendations = []
+        if old_stopped.rows:
+            recommendations.append(Recommendation(
+                "Delete old stopped instances (90+ days inactive)", old_stopped.monthly_savings,
+                f"Delete {old_stopped.rows} stopped instances that haven't been used in over 90 days"
+            ))
+        if duplicates.rows:
+            recommendations.append(Recommendation(
+                "Remove duplicate snapshots", duplicates.monthly_savings,
+                f"Delete {duplicates.actionable} duplicate snapshots while keeping the newest copy"
+            ))
+        if gp2.rows:
+            recommendations.append(Recommendation(
+                "Convert GP2 volumes to GP3", gp2.monthly_savings,
+                f"Convert {gp2.rows} instances from GP2 to GP3 storage"
+            ))
+        if eips.rows:
+            recommendations.append(Recommendation(
+                "Release unused Elastic IPs", eips.monthly_savings, f"Release {eips.rows} unused Elastic IPs"
+            ))
+        if idle_instances.rows or idle_volumes.rows:
+            recommendations.append(Recommendation(
+                "Stop or downsize idle resources", idle_instances.monthly_savings + idle_volumes.monthly_savings,
+                f"Review {idle_instances.rows} idle running instances and {idle_volumes.rows} idle volumes"
+            ))
+        recommendations.sort(key=lambda recommendation: recommendation.monthly_savings, reverse=True)
+        return recommendations
+
+    def to_markdown(self) -> str:
+        """The savings summary, savings_summary.md."""
+        summary = ["# Cost Savings Summary\n", f"Generated on: {self.generated_at.strftime('%Y-%m-%d %H:%M:%S')}\n"]
+        if self.pricing_fallbacks:
+            summary.append(f"\n> **Note:** live pricing was unavailable for {', '.join(self.pricing_fallbacks)}; "
+                           f"figures using these prices are approximate.")
+
+        stopped = self.report('all_stopped_instances')
+        if stopped.rows:
+            summary.append("\n## Stopped Instances Savings (if deleted)")
+            summary.append(f"- Monthly Savings: ${stopped.monthly_savings:.2f}")
+            summary.append(f"- Yearly Savings: ${stopped.yearly_savings:.2f}")
+            summary.append(f"- Number of Stopped Instances: {stopped.rows}")
+            summary.append(f"- Total Storage Being Paid For: {stopped.storage_gb:.2f} GB")
+            old_stopped = self.report('old_stopped_instances')
+            if old_stopped.rows:
+                summary.append("\n### Old Stopped Instances (90+ days)")
+                summary.append(f"- Monthly Savings: ${old_stopped.monthly_savings:.2f}")
+                summary.append(f"- Yearly Savings: ${old_stopped.yearly_savings:.2f}")
+                summary.append(f"- Number of Old Stopped Instances: {old_stopped.rows}")
+                summary.append(f"- Storage Used by Old Instances: {old_stopped.storage_gb:.2f} GB")
+
+        duplicates = self.report('duplicate_snapshots')
+        if duplicates.rows:
+            summary.append("\n## Duplicate Snapshot Savings")
+            summary.append(f"- Monthly Savings: ${duplicates.monthly_savings:.2f}")
+            summary.append(f"- Yearly Savings: ${duplicates.yearly_savings:.2f}")
+            summary.append(f"- Duplicate Snapshots That Can Be Removed: {duplicates.actionable}")
+            summary.append(f"- Total Size of Duplicate Snapshots: {duplicates.storage_gb} GB")
+
+        gp2 = self.report('top_gp2_instances')
+        if gp2.rows:
+            summary.append("\n## GP2 to GP3 Conversion Savings")
+            summary.append(f"- Monthly Savings: ${gp2.monthly_savings:.2f}")
+            summary.append(f"- Yearly Savings: ${gp2.yearly_savings:.2f}")
+            summary.append(f"- Total GP2 Storage: {gp2.storage_gb} GB")
+            summary.append(f"- Number of Instances: {gp2.rows}")
+
+        eips = self.report('unused_elastic_ips')
+        if eips.rows:
+            summary.append("\n## Unused Elastic IP Savings")
+            summary.append(f"- Monthly Savings: ${eips.monthly_savings:.2f}")
+            summary.append(f"- Yearly Savings: ${eips.yearly_savings:.2f}")
+            summary.append(f"- Number of unused IPs: {eips.rows}")
+
+        idle_instances, idle_volumes = self.report('idle_instances'), self.report('idle_volumes')
+        if idle_instances.rows or idle_volumes.rows:
+            idle_monthly = idle_instances.monthly_savings + idle_volumes.monthly_savings
+            summary.append(f"\n## Idle Resource Savings (last {IDLE_LOOKBACK_DAYS} days)")
+            summary.append(f"- Monthly Savings: ${idle_monthly:.2f}")
+            summary.append(f"- Yearly Savings: ${CostModel.yearly(idle_monthly):.2f}")
+            summary.append(f"- Idle Running Instances: {idle_instances.rows} (${idle_instances.monthly_savings:.2f}/month)")
+            summary.append(f"- Idle Attached Volumes: {idle_volumes.rows} (${idle_volumes.monthly_savings:.2f}/month)")
+            if idle_instances.unpriced:
+                summary.append(f"- Instances Without a Price: {idle_instances.unpriced}")
+
+        summary.append("\n## Total Potential Savings")
+        summary.append(f"- Monthly: ${self.monthly_savings:.2f}")
+        summary.append(f"- Yearly: ${self.yearly_savings:.2f}")
+
+        summary.append("\n## Recommendations by Priority")
+        for i, recommendation in enumerate(self.recommendations(), 1):
+            summary.append(f"\n{i}. {recommendation.title}")
+            summary.append(f"   - Monthly Savings: ${recommendation.monthly_savings:.2f}")
+            summary.append(f"   - Action: {recommendation.action}")
+        return '\n'.join(summary)
+
+    def stopped_instances_markdown(self) -> str:
+        """The stopped instance summary, stopped_instances_summary.md."""
+        summary = ["# Stopped Instances Cost Analysis\n",
+                   f"Generated on: {self.generated_at.strftime('%Y-%m-%d %H:%M:%S')}\n"]
+        for report_name, heading, label in (('all_stopped_instances', "All Stopped Instances", "Stopped Instances"),
+                                            ('old_stopped_instances', "Old Stopped Instances (90+ days)",
+                                             "Old Stopped Instances")):
+            stopped = self.report(report_name)
+            if stopped.rows:
+                summary.append(f"\n## {heading}")
+                summary.append(f"- Total {label}: {stopped.rows}")
+                summary.append(f"- Total Storage Used: {stopped.storage_gb:.2f} GB")
+                summary.append(f"- Monthly Cost: ${stopped.monthly_savings:.2f}")
+                summary.append(f"- Yearly Cost: ${stopped.yearly_savings:.2f}")
+        return '\n'.join(summary)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A JSON-serializable summary, stable enough to diff between runs."""
+        return {
+            'generated_at': self.generated_at.isoformat(timespec='seconds'),
+            'monthly_savings': round(self.monthly_savings, 2),
+            'yearly_savings': round(self.yearly_savings, 2),
+            'pricing_fallbacks': self.pricing_fallbacks,
+            'reports': {report_name: report.to_dict() for report_name, report in self.reports.items()},
+            'recommendations': [dict(asdict(recommendation), monthly_savings=round(recommendation.monthly_savings, 2))
+                                for recommendation in self.recommendations()],
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per report, savings_summary.csv."""
+        columns = {'rows': 'Rows', 'actionable': 'Actionable', 'monthly_savings': 'MonthlySavings',
+                   'yearly_savings': 'YearlySavings', 'storage_gb': 'StorageGB', 'unpriced': 'Unpriced',
+                   'avg_age_days': 'AvgAgeDays', 'avg_stopped_days': 'AvgStoppedDays'}
+        df = pd.DataFrame([report.to_dict() for report in self.reports.values()], columns=list(columns))
+        df.insert(0, 'report', list(self.reports))
+        return df.rename(columns=dict(columns, report='Report'))
+
+    def save(self, output_dir: str):
+        """Write savings_summary.md/.json/.csv, and stopped_instances_summary.md when stopped instances were analyzed."""
+        with open(f"{output_dir}/savings_summary.md", 'w') as f:
+            f.write(self.to_markdown())
+        with open(f"{output_dir}/savings_summary.json", 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        self.to_frame().to_csv(f"{output_dir}/savings_summary.csv", index=False)
+        if 'all_stopped_instances' in self.reports:
+            with open(f"{output_dir}/stopped_instances_summary.md", 'w') as f:
+                f.write(self.stopped_instances_markdown())
+
+
+class PricingCache:
+    """On-disk cache of Pricing API lookups, keyed by region and product filter.
+
+    Only the resolved USD price and its fetch time are stored per key. Entries
+    older than `ttl` seconds are stale; with `stale_while_revalidate` a stale
+    price is served immediately while a background thread refreshes it.
+    Writers in other processes (e.g. organization audit workers) are kept
+    apart with a lock file next to the cache, where `fcntl` is available.
+    """
+
+    _file_lock = threading.Lock()
+
+    def __init__(self, path: str = DEFAULT_PRICING_CACHE_PATH, ttl: float = DEFAULT_PRICING_CACHE_TTL,
+                 stale_while_revalidate: bool = False):
+        self.path = path
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self._entries: Optional[Dict[str, Dict[str, float]]] = None
+
+    @staticmethod
+    def key(region_name: str, filters: List[Dict[str, str]]) -> str:
+        return f"{region_name}|{json.dumps(filters, sort_keys=True, separators=(',', ':'))}"
+
+    def _read(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._file_lock:
+            if self._entries is None:
+                self._entries = self._read()
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return {'price': entry['price'], 'fresh': time.time() - entry['fetched_at'] < self.ttl}
+
+    @contextmanager
+    def _write_lock(self):
+        with self._file_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def put(self, key: str, price: float):
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with self._write_lock():
+                # Merge with what's on disk so concurrent auditors don't drop each other's entries
+                entries = self._read()
+                entries[key] = {'price': price, 'fetched_at': time.time()}
+                self._entries = entries
+                with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as f:
+                    json.dump(entries, f, separators=(',', ':'))
+                os.replace(f.name, self.path)
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Could not write pricing cache {self.path}: {e}")
+
+    def revalidate(self, key: str, fetch, logger: logging.Logger):
+        def refresh():
+            try:
+                price = fetch()
+                if price is not None:
+                    self.put(key, price)
+            except Exception as e:
+                logger.warning(f"Background pricing refresh failed: {e}")
+
+        threading.Thread(target=refresh, name='pricing-revalidate', daemon=True).start()
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+class AuditMetrics:
+    """API call statistics and stage timings for an audit.
+
+    API calls are measured through botocore event hooks on each attached
+    client: call count, errors, retries, throttled attempts and a latency
+    histogram per operation, where latency covers every attempt and backoff.
+    Stages are timed with `stage()`, recording the process's peak RSS so far
+    when each one ends.
+    """
 
-class AWSResourceAuditor:
     def __init__(self):
-        self.ec2 = boto3.client('ec2')
-        self.pricing = boto3.client('pricing', config=my_config)
-        self.output_dir = f"aws_audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.started = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        # (service, operation) -> call statistics
+        self.operations: Dict[tuple, Dict[str, Any]] = {}
+        # Stage name -> {'runs', 'seconds', 'peak_rss_bytes'}
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def attach(self, client):
+        """Measure a client's API calls; attaching the same client twice has no effect."""
+        events = client.meta.events
+        service = client.meta.service_model.service_id.hyphenize()
+        for event, handler in (('before-parameter-build', self._before_call), ('after-call', self._after_call),
+                               ('after-call-error', self._after_call_error), ('needs-retry', self._needs_retry)):
+            events.register(f'{event}.{service}', handler, unique_id=f'audit-metrics-{event}-{id(self)}')
+        return client
+
+    def _operation(self, service: str, operation: str) -> Dict[str, Any]:
+        stats = self.operations.get((service, operation))
+        if stats is None:
+            stats = self.operations[(service, operation)] = {
+                'calls': 0, 'errors': 0, 'retries': 0, 'throttles': 0, 'seconds': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS) + 1)
+            }
+        return stats
+
+    def _before_call(self, model, context, **kwargs):
+        context['audit_metrics'] = (model.service_model.service_name, model.name, time.perf_counter())
+
+    def _record(self, context, retries: int, error: bool):
+        if 'audit_metrics' not in context:
+            return
+        service, operation, start = context['audit_metrics']
+        elapsed = time.perf_counter() - start
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if elapsed <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            stats = self._operation(service, operation)
+            stats['calls'] += 1
+            stats['errors'] += error
+            stats['retries'] += retries
+            stats['seconds'] += elapsed
+            stats['buckets'][bucket] += 1
+
+    def _after_call(self, http_response, parsed, context, **kwargs):
+        self._record(context, parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0),
+                     http_response.status_code >= 300)
+
+    def _after_call_error(self, exception, context, **kwargs):
+        response = getattr(exception, 'response', None) or {}
+        self._record(context, response.get('ResponseMetadata', {}).get('RetryAttempts', 0), True)
+
+    def _needs_retry(self, response, operation, **kwargs):
+        # Called after every attempt, so throttled attempts are counted even when a retry then succeeds
+        if response is None or response[1].get('Error', {}).get('Code') not in THROTTLE_ERROR_CODES:
+            return None
+        with self._lock:
+            self._operation(operation.service_model.service_name, operation.name)['throttles'] += 1
+        return None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self.stages.setdefault(name, {'runs': 0, 'seconds': 0.0})
+                stats['runs'] += 1
+                stats['seconds'] += elapsed
+                stats['peak_rss_bytes'] = _peak_rss_bytes()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'started': self.started.isoformat(),
+                'duration_seconds': round(time.perf_counter() - self._start, 6),
+                'peak_rss_bytes': _peak_rss_bytes(),
+                'operations': [{
+                    'service': service, 'operation': operation,
+                    'calls': stats['calls'], 'errors': stats['errors'], 'retries': stats['retries'],
+                    'throttles': stats['throttles'], 'seconds': round(stats['seconds'], 6),
+                    'latency_histogram': dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ['+Inf'], stats['buckets']))
+                } for (service, operation), stats in sorted(self.operations.items())],
+                'stages': [dict(stage=name, **{key: round(value, 6) if isinstance(value, float) else value
+                                               for key, value in stats.items()})
+                           for name, stats in self.stages.items()]
+            }
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        trace = self.to_dict()
+        lines = []
+        counters = (('calls', 'API calls made'), ('errors', 'API calls that failed'),
+                    ('retries', 'API call retries'), ('throttles', 'Throttled API attempts'))
+        for counter, help_text in counters:
+            lines.append(f"# HELP aws_audit_api_{counter}_total {help_text}")
+            lines.append(f"# TYPE aws_audit_api_{counter}_total counter")
+            for op in trace['operations']:
+                lines.append(f'aws_audit_api_{counter}_total{{service="{op["service"]}",operation="{op["operation"]}"}} {op[counter]}')
+
+        lines.append("# HELP aws_audit_api_call_duration_seconds API call latency, including retries")
+        lines.append("# TYPE aws_audit_api_call_duration_seconds histogram")
+        for op in trace['operations']:
+            labels = f'service="{op["service"]}",operation="{op["operation"]}"'
+            cumulative = 0
+            for bound, count in op['latency_histogram'].items():
+                cumulative += count
+                lines.append(f'aws_audit_api_call_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'aws_audit_api_call_duration_seconds_sum{{{labels}}} {op["seconds"]}')
+            lines.append(f'aws_audit_api_call_duration_seconds_count{{{labels}}} {op["calls"]}')
+
+        lines.append("# HELP aws_audit_stage_duration_seconds Time spent in each audit stage")
+        lines.append("# TYPE aws_audit_stage_duration_seconds gauge")
+        for stage in trace['stages']:
+            lines.append(f'aws_audit_stage_duration_seconds{{stage="{stage["stage"]}"}} {stage["seconds"]}')
+        if trace['peak_rss_bytes'] is not None:
+            lines.append("# HELP aws_audit_peak_rss_bytes Peak resident set size of the audit process")
+            lines.append("# TYPE aws_audit_peak_rss_bytes gauge")
+            lines.append(f"aws_audit_peak_rss_bytes {trace['peak_rss_bytes']}")
+        return '\n'.join(lines) + '\n'
+
+    def save(self, output_dir: str):
+        """Write audit_trace.json and audit_metrics.prom to `output_dir`."""
+        with open(f"{output_dir}/audit_trace.json", 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        with open(f"{output_dir}/audit_metrics.prom", 'w') as f:
+            f.write(self.to_prometheus())
+
+
+class _ActionBucket:
+    """Token bucket for one region, service and API action whose refill rate adapts to throttling (AIMD)."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.last_decrease = 0.0
+        self.throttles = 0
+        self.waited = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateGovernor:
+    """Client-side request rate limit shared by every client, with one token bucket per region, service and action.
+
+    Each request attempt, retries included, takes a token before it is sent;
+    when none is left the calling thread sleeps until one is due, so
+    concurrent paginators and lookups queue for a single budget instead of
+    bursting into throttles. AWS throttles each region separately, so a
+    bucket covers one (region, service, action) and a throttle in one region
+    leaves the others' rates alone. A throttled response halves the bucket's rate
+    (at most once per second, so a burst of throttles counts once) and every
+    successful response adds `increase / rate`, i.e. about `increase`
+    requests/s per second at full throughput, between `min_rate` and `max_rate`.
+    """
+
+    def __init__(self, initial_rate: float = DEFAULT_ACTION_RATE, min_rate: float = 0.5, max_rate: float = 100.0,
+                 increase: float = 1.0, decrease: float = 0.5, rates: Optional[Dict[str, float]] = None):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        # Starting rates for specific actions, e.g. {'GetMetricData': 50}
+        self.initial_rates = rates or {}
+        self._buckets: Dict[Tuple[str, str, str], _ActionBucket] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, client):
+        """Govern a client's requests; attaching the same client twice has no effect."""
+        events = client.meta.events
+        service = client.meta.service_model.service_id.hyphenize()
+        events.register(f'before-send.{service}', self._before_send, unique_id=f'rate-governor-send-{id(self)}')
+        events.register(f'needs-retry.{service}', self._needs_retry, unique_id=f'rate-governor-retry-{id(self)}')
+        return client
+
+    def _bucket(self, key: Tuple[str, str, str]) -> _ActionBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate = self.initial_rates.get(key[2], self.initial_rate)
+            bucket = self._buckets[key] = _ActionBucket(rate, burst=rate)
+        return bucket
+
+    @staticmethod
+    def _region(context: Optional[Dict[str, Any]], url: Optional[str]) -> str:
+        region = (context or {}).get('client_region')
+        if region:
+            return region
+        # Fall back to the endpoint host, e.g. ec2.eu-west-1.amazonaws.com
+        host = urlsplit(url or '').hostname or ''
+        parts = host.split('.')
+        return parts[1] if len(parts) > 3 else host
+
+    def acquire(self, region: str, service: str, action: str):
+        """Take a token for one request, sleeping until it is available."""
+        with self._lock:
+            bucket = self._bucket((region, service, action))
+            bucket._refill(time.monotonic())
+            # Reserve the token now so concurrent callers queue up behind each other
+            bucket.tokens -= 1
+            delay = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+            bucket.waited += delay
+        if delay:
+            time.sleep(delay)
+
+    def _before_send(self, event_name: str, request=None, **kwargs):
+        _, service, action = event_name.split('.', 2)
+        region = self._region(getattr(request, 'context', None), getattr(request, 'url', None))
+        self.acquire(region, service, action)
+
+    def _needs_retry(self, response, operation, request_dict=None, **kwargs):
+        if response is None:
+            return None
+        throttled = response[1].get('Error', {}).get('Code') in THROTTLE_ERROR_CODES
+        request_dict = request_dict or {}
+        key = (self._region(request_dict.get('context'), request_dict.get('url')),
+               operation.service_model.service_id.hyphenize(), operation.name)
+        with self._lock:
+            bucket = self._bucket(key)
+            now = time.monotonic()
+            bucket._refill(now)
+            if throttled:
+                bucket.throttles += 1
+                if now - bucket.last_decrease >= 1.0:
+                    bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                    bucket.burst = max(1.0, bucket.rate)
+                    bucket.tokens = min(bucket.tokens, 0.0)
+                    bucket.last_decrease = now
+            elif response[0].status_code < 300:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase / bucket.rate)
+                bucket.burst = max(1.0, bucket.rate)
+        return None
+
+    def rates(self) -> Dict[str, Dict[str, float]]:
+        """Current rate, throttle count and total wait per bucket, keyed 'region/service/action'."""
+        with self._lock:
+            return {'/'.join(key): {'rate': round(bucket.rate, 3), 'throttles': bucket.throttles,
+                                    'waited_seconds': round(bucket.waited, 3)}
+                    for key, bucket in self._buckets.items()}
+
+
+class ReportWriter:
+    """Appends DataFrame chunks to one report data file."""
+
+    extension = ''
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        self.path = path
+        self.compression = compression
+
+    def write(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class _TextReportWriter(ReportWriter):
+    _openers = {None: open, 'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+    _suffixes = {None: '', 'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz'}
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        if compression not in self._openers:
+            raise ValueError(f"Unsupported compression for {self.extension} reports: {compression}")
+        super().__init__(path + self._suffixes[compression], compression)
+        self._file = self._openers[compression](self.path, 'wt')
+
+    def close(self):
+        self._file.close()
+
+
+class CsvReportWriter(_TextReportWriter):
+    extension = 'csv'
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        super().__init__(path, compression)
+        self._header = True
+
+    def write(self, df: pd.DataFrame):
+        df.to_csv(self._file, index=False, header=self._header)
+        self._header = False
+
+
+class JsonLinesReportWriter(_TextReportWriter):
+    extension = 'jsonl'
+
+    def write(self, df: pd.DataFrame):
+        self._file.write(df.to_json(orient='records', lines=True, date_format='iso').rstrip('\n') + '\n')
+
+
+class ParquetReportWriter(ReportWriter):
+    """Writes one Parquet row group per chunk; needs the optional pyarrow package."""
+
+    extension = 'parquet'
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        super().__init__(path, compression or 'snappy')
+        self._writer = None
+
+    def write(self, df: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self._writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._writer = pq.ParquetWriter(self.path, table.schema, compression=self.compression)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+# Report data formats selectable through AWSResourceAuditor(output_formats=...); 'md' is the capped markdown view
+REPORT_WRITERS = {
+    'csv': CsvReportWriter,
+    'jsonl': JsonLinesReportWriter,
+    'parquet': ParquetReportWriter,
+}
+
+
+class ResourceInventory:
+    """Fetches EC2 resources once per run and indexes them for the analyzers.
+
+    Each resource type is paged in on first access and reused by every
+    analyzer afterwards, so a full audit lists instances, volumes, snapshots
+    and addresses exactly once.
+
+    With `scan_all_volumes=False`, attached volumes for a handful of
+    instances are fetched with batched attachment filters instead of listing
+    every volume in the account.
+
+    With an InventoryStore as `store`, snapshots known from earlier runs are
+    read from it and only those started since the last sync are listed.
+
+    With an AuditCheckpoint as `checkpoint`, instance, volume and snapshot
+    listings save their progress as they page and resume from it.
+
+    With `shard_listings=True`, full volume and snapshot listings are split
+    into 16 streams by the first hex digit of the resource ID, paged in
+    parallel and merged, so a listing of millions of snapshots isn't bound
+    by the latency of one chain of pages.
+
+    A long-running process keeps the inventory current with `apply_changes`,
+    for resources re-described after a change, and `invalidate`.
+    """
+
+    def __init__(self, ec2_client, logger: Optional[logging.Logger] = None, scan_all_volumes: bool = True,
+                 store=None, checkpoint=None, shard_listings: bool = False):
+        self.ec2 = ec2_client
+        self.logger = logger or logging.getLogger(__name__)
+        self.scan_all_volumes = scan_all_volumes
+        self.store = store
+        self.checkpoint = checkpoint
+        self.shard_listings = shard_listings
+        self._instances: Optional[List[Dict[str, Any]]] = None
+        self._instances_by_id: Dict[str, Dict[str, Any]] = {}
+        self._volumes: Optional[List[Dict[str, Any]]] = None
+        self._volumes_by_instance: Dict[str, List[Dict[str, Any]]] = {}
+        self._volume_indexed_instances: set = set()
+        self._snapshots: Optional[List[Dict[str, Any]]] = None
+        self._addresses: Optional[List[Dict[str, Any]]] = None
+        # Resource attribute -> (page fetcher, hook that stores and indexes the full listing)
+        self._sources = {
+            '_instances': (self._fetch_instances, self._store_instances),
+            '_volumes': (self._fetch_volumes, self._store_volumes),
+            '_snapshots': (self._fetch_snapshots, self._store_snapshots),
+            '_addresses': (self._fetch_addresses, self._store_addresses),
+        }
+        # Analyzers may run concurrently; each resource type is loaded by one thread only
+        self._locks = {attr: threading.RLock() for attr in self._sources}
+
+    def _stream(self, attr: str) -> Iterator[Dict[str, Any]]:
+        """Yield one resource type's items, paging them in on first use and caching them for later callers.
+
+        The first caller consumes pages as they arrive; concurrent callers wait
+        for that listing to finish and then read the cache.
+        """
+        if getattr(self, attr) is None:
+            with self._locks[attr]:
+                if getattr(self, attr) is None:
+                    fetch, store = self._sources[attr]
+                    items = []
+                    for item in fetch():
+                        items.append(item)
+                        yield item
+                    store(items)
+                    return
+        yield from getattr(self, attr)
+
+    def _load(self, attr: str):
+        if getattr(self, attr) is None:
+            for _ in self._stream(attr):
+                pass
+        return getattr(self, attr)
+
+    @property
+    def instances(self) -> List[Dict[str, Any]]:
+        return self._load('_instances')
+
+    def iter_instances(self) -> Iterator[Dict[str, Any]]:
+        return self._stream('_instances')
+
+    def _pages(self, resource: str, operation: str, result_key: str, **kwargs) -> Iterator[List[Dict[str, Any]]]:
+        """Each page's `result_key` items, checkpointed under the region and `resource` when checkpointing."""
+        paginator = self.ec2.get_paginator(operation)
+        if self.checkpoint:
+            return self.checkpoint.paginate(f'{self.ec2.meta.region_name}.{resource}', paginator, result_key, **kwargs)
+        return (page[result_key] for page in paginator.paginate(**kwargs))
+
+    def _listing_pages(self, resource: str, operation: str, result_key: str,
+                       **kwargs) -> Iterator[List[Dict[str, Any]]]:
+        """Pages of a full listing, sharded by resource ID when `shard_listings` is set."""
+        if not self.shard_listings:
+            return self._pages(resource, operation, result_key, **kwargs)
+        return self._sharded_pages(resource, operation, result_key, **kwargs)
+
+    def _sharded_pages(self, resource: str, operation: str, result_key: str,
+                       **kwargs) -> Iterator[List[Dict[str, Any]]]:
+        """Page every ID shard of a listing on its own thread, yielding pages as they arrive."""
+        filter_name, prefix, id_key = SHARDED_LISTINGS[operation]
+        pages: queue.Queue = queue.Queue()
+        stop = threading.Event()
+
+        def list_shard(shard: str):
+            filters = kwargs.get('Filters', []) + [{'Name': filter_name, 'Values': [f'{prefix}{shard}*']}]
+            try:
+                for page in self._pages(f'{resource}.{shard}', operation, result_key, **dict(kwargs, Filters=filters)):
+                    if stop.is_set():
+                        return
+                    pages.put(page)
+            except Exception as e:
+                pages.put(e)
+                return
+            pages.put(None)
+
+        executor = ThreadPoolExecutor(max_workers=len(LISTING_SHARDS), thread_name_prefix=f'list-{resource}')
+        for shard in LISTING_SHARDS:
+            executor.submit(list_shard, shard)
+        seen: set = set()
+        remaining = len(LISTING_SHARDS)
+        try:
+            while remaining:
+                page = pages.get()
+                if page is None:
+                    remaining -= 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+                # Shards are disjoint, but a listing that changes while it's paged can repeat an item
+                page = [item for item in page if item[id_key] not in seen]
+                seen.update(map(itemgetter(id_key), page))
+                yield page
+        finally:
+            # Also reached when the caller stops early or a shard fails; the rest stop at their next page
+            stop.set()
+            executor.shutdown(wait=False)
+
+    def _fetch_instances(self) -> Iterator[Dict[str, Any]]:
+        self.logger.info("Loading EC2 instance inventory...")
+        filters = [{'Name': 'instance-state-name', 'Values': LIVE_INSTANCE_STATES}]
+        for reservations in self._pages('instances', 'describe_instances', 'Reservations', Filters=filters):
+            for reservation in reservations:
+                yield from reservation['Instances']
+
+    def _store_instances(self, instances: List[Dict[str, Any]]):
+        self._instances_by_id = {instance['InstanceId']: instance for instance in instances}
+        self._instances = instances
+        self.logger.info(f"Loaded {len(instances)} instances")
+
+    @property
+    def instances_loaded(self) -> bool:
+        return self._instances is not None
+
+    @property
+    def instances_by_id(self) -> Dict[str, Dict[str, Any]]:
+        self.instances
+        return self._instances_by_id
+
+    def instances_in_state(self, *states: str) -> List[Dict[str, Any]]:
+        return [instance for instance in self.iter_instances() if instance['State']['Name'] in states]
+
+    @property
+    def volumes(self) -> List[Dict[str, Any]]:
+        return self._load('_volumes')
+
+    def iter_volumes(self) -> Iterator[Dict[str, Any]]:
+        return self._stream('_volumes')
+
+    def _fetch_volumes(self) -> Iterator[Dict[str, Any]]:
+        self.logger.info("Loading EBS volume inventory...")
+        for volumes in self._listing_pages('volumes', 'describe_volumes', 'Volumes'):
+            yield from volumes
+
+    def _store_volumes(self, volumes: List[Dict[str, Any]]):
+        by_instance: Dict[str, List[Dict[str, Any]]] = {}
+        for volume in volumes:
+            for attachment in volume.get('Attachments', []):
+                by_instance.setdefault(attachment['InstanceId'], []).append(volume)
+        self._volumes_by_instance = by_instance
+        self._volumes = volumes
+        self.logger.info(f"Loaded {len(volumes)} volumes")
+
+    @property
+    def volumes_loaded(self) -> bool:
+        return self._volumes is not None
+
+    def volumes_for_instance(self, instance_id: str) -> List[Dict[str, Any]]:
+        return self.volumes_for_instances([instance_id])[instance_id]
+
+    def volumes_for_instances(self, instance_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Return the volumes attached to each instance, keyed by instance ID."""
+        if self._volumes is not None or self.scan_all_volumes:
+            self.volumes
+        else:
+            with self._locks['_volumes']:
+                missing = [iid for iid in dict.fromkeys(instance_ids) if iid not in self._volume_indexed_instances]
+                for start in range(0, len(missing), ATTACHMENT_FILTER_BATCH_SIZE):
+                    self._load_attached_volumes(missing[start:start + ATTACHMENT_FILTER_BATCH_SIZE])
+        return {iid: self._volumes_by_instance.get(iid, []) for iid in instance_ids}
+
+    def _load_attached_volumes(self, instance_ids: List[str]):
+        wanted = set(instance_ids)
+        paginator = self.ec2.get_paginator('describe_volumes')
+        for page in paginator.paginate(Filters=[{'Name': 'attachment.instance-id', 'Values': instance_ids}]):
+            for volume in page['Volumes']:
+                for attachment in volume.get('Attachments', []):
+                    if attachment['InstanceId'] in wanted:
+                        self._volumes_by_instance.setdefault(attachment['InstanceId'], []).append(volume)
+        self._volume_indexed_instances.update(wanted)
+
+    @property
+    def snapshots(self) -> List[Dict[str, Any]]:
+        return self._load('_snapshots')
+
+    def iter_snapshots(self) -> Iterator[Dict[str, Any]]:
+        return self._stream('_snapshots')
+
+    def _fetch_snapshots(self) -> Iterator[Dict[str, Any]]:
+        start_days = self.store.snapshot_start_time_filter(self.ec2.meta.region_name) if self.store else None
+        if start_days is None:
+            yield from self._list_all_snapshots()
+            return
+
+        region = self.ec2.meta.region_name
+        self.logger.info(f"Loading EBS snapshots started since {start_days[0][:-2]}...")
+        new_snapshots = []
+        for page in self._pages('recent_snapshots', 'describe_snapshots', 'Snapshots', OwnerIds=['self'],
+                                Filters=[{'Name': 'start-time', 'Values': start_days}]):
+            new_snapshots.extend(page)
+        self.store.save_snapshots(region, new_snapshots, full=False)
+        self.logger.info(f"Listed {len(new_snapshots)} recent snapshots, reading the rest from {self.store.path}")
+        snapshots = self.store.load_snapshots(region)
+
+        # Stored snapshots may have been deleted since; check the ones reported as duplicates still exist
+        listed = {snapshot['SnapshotId'] for snapshot in new_snapshots}
+        per_volume: Dict[str, int] = {}
+        for snapshot in snapshots:
+            if 'VolumeId' in snapshot:
+                per_volume[snapshot['VolumeId']] = per_volume.get(snapshot['VolumeId'], 0) + 1
+        candidates = [snapshot['SnapshotId'] for snapshot in snapshots
+                      if per_volume.get(snapshot.get('VolumeId'), 0) > 1 and snapshot['SnapshotId'] not in listed]
+        if len(candidates) / MAX_SNAPSHOT_FILTER_VALUES > len(snapshots) / SNAPSHOT_LISTING_PAGE_SIZE:
+            self.logger.info(f"Checking {len(candidates)} stored snapshots would take more calls than listing them all")
+            yield from self._list_all_snapshots()
+            return
+        existing = set()
+        paginator = self.ec2.get_paginator('describe_snapshots')
+        for start in range(0, len(candidates), MAX_SNAPSHOT_FILTER_VALUES):
+            # A filter rather than SnapshotIds, so deleted IDs are left out instead of failing the call
+            ids = candidates[start:start + MAX_SNAPSHOT_FILTER_VALUES]
+            for page in paginator.paginate(OwnerIds=['self'], Filters=[{'Name': 'snapshot-id', 'Values': ids}]):
+                existing.update(snapshot['SnapshotId'] for snapshot in page['Snapshots'])
+        deleted = set(candidates) - existing
+        if deleted:
+            self.logger.info(f"Dropping {len(deleted)} stored snapshots deleted since they were listed")
+            self.store.delete_snapshots(region, deleted)
+            snapshots = [snapshot for snapshot in snapshots if snapshot['SnapshotId'] not in deleted]
+        yield from snapshots
+
+    def _list_all_snapshots(self) -> Iterator[Dict[str, Any]]:
+        self.logger.info("Loading EBS snapshot inventory...")
+        snapshots = []
+        for page in self._listing_pages('snapshots', 'describe_snapshots', 'Snapshots', OwnerIds=['self']):
+            snapshots.extend(page)
+            yield from page
+        if self.store:
+            self.store.save_snapshots(self.ec2.meta.region_name, snapshots, full=True)
+
+    def _store_snapshots(self, snapshots: List[Dict[str, Any]]):
+        self._snapshots = snapshots
+        self.logger.info(f"Loaded {len(snapshots)} snapshots")
+
+    @property
+    def addresses(self) -> List[Dict[str, Any]]:
+        return self._load('_addresses')
+
+    def _fetch_addresses(self) -> Iterator[Dict[str, Any]]:
+        self.logger.info("Loading Elastic IP inventory...")
+        return iter(self.ec2.describe_addresses()['Addresses'])
+
+    def _store_addresses(self, addresses: List[Dict[str, Any]]):
+        self._addresses = addresses
+
+    def apply_changes(self, resource: str, changed: List[Dict[str, Any]], removed: Iterable[str] = ()) -> bool:
+        """Add or replace the `changed` items of a loaded listing and drop the `removed` IDs, re-indexing it.
+
+        Returns False, changing nothing, when the listing isn't loaded yet;
+        it is listed in full on first use instead.
+        """
+        attr = f'_{resource}'
+        id_key = RESOURCE_ID_KEYS[resource]
+        with self._locks[attr]:
+            items = getattr(self, attr)
+            if items is None:
+                return False
+            changed_by_id = {item[id_key]: item for item in changed}
+            removed = set(removed) - set(changed_by_id)
+            # A new list rather than an edit in place, so analyzers still reading the old one aren't disturbed;
+            # changed items keep their place, so reports order ties as a fresh listing would
+            updated = [changed_by_id.pop(item[id_key], item) for item in items if item[id_key] not in removed]
+            self._sources[attr][1](updated + list(changed_by_id.values()))
+            return True
+
+    def invalidate(self, resource: str):
+        """Drop a listing, so it's listed afresh on next use."""
+        attr = f'_{resource}'
+        with self._locks[attr]:
+            setattr(self, attr, None)
+
+
+class InstanceNameResolver:
+    """Resolves instance IDs to their Name tag, shared by every analyzer in a run.
+
+    IDs are answered from the inventory when it is already loaded, otherwise
+    looked up with batched describe_instances calls. Every answer is cached,
+    so no ID is looked up twice.
+    """
+
+    def __init__(self, ec2_client, inventory: ResourceInventory, logger: Optional[logging.Logger] = None):
+        self.ec2 = ec2_client
+        self.inventory = inventory
+        self.logger = logger or logging.getLogger(__name__)
+        self._names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def name_from_tags(instance: Dict[str, Any]) -> str:
+        tags = instance.get('Tags', [])
+        return next((tag['Value'] for tag in tags if tag['Key'] == 'Name'), 'No Name')
+
+    def resolve(self, instance_ids) -> Dict[str, str]:
+        with self._lock:
+            missing = [iid for iid in dict.fromkeys(instance_ids) if iid not in self._names]
+            if missing:
+                if self.inventory.instances_loaded:
+                    by_id = self.inventory.instances_by_id
+                    for iid in missing:
+                        instance = by_id.get(iid)
+                        self._names[iid] = self.name_from_tags(instance) if instance else 'Unknown'
+                else:
+                    for start in range(0, len(missing), INSTANCE_ID_BATCH_SIZE):
+                        self._lookup(missing[start:start + INSTANCE_ID_BATCH_SIZE])
+            return {iid: self._names[iid] for iid in instance_ids}
+
+    def forget(self, instance_ids):
+        """Drop cached names, e.g. of instances that were renamed or terminated."""
+        with self._lock:
+            for iid in instance_ids:
+                self._names.pop(iid, None)
+
+    def _lookup(self, instance_ids: List[str]):
+        try:
+            paginator = self.ec2.get_paginator('describe_instances')
+            for page in paginator.paginate(InstanceIds=instance_ids):
+                for reservation in page['Reservations']:
+                    for instance in reservation['Instances']:
+                        self._names[instance['InstanceId']] = self.name_from_tags(instance)
+        except botocore_exceptions.ClientError as e:
+            # One unknown ID fails the whole batch, so split it to isolate the bad ones
+            if e.response['Error']['Code'].startswith('InvalidInstanceID') and len(instance_ids) > 1:
+                middle = len(instance_ids) // 2
+                self._lookup(instance_ids[:middle])
+                self._lookup(instance_ids[middle:])
+                return
+            self.logger.warning(f"Could not resolve names for {', '.join(instance_ids)}: {e}")
+        for iid in instance_ids:
+            self._names.setdefault(iid, 'Unknown')
+
+
+class _RegionLogger(logging.LoggerAdapter):
+    def process(self, msg, kwargs):
+        return f"[{self.extra['region']}] {msg}", kwargs
+
+
+class AWSResourceAuditor:
+    def __init__(self, region_name: Optional[str] = None, output_dir: Optional[str] = None,
+                 session: Optional[boto3.session.Session] = None, ec2_client=None, pricing_client=None,
+                 max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS, pricing_cache=True,
+                 price_index: Optional[str] = None, output_formats=DEFAULT_OUTPUT_FORMATS,
+                 compression: Optional[str] = None, markdown_max_rows: Optional[int] = DEFAULT_MARKDOWN_MAX_ROWS,
+                 inventory_store=None, metrics: Optional[AuditMetrics] = None, profile_analyzers: bool = False,
+                 rate_governor=True, cloudwatch_client=None, metric_workers: int = DEFAULT_METRIC_WORKERS,
+                 checkpoint=None, resume: bool = False, shard_listings: bool = False):
+        """`pricing_cache` is a PricingCache, True for the default on-disk cache, or False to disable it.
+
+        `price_index` is a database built by aws_price_index.py from the bulk
+        EC2 offer file; when given, all prices come from it and the Pricing API
+        is never called.
+
+        `output_formats` picks the report files written: any of 'csv', 'jsonl',
+        'parquet' (with optional `compression`) and 'md', a markdown view of
+        the first `markdown_max_rows` rows (None for all) that links the full data.
+
+        `inventory_store` is a path to (or an open) aws_inventory_store.InventoryStore;
+        when given, audits run incrementally and write a delta report against
+        the previous run.
+
+        API calls and stage timings are collected in `metrics` (a new
+        AuditMetrics unless one is shared in) and saved with the reports.
+        `profile_analyzers` also writes a cProfile dump per analyzer.
+
+        `rate_governor` is a RateGovernor shared by every client (and by
+        regional auditors), True for a default one, or False to send requests
+        unthrottled.
+
+        Idle-resource metrics are fetched with up to `metric_workers`
+        concurrent GetMetricData calls.
+
+        `checkpoint` is an aws_audit_checkpoint.AuditCheckpoint, True for one in
+        `<output_dir>/checkpoints`, or None; listings and finished analyzers are
+        then checkpointed as the audit runs. `resume` continues from the
+        checkpoints an interrupted audit left in `output_dir`.
+
+        `shard_listings` lists volumes and snapshots as 16 parallel streams
+        split by resource ID instead of one chain of pages.
+        """
+        unknown_formats = set(output_formats) - set(REPORT_WRITERS) - {'md'}
+        if unknown_formats:
+            raise ValueError(f"Unknown output formats: {', '.join(sorted(unknown_formats))}")
+        text_formats = [fmt for fmt in output_formats if issubclass(REPORT_WRITERS.get(fmt, ReportWriter), _TextReportWriter)]
+        if text_formats and compression not in _TextReportWriter._openers:
+            raise ValueError(f"Compression {compression} is not supported for {', '.join(text_formats)} reports")
+        if 'parquet' in output_formats:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("Parquet reports need the optional pyarrow package: pip install pyarrow")
+        if price_index and not os.path.isfile(price_index):
+            raise FileNotFoundError(f"No price index at {price_index}; build one with aws_price_index.py")
+        self.output_formats = tuple(output_formats)
+        self.compression = compression
+        self.markdown_max_rows = markdown_max_rows
+        self.price_index = price_index
+        if isinstance(inventory_store, str):
+            from aws_inventory_store import InventoryStore
+            inventory_store = InventoryStore(inventory_store)
+        self.inventory_store = inventory_store
+        self.region_name = region_name
+        self.max_pool_connections = max_pool_connections
+        self.metrics = metrics or AuditMetrics()
+        self.profile_analyzers = profile_analyzers
+        self.rate_governor = RateGovernor() if rate_governor is True else (rate_governor or None)
+        self.metric_workers = metric_workers
+        self.shard_listings = shard_listings
+        # Session, clients and inventory are created on first use, so a targeted run only builds what it needs
+        self._lazy_lock = threading.RLock()
+        self._session = session
+        self._ec2 = self._instrument(ec2_client) if ec2_client else None
+        self._pricing = self._instrument(pricing_client) if pricing_client else None
+        self._cloudwatch = self._instrument(cloudwatch_client) if cloudwatch_client else None
+        self._inventory: Optional[ResourceInventory] = None
+        self._names: Optional[InstanceNameResolver] = None
+        self._prices_db = None
+        # Analyzers that timed out but whose threads can't be stopped, still using the shared resources
+        self._stragglers: List[Future] = []
+        # Prices are fetched by name as analyzers first ask for them
+        self._pricing_data: Dict[str, float] = {}
+        self._priced: set = set()
+        self._pricing_lock = threading.Lock()
+        # Price name -> where it came from: 'api', 'cache', 'revalidating cache', 'stale cache',
+        # 'price index' or 'default'
+        self.pricing_sources: Dict[str, str] = {}
+        self.pricing_fallbacks: List[str] = []
+        # Instance type -> lookup of its on-demand hourly price, resolving to None when it couldn't be priced
+        self._instance_prices: Dict[str, Future] = {}
+        self._instance_prices_lock = threading.Lock()
+        self.pricing_cache = PricingCache() if pricing_cache is True else (pricing_cache or None)
+        self.output_dir = output_dir or f"aws_audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         os.makedirs(self.output_dir, exist_ok=True)
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f"{self.output_dir}/audit.log"),
-                logging.StreamHandler()
-            ]
-        )
+        if checkpoint is True or (resume and not checkpoint):
+            from aws_audit_checkpoint import AuditCheckpoint
+            checkpoint = AuditCheckpoint(os.path.join(self.output_dir, 'checkpoints'), resume=resume)
+        self.checkpoint = checkpoint
+
         self.logger = logging.getLogger(__name__)
-        self.pricing_data = self._get_pricing_data()
+        if region_name:
+            self.logger = _RegionLogger(self.logger, {'region': region_name})
+
+    def _lazy(self, attr: str, create):
+        value = getattr(self, attr)
+        if value is None:
+            with self._lazy_lock:
+                value = getattr(self, attr)
+                if value is None:
+                    value = create()
+                    setattr(self, attr, value)
+        return value
+
+    def _client(self, service_name: str, **kwargs):
+        with _session_lock(self.session):
+            return self._instrument(self.session.client(service_name, **kwargs))
+
+    @property
+    def session(self) -> boto3.session.Session:
+        return self._lazy('_session', boto3.session.Session)
+
+    @property
+    def ec2(self):
+        return self._lazy('_ec2', lambda: self._client(
+            'ec2', region_name=self.region_name,
+            config=_client_config(max_pool_connections=self.max_pool_connections, retries={'max_attempts': 10})
+        ))
+
+    @property
+    def pricing(self):
+        return self._lazy('_pricing', lambda: self._client('pricing', config=_client_config(**PRICING_CLIENT_CONFIG)))
+
+    @property
+    def cloudwatch(self):
+        return self._lazy('_cloudwatch', lambda: self._client(
+            'cloudwatch', region_name=self.ec2.meta.region_name,
+            config=_client_config(max_pool_connections=self.max_pool_connections, retries={'max_attempts': 10})
+        ))
+
+    @property
+    def prices_db(self):
+        """The price index, opened on first use and shared by every lookup until the audit ends."""
+        def open_index():
+            from aws_price_index import PriceIndex
+            return PriceIndex(self.price_index, self.logger)
+        return self._lazy('_prices_db', open_index)
+
+    def _stragglers_running(self) -> bool:
+        return any(not future.done() for future in self._stragglers)
+
+    def _close_prices_db(self):
+        if self._stragglers_running():
+            # Closed when garbage collected instead, once the last timed-out analyzer lets go of it
+            self.logger.info("Leaving the price index open for timed-out analyzers that are still running")
+            return
+        with self._lazy_lock:
+            if self._prices_db is not None:
+                self._prices_db.close()
+                self._prices_db = None
+
+    @property
+    def inventory(self) -> ResourceInventory:
+        if self._inventory is None:
+            with self._lazy_lock:
+                if self._inventory is None:
+                    # Standalone analyzer calls look up attached volumes per instance instead of listing them all
+                    self._reset_inventory(scan_all_volumes=False)
+        return self._inventory
+
+    @property
+    def names(self) -> InstanceNameResolver:
+        self.inventory
+        return self._names
+
+    def load_pricing(self, *names: str) -> Dict[str, float]:
+        """Prices by name, fetching any of `names` (default: every standard price) not fetched yet."""
+        names = names or tuple(DEFAULT_PRICES)
+        with self._pricing_lock:
+            missing = [name for name in names if name not in self._priced]
+            if missing:
+                if self.price_index:
+                    # One local lookup answers every price, so load them all at once
+                    missing = list(DEFAULT_PRICES)
+                with self.metrics.stage('pricing'):
+                    self._pricing_data.update(self._get_pricing_data(missing))
+                self._priced.update(missing)
+            return self._pricing_data
+
+    @property
+    def pricing_data(self) -> Dict[str, float]:
+        return self.load_pricing()
+
+    @pricing_data.setter
+    def pricing_data(self, prices: Dict[str, float]):
+        with self._pricing_lock:
+            self._pricing_data = dict(prices)
+            self._priced.update(prices)
+
+    def cost_model(self, *names: str) -> CostModel:
+        """A CostModel over this region's prices, fetching any of `names` (default: every standard price) first."""
+        return CostModel({self.ec2.meta.region_name: self.load_pricing(*names)})
+
+    def _instrument(self, client):
+        """Attach the audit's metrics and rate governor to a client."""
+        if self.rate_governor:
+            self.rate_governor.attach(client)
+        return self.metrics.attach(client)
+
+    @staticmethod
+    def _pricing_queries(region_name: str) -> Dict[str, List[Dict[str, str]]]:
+        """Pricing API filters for every price the analyzers need, keyed by price name."""
+        region_prefix = region_name.split('-')[0].upper()
+        queries = {
+            volume_type: [
+                {'Type': 'TERM_MATCH', 'Field': 'volumeApiName', 'Value': volume_type},
+                {'Type': 'TERM_MATCH', 'Field': 'productFamily', 'Value': 'Storage'},
+                {'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_name}
+            ] for volume_type in VOLUME_TYPES
+        }
+        for volume_type in IOPS_PRICED_VOLUME_TYPES:
+            queries[f'{volume_type}_iops'] = [
+                {'Type': 'TERM_MATCH', 'Field': 'volumeApiName', 'Value': volume_type},
+                {'Type': 'TERM_MATCH', 'Field': 'productFamily', 'Value': 'System Operation'},
+                {'Type': 'TERM_MATCH', 'Field': 'group', 'Value': 'EBS IOPS'},
+                {'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_name}
+            ]
+        for volume_type in THROUGHPUT_PRICED_VOLUME_TYPES:
+            queries[f'{volume_type}_throughput'] = [
+                {'Type': 'TERM_MATCH', 'Field': 'volumeApiName', 'Value': volume_type},
+                {'Type': 'TERM_MATCH', 'Field': 'productFamily', 'Value': 'Provisioned Throughput'},
+                {'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_name}
+            ]
+        return {
+            **queries,
+            'eip': [
+                {'Type': 'TERM_MATCH', 'Field': 'productFamily', 'Value': 'IP Address'},
+                {'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_name}
+            ],
+            'snapshot': [
+                {'Type': 'TERM_MATCH', 'Field': 'productFamily', 'Value': 'Storage Snapshot'},
+                {'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_name},
+                {'Type': 'TERM_MATCH', 'Field': 'usagetype', 'Value': f'{region_prefix}-EBS:SnapshotUsage'}
+            ]
+        }
+
+    @staticmethod
+    def _instance_pricing_query(region_name: str, instance_type: str, operating_system: str) -> List[Dict[str, str]]:
+        """Pricing API filters for plain on-demand capacity of an instance type."""
+        return [
+            {'Type': 'TERM_MATCH', 'Field': 'instanceType', 'Value': instance_type},
+            {'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_name},
+            {'Type': 'TERM_MATCH', 'Field': 'operatingSystem', 'Value': operating_system},
+            {'Type': 'TERM_MATCH', 'Field': 'tenancy', 'Value': 'Shared'},
+            {'Type': 'TERM_MATCH', 'Field': 'preInstalledSw', 'Value': 'NA'},
+            {'Type': 'TERM_MATCH', 'Field': 'capacitystatus', 'Value': 'Used'}
+        ]
+
+    def _fetch_price(self, filters: List[Dict[str, str]], usagetype_contains: Optional[str] = None) -> Optional[float]:
+        response = self.pricing.get_products(ServiceCode='AmazonEC2', Filters=filters)
+        for price_item in response['PriceList']:
+            price_data = json.loads(price_item)
+            if usagetype_contains and usagetype_contains not in price_data['product']['attributes'].get('usagetype', ''):
+                continue
+            on_demand = next(iter(price_data['terms']['OnDemand'].values()))
+            dimension = next(iter(on_demand['priceDimensions'].values()))
+            usd = float(dimension['pricePerUnit']['USD'])
+            # Throughput is published per GiBps-month in some regions; the cost model prices MiB/s-months
+            return usd / 1024 if dimension.get('unit', '').lower().startswith('gibps') else usd
+        return None
+
+    def _get_pricing_data(self, names: List[str]) -> Dict[str, float]:
+        """Fetch the named prices, recording each one's source in `pricing_sources`.
 
-    def _get_pricing_data(self) -> Dict[str, float]:
+        Names the Pricing API isn't queried for (other volume types) are only
+        answered by a price index.
+        """
         region_name = self.ec2.meta.region_name
-        self.logger.info(f"Gathering pricing information for {region_name}...")
+        self.logger.info(f"Gathering {', '.join(names)} pricing information for {region_name}...")
         prices = {}
-        
-        try:
-            gp2_response = self.pricing.get_products(
-                ServiceCode='AmazonEC2',
-                Filters=[
-                    {'Type': 'TERM_MATCH', 'Field': 'volumeApiName', 'Value': 'gp2'},
-                    {'Type': 'TERM_MATCH', 'Field': 'productFamily', 'Value': 'Storage'},
-                    {'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_name}
-                ]
-            )
-            if gp2_response['PriceList']:
-                prices['gp2'] = float(list(list(eval(gp2_response['PriceList'][0])['terms']['OnDemand'].values())[0]['priceDimensions'].values())[0]['pricePerUnit']['USD'])
-
-            gp3_response = self.pricing.get_products(
-                ServiceCode='AmazonEC2',
-                Filters=[
-                    {'Type': 'TERM_MATCH', 'Field': 'volumeApiName', 'Value': 'gp3'},
-                    {'Type': 'TERM_MATCH', 'Field': 'productFamily', 'Value': 'Storage'},
-                    {'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_name}
-                ]
-            )
-            if gp3_response['PriceList']:
-                prices['gp3'] = float(list(list(eval(gp3_response['PriceList'][0])['terms']['OnDemand'].values())[0]['priceDimensions'].values())[0]['pricePerUnit']['USD'])
-
-            eip_response = self.pricing.get_products(
-                ServiceCode='AmazonEC2',
-                Filters=[
-                    {'Type': 'TERM_MATCH', 'Field': 'productFamily', 'Value': 'IP Address'},
-                    {'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_name}
-                ]
-            )
-            if eip_response['PriceList']:
-                prices['eip'] = float(list(list(eval(eip_response['PriceList'][0])['terms']['OnDemand'].values())[0]['priceDimensions'].values())[0]['pricePerUnit']['USD'])
-
-            region_prefix = region_name.split('-')[0].upper()
-            snapshot_response = self.pricing.get_products(
-                ServiceCode='AmazonEC2',
-                Filters=[
-                    {'Type': 'TERM_MATCH', 'Field': 'productFamily', 'Value': 'Storage Snapshot'},
-                    {'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_name},
-                    {'Type': 'TERM_MATCH', 'Field': 'usagetype', 'Value': f'{region_prefix}-EBS:SnapshotUsage'}
-                ]
-            )
-            if snapshot_response['PriceList']:
-                for price_item in snapshot_response['PriceList']:
-                    price_data = eval(price_item)
-                    if 'SnapshotUsage' in price_data['product']['attributes'].get('usagetype', ''):
-                        prices['snapshot'] = float(
-                            list(list(price_data['terms']['OnDemand'].values())[0]['priceDimensions'].values())[0]['pricePerUnit']['USD']
-                        )
-                        break
-                
-                if 'snapshot' not in prices:
-                    self.logger.warning(f"Could not find regular snapshot pricing for region {region_name}, using default")
-                    prices['snapshot'] = 0.05 
+        sources: Dict[str, str] = {}
 
-        except Exception as e:
-            self.logger.error(f"Error fetching pricing data: {e}")
-            prices = {'gp2': 0.10, 'gp3': 0.08, 'eip': 0.005, 'snapshot': 0.05}
-            self.logger.info("Falling back to approximate pricing...")
-            
+        if self.price_index:
+            prices = self.prices_db.pricing_data(region_name)
+            sources = {name: 'price index' for name in prices}
+            for name, default in DEFAULT_PRICES.items():
+                if name not in prices:
+                    self.logger.warning(f"No {name} price in {self.price_index} for region {region_name}, using default")
+                    prices[name] = default
+                    sources[name] = 'default'
+        else:
+            queries = self._pricing_queries(region_name)
+            for name in names:
+                if name not in queries:
+                    continue
+                filters = queries[name]
+                usagetype_contains = 'SnapshotUsage' if name == 'snapshot' else None
+                fetch = lambda filters=filters, usagetype_contains=usagetype_contains: self._fetch_price(filters, usagetype_contains)
+                price, source = self._cached_price(PricingCache.key(region_name, filters), fetch, name, region_name)
+                if price is not None:
+                    prices[name] = price
+                    sources[name] = source
+                else:
+                    self.logger.warning(f"Could not find {name} pricing for region {region_name}, using default")
+                    prices[name] = DEFAULT_PRICES[name]
+                    sources[name] = 'default'
+
+        self.pricing_sources.update(sources)
+        self.pricing_fallbacks.extend(
+            f"{name} ({region_name}, {source})" for name, source in sources.items()
+            if source in ('default', 'stale cache')
+        )
         return prices
 
+    def _cached_price(self, cache_key: str, fetch: Callable[[], Optional[float]], label: str,
+                      region_name: str) -> Tuple[Optional[float], Optional[str]]:
+        """A price and its source from the pricing cache or `fetch`, or (None, None) when neither has it.
+
+        Fresh entries are used as is; stale ones are served while they
+        revalidate in the background if the cache allows it, and otherwise
+        only when the fetch fails.
+        """
+        cached = self.pricing_cache.get(cache_key) if self.pricing_cache else None
+        if cached and cached['fresh']:
+            return cached['price'], 'cache'
+        if cached and self.pricing_cache.stale_while_revalidate:
+            self.pricing_cache.revalidate(cache_key, fetch, self.logger)
+            return cached['price'], 'revalidating cache'
+
+        try:
+            price = fetch()
+        except Exception as e:
+            self.logger.error(f"Error fetching {label} pricing data: {e}")
+            price = None
+
+        if price is not None:
+            if self.pricing_cache:
+                self.pricing_cache.put(cache_key, price)
+            return price, 'api'
+        if cached:
+            self.logger.warning(f"Using expired cached {label} price for region {region_name}")
+            return cached['price'], 'stale cache'
+        return None, None
+
+    def _reset_inventory(self, scan_all_volumes: bool = True):
+        with self._lazy_lock:
+            self._inventory = ResourceInventory(
+                self.ec2, self.logger, scan_all_volumes=scan_all_volumes, store=self.inventory_store,
+                checkpoint=self.checkpoint, shard_listings=self.shard_listings
+            )
+            self._names = InstanceNameResolver(self.ec2, self._inventory, self.logger)
+
     def get_instance_name(self, instance: Dict[str, Any]) -> str:
-        tags = instance.get('Tags', [])
-        return next((tag['Value'] for tag in tags if tag['Key'] == 'Name'), 'No Name')
+        return InstanceNameResolver.name_from_tags(instance)
 
     def get_oldest_instances(self, limit: int = 200) -> pd.DataFrame:
         self.logger.info(f"Finding oldest {limit} EC2 instances...")
-        instances = []
         
         try:
-            paginator = self.ec2.get_paginator('describe_instances')
-            for page in paginator.paginate():
-                for reservation in page['Reservations']:
-                    for instance in reservation['Instances']:
-                        if instance['State']['Name'] != 'terminated':
-                            instances.append({
-                                'InstanceId': instance['InstanceId'],
-                                'Name': self.get_instance_name(instance),
-                                'LaunchTime': instance['LaunchTime'],
-                                'InstanceType': instance['InstanceType'],
-                                'State': instance['State']['Name'],
-                                'Platform': instance.get('Platform', 'linux'),
-                                'VpcId': instance.get('VpcId', 'None'),
-                                'PrivateIp': instance.get('PrivateIpAddress', 'None'),
-                                'PublicIp': instance.get('PublicIpAddress', 'None')
-                            })
-        except ClientError as e:
+            # A `limit`-sized heap instead of a full sort (the inventory still caches every instance)
+            oldest = heapq.nsmallest(
+                limit,
+                (instance for instance in self.inventory.iter_instances() if instance['State']['Name'] != 'terminated'),
+                key=lambda instance: instance['LaunchTime']
+            )
+        except botocore_exceptions.ClientError as e:
             self.logger.error(f"Error fetching EC2 instances: {e}")
             return pd.DataFrame()
 
-        df = pd.DataFrame(instances)
-        if not df.empty:
-            df['LaunchTime'] = pd.to_datetime(df['LaunchTime'])
-            df['Age_Days'] = (pd.Timestamp.now(tz=timezone.utc) - df['LaunchTime']).dt.total_seconds() / (24 * 3600)
-            df['Age_Days'] = df['Age_Days'].round(2)
-            df['LaunchTime'] = df['LaunchTime'].dt.strftime('%Y-%m-%d %H:%M:%S')
-            
-            df = df.sort_values('Age_Days', ascending=False).head(limit)
+        rows = ColumnBuilder({
+            'InstanceId': 'object', 'LaunchTime': 'datetime', 'InstanceType': 'category', 'State': 'category',
+            'Platform': 'category', 'VpcId': 'category', 'PrivateIp': 'object', 'PublicIp': 'object'
+        })
+        rows.extend(
+            oldest, itemgetter('InstanceId'), itemgetter('LaunchTime'), itemgetter('InstanceType'),
+            lambda instance: instance['State']['Name'], _field('Platform', 'linux'), _field('VpcId', 'None'),
+            _field('PrivateIpAddress', 'None'), _field('PublicIpAddress', 'None')
+        )
+        if len(rows):
+            df = rows.build()
+            names = self.names.resolve(df['InstanceId'])
+            df.insert(1, 'Name', df['InstanceId'].map(names))
+            df['Age_Days'] = _age_days(df['LaunchTime'])
+            df['LaunchTime'] = _report_timestamps(df['LaunchTime'])
             return df
             
         return pd.DataFrame()
 
     def get_snapshots_with_duplicates(self) -> pd.DataFrame:
         self.logger.info("Finding duplicate snapshots...")
-        snapshots = []
+        rows = ColumnBuilder({
+            'SnapshotId': 'object', 'VolumeId': 'category', 'StartTime': 'datetime', 'Size': 'int',
+            'Description': 'object'
+        })
         
         try:
-            paginator = self.ec2.get_paginator('describe_snapshots')
-            for page in paginator.paginate(OwnerIds=['self']):
-                for snapshot in page['Snapshots']:
-                    snapshots.append({
-                        'SnapshotId': snapshot['SnapshotId'],
-                        'VolumeId': snapshot.get('VolumeId', 'N/A'),
-                        'StartTime': snapshot['StartTime'],
-                        'Size': snapshot['VolumeSize'],
-                        'Description': snapshot.get('Description', 'No description')
-                    })
-        except ClientError as e:
+            rows.extend(
+                self.inventory.iter_snapshots(), itemgetter('SnapshotId'), _field('VolumeId', 'N/A'),
+                itemgetter('StartTime'), itemgetter('VolumeSize'), _field('Description', 'No description')
+            )
+        except botocore_exceptions.ClientError as e:
             self.logger.error(f"Error fetching snapshots: {e}")
             return pd.DataFrame()
 
-        df = pd.DataFrame(snapshots)
-        if not df.empty:
-            volume_counts = df['VolumeId'].value_counts()
-            duplicate_volumes = volume_counts[volume_counts > 1].index
-            duplicates = df[df['VolumeId'].isin(duplicate_volumes)].copy()
-            
-            if len(duplicates) > 0:
-                duplicates['DuplicateCount'] = duplicates['VolumeId'].map(volume_counts)
-                duplicates['StartTime'] = pd.to_datetime(duplicates['StartTime'])
-                duplicates['IsNewest'] = duplicates.groupby('VolumeId')['StartTime'].transform('max') == duplicates['StartTime']
-                snapshot_price = self.pricing_data.get('snapshot', 0.05)  # Price per GB-month
-                duplicates['MonthlyCost'] = duplicates['Size'] * snapshot_price
-                duplicates['PotentialMonthlySavings'] = duplicates.apply(
-                    lambda x: x['MonthlyCost'] if not x['IsNewest'] else 0, 
-                    axis=1
-                )
-                current_time = pd.Timestamp.now(tz=timezone.utc)
-                duplicates['Age_Days'] = (current_time - duplicates['StartTime']).dt.total_seconds() / (24 * 3600)
-                duplicates = duplicates.sort_values(
-                    ['DuplicateCount', 'VolumeId', 'StartTime'],
-                    ascending=[False, True, True]
-                )
-                duplicates['StartTime'] = duplicates['StartTime'].dt.strftime('%Y-%m-%d %H:%M:%S')
-                duplicates['Age_Days'] = duplicates['Age_Days'].round(2)
-                return duplicates
-        
-        return pd.DataFrame()
+        snapshot_price = self.cost_model('snapshot').price('snapshot')  # Price per GB-month
+        return find_duplicate_snapshots(rows.build(), snapshot_price)
 
     def get_top_gp2_instances(self, limit: int = 50) -> pd.DataFrame:
         self.logger.info("Finding instances with largest GP2 storage...")
-        volumes = []
-        
+        # GP2 storage and volume count per instance as volumes stream in, so only the top instances' volumes are framed
+        # (the inventory itself still caches every volume for other analyzers)
+        totals: Dict[str, List[int]] = {}
         try:
-            paginator = self.ec2.get_paginator('describe_volumes')
-            for page in paginator.paginate(Filters=[{'Name': 'volume-type', 'Values': ['gp2']}]):
-                for volume in page['Volumes']:
-                    if volume['Attachments']:
-                        volumes.append({
-                            'InstanceId': volume['Attachments'][0]['InstanceId'],
-                            'VolumeId': volume['VolumeId'],
-                            'Size': volume['Size']  # Size in GB
-                        })
-        except ClientError as e:
+            for volume in self.inventory.iter_volumes():
+                if volume['VolumeType'] == 'gp2' and volume['Attachments']:
+                    total = totals.setdefault(volume['Attachments'][0]['InstanceId'], [0, 0])
+                    total[0] += volume['Size']
+                    total[1] += 1
+        except botocore_exceptions.ClientError as e:
             self.logger.error(f"Error fetching volumes: {e}")
             return pd.DataFrame()
+        if not totals:
+            return pd.DataFrame()
 
-        df = pd.DataFrame(volumes)
-        if not df.empty:
-            instance_storage = df.groupby('InstanceId').agg({
-                'Size': 'sum',
-                'VolumeId': 'count'
-            }).reset_index()
-            
-            instance_storage.columns = ['InstanceId', 'TotalGP2Storage', 'VolumeCount']
-            instance_storage = instance_storage.sort_values('TotalGP2Storage', ascending=False).head(limit)
-            
-            # monthly savings (price difference between GP2 and GP3 per GB-month)
-            price_diff = self.pricing_data.get('gp2', 0.10) - self.pricing_data.get('gp3', 0.08)
-            instance_storage['MonthlySavings'] = instance_storage['TotalGP2Storage'] * price_diff
-            
-            names = []
-            for instance_id in instance_storage['InstanceId']:
-                try:
-                    response = self.ec2.describe_instances(InstanceIds=[instance_id])
-                    instance = response['Reservations'][0]['Instances'][0]
-                    names.append(self.get_instance_name(instance))
-                except:
-                    names.append('Unknown')
-            
-            instance_storage['Name'] = names
-            return instance_storage
-        return pd.DataFrame()
+        # Largest storage first via nsmallest on the negated total; ties rank by instance ID, whatever the order
+        top = heapq.nsmallest(limit, totals.items(), key=lambda item: (-item[1][0], item[0]))
+        rows = ColumnBuilder({'InstanceId': 'object', 'TotalGP2Storage': 'int', 'VolumeCount': 'int'})
+        rows.extend(top, itemgetter(0), lambda item: item[1][0], lambda item: item[1][1])
+        instance_storage = rows.build()
+
+        # Only the top instances' volumes are costed, at gp3 with each volume's current baseline IOPS,
+        # so savings never assume a performance drop
+        top_ids = set(instance_storage['InstanceId'])
+        volumes = ColumnBuilder({'InstanceId': 'object', 'Size': 'int', 'Iops': 'float'})
+        volumes.extend(
+            (volume for volume in self.inventory.iter_volumes()
+             if volume['VolumeType'] == 'gp2' and volume['Attachments']
+             and volume['Attachments'][0]['InstanceId'] in top_ids),
+            lambda volume: volume['Attachments'][0]['InstanceId'], itemgetter('Size'), _field('Iops', np.nan)
+        )
+        volumes = volumes.build()
+        volumes['MonthlySavings'] = self.cost_model('gp2', 'gp3', 'gp3_iops').conversion_savings(
+            'gp2', 'gp3', volumes['Size'], iops=volumes['Iops']
+        )
+        savings = volumes.groupby('InstanceId')['MonthlySavings'].sum()
+        instance_storage['MonthlySavings'] = instance_storage['InstanceId'].map(savings)
+
+        names = self.names.resolve(instance_storage['InstanceId'])
+        instance_storage['Name'] = instance_storage['InstanceId'].map(names)
+        return instance_storage
 
     def get_unused_elastic_ips(self) -> pd.DataFrame:
         self.logger.info("Finding unused Elastic IPs...")
-        unused_ips = []
+        rows = ColumnBuilder({'PublicIp': 'object', 'AllocationId': 'object', 'Domain': 'category'})
         
         try:
-            addresses = self.ec2.describe_addresses()
-            for addr in addresses['Addresses']:
-                if 'AssociationId' not in addr:
-                    unused_ips.append({
-                        'PublicIp': addr['PublicIp'],
-                        'AllocationId': addr.get('AllocationId', 'N/A'),
-                        'Domain': addr['Domain']
-                    })
-        except ClientError as e:
+            rows.extend(
+                (addr for addr in self.inventory.addresses if 'AssociationId' not in addr),
+                itemgetter('PublicIp'), _field('AllocationId', 'N/A'), itemgetter('Domain')
+            )
+        except botocore_exceptions.ClientError as e:
             self.logger.error(f"Error fetching Elastic IPs: {e}")
             return pd.DataFrame()
 
-        df = pd.DataFrame(unused_ips)
+        if not len(rows):
+            return pd.DataFrame()
+        df = rows.build()
         if not df.empty:
-            # Calculate monthly cost (hourly rate * 24 * 30)
-            hourly_rate = self.pricing_data.get('eip', 0.005)
-            df['MonthlyCost'] = hourly_rate * 24 * 30
+            df['MonthlyCost'] = self.cost_model('eip').eip_costs(len(df))
         return df
 
+    def instance_hourly_price(self, instance_type: str, platform: str = 'linux') -> Optional[float]:
+        """On-demand hourly price of an instance type, from the price index or a cached Pricing API lookup."""
+        operating_system = 'Windows' if platform == 'windows' else 'Linux'
+        key = f'{instance_type}/{operating_system}'
+        # Each type is looked up once; concurrent callers for the same type wait on the first one's lookup
+        with self._instance_prices_lock:
+            lookup = self._instance_prices.get(key)
+            first = lookup is None
+            if first:
+                lookup = self._instance_prices[key] = Future()
+        if not first:
+            return lookup.result()
+        try:
+            price = self._lookup_instance_price(instance_type, operating_system)
+        except BaseException as e:
+            # Not cached, so a later call tries again
+            with self._instance_prices_lock:
+                del self._instance_prices[key]
+            lookup.set_exception(e)
+            raise
+        lookup.set_result(price)
+        return price
+
+    def _lookup_instance_price(self, instance_type: str, operating_system: str) -> Optional[float]:
+        region_name = self.ec2.meta.region_name
+        if self.price_index:
+            price = self.prices_db.instance_hourly_price(region_name, instance_type, operating_system)
+        else:
+            filters = self._instance_pricing_query(region_name, instance_type, operating_system)
+            price, _ = self._cached_price(PricingCache.key(region_name, filters),
+                                          lambda: self._fetch_price(filters), instance_type, region_name)
+        if price is None:
+            self.logger.warning(f"Could not find {operating_system} {instance_type} pricing for region {region_name}")
+        return price
+
+    def _get_metric_data(self, queries: List[tuple], start: datetime, end: datetime) -> List[List[float]]:
+        """Daily values for (namespace, metric, dimension name, dimension value, statistic) queries, in order.
+
+        Queries are packed METRIC_QUERIES_PER_CALL to a GetMetricData call and
+        the calls run on `metric_workers` threads. A failed batch is logged and
+        its queries come back empty.
+        """
+        values: List[List[float]] = [[] for _ in queries]
+
+        def fetch(offset: int):
+            batch = queries[offset:offset + METRIC_QUERIES_PER_CALL]
+            metric_queries = [{
+                'Id': f'q{i}',
+                'MetricStat': {
+                    'Metric': {'Namespace': namespace, 'MetricName': metric,
+                               'Dimensions': [{'Name': dimension, 'Value': value}]},
+                    'Period': 86400,
+                    'Stat': stat
+                },
+                'ReturnData': True
+            } for i, (namespace, metric, dimension, value, stat) in enumerate(batch)]
+            try:
+                paginator = self.cloudwatch.get_paginator('get_metric_data')
+                for page in paginator.paginate(MetricDataQueries=metric_queries, StartTime=start, EndTime=end):
+                    for result in page['MetricDataResults']:
+                        index = offset + int(result['Id'][1:])
+                        if index < offset + len(batch):
+                            values[index].extend(result['Values'])
+            except botocore_exceptions.ClientError as e:
+                self.logger.error(f"Error fetching CloudWatch metrics for {len(batch)} queries: {e}")
+
+        with ThreadPoolExecutor(max_workers=self.metric_workers, thread_name_prefix='metrics') as executor:
+            list(executor.map(fetch, range(0, len(queries), METRIC_QUERIES_PER_CALL)))
+        return values
+
+    def get_idle_resources(self, lookback_days: int = IDLE_LOOKBACK_DAYS):
+        """Find running instances and their attached volumes that have been nearly idle for `lookback_days`.
+
+        An instance is idle when its daily average CPU never exceeded
+        IDLE_CPU_PERCENT and it averaged under IDLE_NETWORK_MIB_PER_DAY of
+        network traffic; a volume when it averaged under
+        IDLE_VOLUME_OPS_PER_DAY read and write operations. Averages are taken
+        over the daily datapoints returned, and resources without datapoints
+        are never reported. Returns (idle instances, idle volumes).
+        """
+        self.logger.info("Finding idle running instances and volumes...")
+        try:
+            instances = self.inventory.instances_in_state('running')
+            volumes_by_instance = self.inventory.volumes_for_instances([i['InstanceId'] for i in instances])
+        except botocore_exceptions.ClientError as e:
+            self.logger.error(f"Error fetching running instances: {e}")
+            return pd.DataFrame(), pd.DataFrame()
+        volumes = [volume for instance in instances for volume in volumes_by_instance.get(instance['InstanceId'], [])]
+        if not instances:
+            return pd.DataFrame(), pd.DataFrame()
+
+        # Whole days, so every daily datapoint covers a full day
+        end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = end - timedelta(days=lookback_days)
+        queries = []
+        for instance in instances:
+            for metric, stat in (('CPUUtilization', 'Average'), ('NetworkIn', 'Sum'), ('NetworkOut', 'Sum')):
+                queries.append(('AWS/EC2', metric, 'InstanceId', instance['InstanceId'], stat))
+        for volume in volumes:
+            for metric in ('VolumeReadOps', 'VolumeWriteOps'):
+                queries.append(('AWS/EBS', metric, 'VolumeId', volume['VolumeId'], 'Sum'))
+        values = self._get_metric_data(queries, start, end)
+
+        idle_instances = ColumnBuilder({
+            'InstanceId': 'object', 'InstanceType': 'category', 'LaunchTime': 'datetime', 'MaxDailyCPU': 'float',
+            'NetworkMiBPerDay': 'float', 'HourlyPrice': 'float'
+        })
+        for i, instance in enumerate(instances):
+            cpu, network_in, network_out = values[3 * i:3 * i + 3]
+            if not cpu:
+                continue
+            max_cpu = max(cpu)
+            # Average over the days CloudWatch has data for, so instances launched mid-window aren't diluted
+            days = max(len(network_in), len(network_out))
+            network_mib_per_day = (sum(network_in) + sum(network_out)) / 2 ** 20 / days if days else 0.0
+            if max_cpu <= IDLE_CPU_PERCENT and network_mib_per_day <= IDLE_NETWORK_MIB_PER_DAY:
+                hourly = self.instance_hourly_price(instance['InstanceType'], instance.get('Platform', 'linux'))
+                idle_instances.append(
+                    instance['InstanceId'], instance['InstanceType'], instance['LaunchTime'], round(max_cpu, 2),
+                    round(network_mib_per_day, 2), hourly if hourly is not None else np.nan
+                )
+
+        idle_volumes = ColumnBuilder({
+            'VolumeId': 'object', 'InstanceId': 'object', 'VolumeType': 'category', 'Size': 'int',
+            'OpsPerDay': 'float', 'Iops': 'float', 'Throughput': 'float'
+        })
+        offset = 3 * len(instances)
+        for v, volume in enumerate(volumes):
+            reads, writes = values[offset + 2 * v:offset + 2 * v + 2]
+            if not reads and not writes:
+                continue
+            ops_per_day = (sum(reads) + sum(writes)) / max(len(reads), len(writes))
+            if ops_per_day < IDLE_VOLUME_OPS_PER_DAY:
+                idle_volumes.append(
+                    volume['VolumeId'], volume['Attachments'][0]['InstanceId'], volume['VolumeType'], volume['Size'],
+                    round(ops_per_day, 2), volume.get('Iops', np.nan), volume.get('Throughput', np.nan)
+                )
+
+        instances_df = idle_instances.build() if len(idle_instances) else pd.DataFrame()
+        if not instances_df.empty:
+            instances_df['MonthlyCost'] = CostModel.instance_costs(instances_df.pop('HourlyPrice')).round(2)
+            names = self.names.resolve(instances_df['InstanceId'])
+            instances_df.insert(1, 'Name', instances_df['InstanceId'].map(names))
+            instances_df = instances_df.sort_values('MonthlyCost', ascending=False, ignore_index=True)
+        volumes_df = idle_volumes.build() if len(idle_volumes) else pd.DataFrame()
+        if not volumes_df.empty:
+            volumes_df['MonthlyCost'] = self.cost_model(*EBS_PRICE_NAMES).volume_costs(
+                volumes_df['VolumeType'], volumes_df['Size'], volumes_df.pop('Iops'), volumes_df.pop('Throughput')
+            ).round(2)
+            volumes_df = volumes_df.sort_values('MonthlyCost', ascending=False, ignore_index=True)
+        return instances_df, volumes_df
+
+    def _write_data_files(self, df: pd.DataFrame, name: str) -> List[str]:
+        """Write a built report into every selected data format in row-group chunks and return the file paths.
+
+        Reports are sorted by impact before they are written, so the whole
+        frame is in memory by now; writing in chunks only bounds each
+        format's converted copy (one chunk's Arrow table or JSON text).
+        """
+        writers = [REPORT_WRITERS[fmt](f"{self.output_dir}/{name}.{fmt}", self.compression)
+                   for fmt in self.output_formats if fmt in REPORT_WRITERS]
+        try:
+            for start in range(0, len(df), REPORT_ROW_GROUP_SIZE):
+                chunk = df.iloc[start:start + REPORT_ROW_GROUP_SIZE]
+                for writer in writers:
+                    writer.write(chunk)
+        finally:
+            for writer in writers:
+                writer.close()
+        return [writer.path for writer in writers]
+
+    def _markdown_table(self, df: pd.DataFrame, data_paths: List[str]) -> str:
+        # Text columns are shown as they are, so IDs like account 012345678901 aren't reparsed as numbers
+        text_columns = [i for i, dtype in enumerate(df.dtypes) if dtype == object]
+        if self.markdown_max_rows is None or len(df) <= self.markdown_max_rows:
+            return df.to_markdown(index=False, disable_numparse=text_columns)
+        links = ', '.join(f"[{os.path.basename(path)}]({os.path.basename(path)})" for path in data_paths)
+        note = f"\n\n_Showing the first {self.markdown_max_rows:,} of {len(df):,} rows."
+        note += f" Full data: {links}._" if links else "_"
+        return df.head(self.markdown_max_rows).to_markdown(index=False, disable_numparse=text_columns) + note
+
     def save_to_files(self, df: pd.DataFrame, name: str):
         if not df.empty:
-            csv_path = f"{self.output_dir}/{name}.csv"
-            df.to_csv(csv_path, index=False)
+            data_paths = self._write_data_files(df, name)
             
-            md_path = f"{self.output_dir}/{name}.md"
-            with open(md_path, 'w') as f:
-                f.write(f"# {name.replace('_', ' ').title()}\n\n")
-                f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                f.write(df.to_markdown(index=False))
+            if 'md' in self.output_formats:
+                md_path = f"{self.output_dir}/{name}.md"
+                with open(md_path, 'w') as f:
+                    f.write(f"# {name.replace('_', ' ').title()}\n\n")
+                    f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+                    f.write(self._markdown_table(df, data_paths))
 
     def get_stopped_instances_cost(self, age_threshold_days: int = 0) -> pd.DataFrame:
         self.logger.info(f"Finding stopped instances and their costs...")
-        instances = []
+        rows = ColumnBuilder({
+            'InstanceId': 'object', 'LaunchTime': 'datetime', 'InstanceType': 'category', 'Platform': 'category',
+            'VpcId': 'category', 'StopTime': 'object'
+        })
         
         try:
-            paginator = self.ec2.get_paginator('describe_instances')
-            for page in paginator.paginate(
-                Filters=[{'Name': 'instance-state-name', 'Values': ['stopped']}]
-            ):
-                for reservation in page['Reservations']:
-                    for instance in reservation['Instances']:
-                        instance_data = {
-                            'InstanceId': instance['InstanceId'],
-                            'Name': self.get_instance_name(instance),
-                            'LaunchTime': instance['LaunchTime'],
-                            'InstanceType': instance['InstanceType'],
-                            'Platform': instance.get('Platform', 'linux'),
-                            'VpcId': instance.get('VpcId', 'None'),
-                            'StopTime': instance.get('StateTransitionReason', 'Unknown'),
-                            'TotalStorageGB': 0,
-                            'StorageCost': 0.0
-                        }
-                        
-                        launch_time = pd.to_datetime(instance['LaunchTime'])
-                        instance_data['Age_Days'] = (pd.Timestamp.now(tz=timezone.utc) - launch_time).total_seconds() / (24 * 3600)
-                        
-                        try:
-                            volumes_response = self.ec2.describe_volumes(
-                                Filters=[{'Name': 'attachment.instance-id', 'Values': [instance['InstanceId']]}]
-                            )
-                            
-                            for volume in volumes_response['Volumes']:
-                                instance_data['TotalStorageGB'] += volume['Size']
-                                volume_type = volume['VolumeType']
-                                if volume_type == 'gp2':
-                                    price = self.pricing_data.get('gp2', 0.10)
-                                elif volume_type == 'gp3':
-                                    price = self.pricing_data.get('gp3', 0.08)
-                                else:
-                                    price = 0.10  # Default price per GB-month
-                                
-                                instance_data['StorageCost'] += volume['Size'] * price
-                                
-                        except Exception as e:
-                            self.logger.error(f"Error getting volumes for instance {instance['InstanceId']}: {e}")
-                        
-                        if 'User initiated' in instance_data['StopTime']:
-                            try:
-                                stop_time_str = instance_data['StopTime'].split('(')[1].split(')')[0]
-                                stop_time = pd.to_datetime(stop_time_str)
-                                instance_data['StoppedDays'] = (pd.Timestamp.now(tz=timezone.utc) - stop_time).total_seconds() / (24 * 3600)
-                            except:
-                                instance_data['StoppedDays'] = 0
-                        else:
-                            instance_data['StoppedDays'] = 0
-                        
-                        if instance_data['Age_Days'] >= age_threshold_days:
-                            instances.append(instance_data)
-                            
-        except ClientError as e:
+            rows.extend(
+                self.inventory.instances_in_state('stopped'), itemgetter('InstanceId'), itemgetter('LaunchTime'),
+                itemgetter('InstanceType'), _field('Platform', 'linux'), _field('VpcId', 'None'),
+                _field('StateTransitionReason', 'Unknown')
+            )
+        except botocore_exceptions.ClientError as e:
             self.logger.error(f"Error fetching stopped instances: {e}")
-            return pd.DataFrame()
+            return pd.DataFrame(), pd.DataFrame()
 
-        df = pd.DataFrame(instances)
+        df = rows.build() if len(rows) else pd.DataFrame()
         if not df.empty:
-            df['Age_Days'] = df['Age_Days'].round(2)
-            df['StoppedDays'] = df['StoppedDays'].round(2)
+            df['Age_Days'] = _age_days(df['LaunchTime'])
+            # 'User initiated (2024-01-31 12:00:00 GMT)'; any other reason has no stop time
+            stop_times = df['StopTime'].str.extract(r'User initiated.*?\(([^)]*)\)', expand=False)
+            stop_times = pd.to_datetime(stop_times, format='%Y-%m-%d %H:%M:%S %Z', utc=True, errors='coerce')
+            df['StoppedDays'] = _age_days(stop_times).fillna(0)
+            names = self.names.resolve(df['InstanceId'])
+            df['Name'] = df['InstanceId'].map(names)
+            storage = self._attached_storage_costs(df['InstanceId'].tolist())
+            df = df.merge(storage, on='InstanceId', how='left')
+            df['TotalStorageGB'] = df['TotalStorageGB'].fillna(0).astype(int)
+            df['StorageCost'] = df['StorageCost'].fillna(0.0)
+
             df['StorageCost'] = df['StorageCost'].round(2)
 
             # StorageCost is already monthly cost per GB
             df['MonthlyCost'] = df['StorageCost']
-            df['YearlyCost'] = df['StorageCost'] * 12
+            df['YearlyCost'] = CostModel.yearly(df['StorageCost'])
             
-            df['LaunchTime'] = pd.to_datetime(df['LaunchTime']).dt.strftime('%Y-%m-%d %H:%M:%S')
+            df['LaunchTime'] = _report_timestamps(df['LaunchTime'])
             
+            df = df[['InstanceId', 'Name', 'LaunchTime', 'InstanceType', 'Platform', 'VpcId', 'StopTime',
+                     'TotalStorageGB', 'StorageCost', 'Age_Days', 'StoppedDays', 'MonthlyCost', 'YearlyCost']]
             df = df.sort_values('StorageCost', ascending=False)
-            
-            total_monthly_cost = df['MonthlyCost'].sum()
-            total_storage = df['TotalStorageGB'].sum()
-            
-            summary_df = pd.DataFrame([{
-                'TotalInstances': len(df),
-                'TotalStorageGB': total_storage,
-                'TotalMonthlyCost': total_monthly_cost,
-                'TotalYearlyCost': total_monthly_cost * 12,
-                'AvgInstanceAge': df['Age_Days'].mean(),
-                'AvgStoppedDays': df['StoppedDays'].mean()
-            }])
-            
-            return df, summary_df
         
-        return pd.DataFrame(), pd.DataFrame()
+        return self.filter_stopped_instances(df, age_threshold_days)
+
+    def _attached_storage_costs(self, instance_ids: List[str]) -> pd.DataFrame:
+        """Total attached storage and its monthly cost (including provisioned IOPS and throughput) per instance."""
+        rows = ColumnBuilder({
+            'InstanceId': 'object', 'VolumeType': 'category', 'Size': 'int', 'Iops': 'float', 'Throughput': 'float'
+        })
+        try:
+            for instance_id, attached in self.inventory.volumes_for_instances(instance_ids).items():
+                for volume in attached:
+                    rows.append(instance_id, volume['VolumeType'], volume['Size'], volume.get('Iops', np.nan),
+                                volume.get('Throughput', np.nan))
+        except botocore_exceptions.ClientError as e:
+            self.logger.error(f"Error getting volumes for stopped instances: {e}")
+
+        if not len(rows):
+            return pd.DataFrame(columns=['InstanceId', 'TotalStorageGB', 'StorageCost'])
+
+        volumes_df = rows.build()
+        volumes_df['StorageCost'] = self.cost_model(*EBS_PRICE_NAMES).volume_costs(
+            volumes_df['VolumeType'], volumes_df['Size'], volumes_df['Iops'], volumes_df['Throughput']
+        )
+        storage = volumes_df.groupby('InstanceId').agg({'Size': 'sum', 'StorageCost': 'sum'}).reset_index()
+        storage.columns = ['InstanceId', 'TotalStorageGB', 'StorageCost']
+        return storage
+
+    def filter_stopped_instances(self, df: pd.DataFrame, age_threshold_days: int = 0):
+        """Narrow a stopped-instance report to instances at least `age_threshold_days` old."""
+        if df.empty:
+            return pd.DataFrame(), pd.DataFrame()
+
+        df = df[df['Age_Days'] >= age_threshold_days]
+        if df.empty:
+            return pd.DataFrame(), pd.DataFrame()
+
+        summary = ReportSummary.of(df, *SUMMARY_COLUMNS['all_stopped_instances'])
+        summary_df = pd.DataFrame([{
+            'TotalInstances': summary.rows,
+            'TotalStorageGB': summary.storage_gb,
+            'TotalMonthlyCost': summary.monthly_savings,
+            'TotalYearlyCost': summary.yearly_savings,
+            'AvgInstanceAge': summary.avg_age_days,
+            'AvgStoppedDays': summary.avg_stopped_days
+        }])
+        return df, summary_df
 
     def save_stopped_instances_report(self, df: pd.DataFrame, summary_df: pd.DataFrame, name: str):
         if not df.empty:
-            csv_path = f"{self.output_dir}/{name}.csv"
-            df.to_csv(csv_path, index=False)
+            data_paths = self._write_data_files(df, name)
+            if 'md' not in self.output_formats:
+                return
             
             md_path = f"{self.output_dir}/{name}.md"
             with open(md_path, 'w') as f:
@@ -377,214 +2211,433 @@ class AWSResourceAuditor:
                 f.write(f"- Average Time Stopped: {summary_df['AvgStoppedDays'].iloc[0]:.2f} days\n\n")
                 
                 f.write("## Detailed Instance List\n")
-                f.write(df.to_markdown(index=False))
+                f.write(self._markdown_table(df, data_paths))
 
-    def save_savings_summary(self, audit_results: Dict[str, pd.DataFrame]):
-        """Generate and save savings summary including stopped instances."""
-        summary = []
-        total_monthly_savings = 0
-        
-        summary.append("# Cost Savings Summary\n")
-        summary.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        
+    def summarize(self, audit_results: Dict[str, pd.DataFrame]) -> AuditSummary:
+        return AuditSummary.from_results(audit_results, self.pricing_fallbacks)
 
-        if 'all_stopped_instances' in audit_results and not audit_results['all_stopped_instances'].empty:
-            monthly_stopped_savings = audit_results['all_stopped_instances']['MonthlyCost'].sum()
-            total_monthly_savings += monthly_stopped_savings
-            total_storage = audit_results['all_stopped_instances']['TotalStorageGB'].sum()
-            
-            summary.append(f"\n## Stopped Instances Savings (if deleted)")
-            summary.append(f"- Monthly Savings: ${monthly_stopped_savings:.2f}")
-            summary.append(f"- Yearly Savings: ${monthly_stopped_savings * 12:.2f}")
-            summary.append(f"- Number of Stopped Instances: {len(audit_results['all_stopped_instances'])}")
-            summary.append(f"- Total Storage Being Paid For: {total_storage:.2f} GB")
-            
+    def save_savings_summary(self, audit_results: Dict[str, pd.DataFrame]) -> AuditSummary:
+        """Summarize the audit once and save the markdown, JSON and CSV summaries rendered from it."""
+        summary = self.summarize(audit_results)
+        summary.save(self.output_dir)
+        return summary
 
-            if 'old_stopped_instances' in audit_results and not audit_results['old_stopped_instances'].empty:
-                old_monthly_savings = audit_results['old_stopped_instances']['MonthlyCost'].sum()
-                old_storage = audit_results['old_stopped_instances']['TotalStorageGB'].sum()
-                summary.append(f"\n### Old Stopped Instances (90+ days)")
-                summary.append(f"- Monthly Savings: ${old_monthly_savings:.2f}")
-                summary.append(f"- Yearly Savings: ${old_monthly_savings * 12:.2f}")
-                summary.append(f"- Number of Old Stopped Instances: {len(audit_results['old_stopped_instances'])}")
-                summary.append(f"- Storage Used by Old Instances: {old_storage:.2f} GB")
-        
+    # Analyzer name -> (progress description, reports it produces)
+    ANALYZERS = {
+        'stopped_instances': ("stopped instances", ['all_stopped_instances', 'old_stopped_instances']),
+        'oldest_instances': ("oldest EC2 instances", ['oldest_instances']),
+        'duplicate_snapshots': ("snapshot information", ['duplicate_snapshots']),
+        'top_gp2_instances': ("GP2 instance information", ['top_gp2_instances']),
+        'unused_elastic_ips': ("Elastic IP information", ['unused_elastic_ips']),
+        'idle_resources': ("idle resource information", ['idle_instances', 'idle_volumes']),
+    }
 
-        if 'duplicate_snapshots' in audit_results and not audit_results['duplicate_snapshots'].empty:
-            monthly_snapshot_savings = audit_results['duplicate_snapshots']['PotentialMonthlySavings'].sum()
-            total_monthly_savings += monthly_snapshot_savings
-            duplicate_count = len(audit_results['duplicate_snapshots'][audit_results['duplicate_snapshots']['IsNewest'] == False])
-            total_size = audit_results['duplicate_snapshots'][audit_results['duplicate_snapshots']['IsNewest'] == False]['Size'].sum()
-            
-            summary.append(f"\n## Duplicate Snapshot Savings")
-            summary.append(f"- Monthly Savings: ${monthly_snapshot_savings:.2f}")
-            summary.append(f"- Yearly Savings: ${monthly_snapshot_savings * 12:.2f}")
-            summary.append(f"- Duplicate Snapshots That Can Be Removed: {duplicate_count}")
-            summary.append(f"- Total Size of Duplicate Snapshots: {total_size} GB")
-        
+    def _analyze(self, name: str) -> Dict[str, Any]:
+        """Run one analyzer and return {report name: (DataFrame, summary DataFrame or None)}."""
+        if name == 'stopped_instances':
+            all_stopped_df, all_stopped_summary = self.get_stopped_instances_cost(age_threshold_days=0)
+            old_stopped_df, old_stopped_summary = self.filter_stopped_instances(all_stopped_df, age_threshold_days=90)
+            return {
+                'all_stopped_instances': (all_stopped_df, all_stopped_summary),
+                'old_stopped_instances': (old_stopped_df, old_stopped_summary)
+            }
+        if name == 'oldest_instances':
+            return {'oldest_instances': (self.get_oldest_instances(200), None)}
+        if name == 'duplicate_snapshots':
+            return {'duplicate_snapshots': (self.get_snapshots_with_duplicates(), None)}
+        if name == 'top_gp2_instances':
+            return {'top_gp2_instances': (self.get_top_gp2_instances(), None)}
+        if name == 'unused_elastic_ips':
+            return {'unused_elastic_ips': (self.get_unused_elastic_ips(), None)}
+        if name == 'idle_resources':
+            idle_instances, idle_volumes = self.get_idle_resources()
+            return {'idle_instances': (idle_instances, None), 'idle_volumes': (idle_volumes, None)}
+        raise ValueError(f"Unknown analyzer: {name}")
 
-        if 'top_gp2_instances' in audit_results and not audit_results['top_gp2_instances'].empty:
-            monthly_gp2_savings = audit_results['top_gp2_instances']['MonthlySavings'].sum()
-            total_monthly_savings += monthly_gp2_savings
-            summary.append(f"\n## GP2 to GP3 Conversion Savings")
-            summary.append(f"- Monthly Savings: ${monthly_gp2_savings:.2f}")
-            summary.append(f"- Yearly Savings: ${monthly_gp2_savings * 12:.2f}")
-            summary.append(f"- Total GP2 Storage: {audit_results['top_gp2_instances']['TotalGP2Storage'].sum()} GB")
-            summary.append(f"- Number of Instances: {len(audit_results['top_gp2_instances'])}")
-        
+    def _save_reports(self, reports: Dict[str, Any]):
+        for report_name, (df, summary_df) in reports.items():
+            if summary_df is not None:
+                self.save_stopped_instances_report(df, summary_df, report_name)
+            else:
+                self.save_to_files(df, report_name)
 
-        if 'unused_elastic_ips' in audit_results and not audit_results['unused_elastic_ips'].empty:
-            monthly_eip_savings = audit_results['unused_elastic_ips']['MonthlyCost'].sum()
-            total_monthly_savings += monthly_eip_savings
-            summary.append(f"\n## Unused Elastic IP Savings")
-            summary.append(f"- Monthly Savings: ${monthly_eip_savings:.2f}")
-            summary.append(f"- Yearly Savings: ${monthly_eip_savings * 12:.2f}")
-            summary.append(f"- Number of unused IPs: {len(audit_results['unused_elastic_ips'])}")
-        
-        summary.append(f"\n## Total Potential Savings")
-        summary.append(f"- Monthly: ${total_monthly_savings:.2f}")
-        summary.append(f"- Yearly: ${total_monthly_savings * 12:.2f}")
-        
-        summary.append("\n## Recommendations by Priority")
-        recommendations = []
-        
-        if 'old_stopped_instances' in audit_results and not audit_results['old_stopped_instances'].empty:
-            old_monthly = audit_results['old_stopped_instances']['MonthlyCost'].sum()
-            recommendations.append((
-                "Delete old stopped instances (90+ days inactive)",
-                old_monthly,
-                f"Delete {len(audit_results['old_stopped_instances'])} stopped instances that haven't been used in over 90 days"
-            ))
-        
-        if 'duplicate_snapshots' in audit_results and not audit_results['duplicate_snapshots'].empty:
-            dup_monthly = audit_results['duplicate_snapshots']['PotentialMonthlySavings'].sum()
-            duplicate_count = len(audit_results['duplicate_snapshots'][audit_results['duplicate_snapshots']['IsNewest'] == False])
-            recommendations.append((
-                "Remove duplicate snapshots",
-                dup_monthly,
-                f"Delete {duplicate_count} duplicate snapshots while keeping the newest copy"
-            ))
-        
-        if 'top_gp2_instances' in audit_results and not audit_results['top_gp2_instances'].empty:
-            gp2_monthly = audit_results['top_gp2_instances']['MonthlySavings'].sum()
-            recommendations.append((
-                "Convert GP2 volumes to GP3",
-                gp2_monthly,
-                f"Convert {len(audit_results['top_gp2_instances'])} instances from GP2 to GP3 storage"
-            ))
-        
-        if 'unused_elastic_ips' in audit_results and not audit_results['unused_elastic_ips'].empty:
-            eip_monthly = audit_results['unused_elastic_ips']['MonthlyCost'].sum()
-            recommendations.append((
-                "Release unused Elastic IPs",
-                eip_monthly,
-                f"Release {len(audit_results['unused_elastic_ips'])} unused Elastic IPs"
-            ))
-        
-        recommendations.sort(key=lambda x: x[1], reverse=True)
-        
-        for i, (title, savings, desc) in enumerate(recommendations, 1):
-            summary.append(f"\n{i}. {title}")
-            summary.append(f"   - Monthly Savings: ${savings:.2f}")
-            summary.append(f"   - Action: {desc}")
-        
-        with open(f"{self.output_dir}/savings_summary.md", 'w') as f:
-            f.write('\n'.join(summary))
+    def _run_analyzer(self, name: str, started: Dict[str, float], timed_out: set, save: bool = True) -> Dict[str, pd.DataFrame]:
+        started[name] = time.monotonic()
+        checkpoint_key = f'{self.ec2.meta.region_name}.{name}'
+        if self.checkpoint:
+            # Its reports were saved before the checkpoint was
+            results = self.checkpoint.load_results(checkpoint_key)
+            if results is not None:
+                self.logger.info(f"Already got {self.ANALYZERS[name][0]}, using its checkpoint")
+                return results
+        self.logger.info(f"Getting {self.ANALYZERS[name][0]}...")
+        with self.metrics.stage(f'analyze:{name}'):
+            reports = self._profile(name, self._analyze) if self.profile_analyzers else self._analyze(name)
+        # A timed-out analyzer's results are discarded, so don't leave its files behind either
+        if save and name not in timed_out:
+            with self.metrics.stage(f'save:{name}'):
+                self._save_reports(reports)
+        results = {report_name: df for report_name, (df, _) in reports.items()}
+        if self.checkpoint and name not in timed_out:
+            self.checkpoint.save_results(checkpoint_key, results)
+        return results
 
-    def run_audit(self):
-        """Run the complete audit."""
-        self.logger.info("Starting AWS resource audit...")
-        
-        audit_results = {}
-        
+    def _profile(self, name: str, analyze) -> Dict[str, Any]:
+        """Run an analyzer under cProfile and dump its stats to profiles/<analyzer>.<region>.prof."""
+        profiler = cProfile.Profile()
         try:
-            self.logger.info("Getting all stopped instances...")
-            all_stopped_df, all_stopped_summary = self.get_stopped_instances_cost(age_threshold_days=0)
-            self.save_stopped_instances_report(all_stopped_df, all_stopped_summary, 'all_stopped_instances')
-            audit_results['all_stopped_instances'] = all_stopped_df
-            
-            self.logger.info("Getting old stopped instances (90+ days)...")
-            old_stopped_df, old_stopped_summary = self.get_stopped_instances_cost(age_threshold_days=90)
-            self.save_stopped_instances_report(old_stopped_df, old_stopped_summary, 'old_stopped_instances')
-            audit_results['old_stopped_instances'] = old_stopped_df
-            
-        except Exception as e:
-            self.logger.error(f"Error analyzing stopped instances: {e}")
-            audit_results['all_stopped_instances'] = pd.DataFrame()
-            audit_results['old_stopped_instances'] = pd.DataFrame()
+            profiler.enable()
+        except ValueError as e:
+            # Only one profiler can be active at a time on some Python versions; run with max_workers=1 there
+            self.logger.warning(f"Not profiling {name}: {e}")
+            return analyze(name)
+        try:
+            return analyze(name)
+        finally:
+            profiler.disable()
+            os.makedirs(f"{self.output_dir}/profiles", exist_ok=True)
+            profiler.dump_stats(f"{self.output_dir}/profiles/{name}.{self.ec2.meta.region_name}.prof")
+
+    def _select_analyzers(self, analyzers: Optional[List[str]]) -> List[str]:
+        if analyzers is None:
+            return list(self.ANALYZERS)
+        unknown = set(analyzers) - set(self.ANALYZERS)
+        if unknown:
+            raise ValueError(f"Unknown analyzers: {', '.join(sorted(unknown))}")
+        return [name for name in self.ANALYZERS if name in analyzers]
 
+    def run_analyzers(self, max_workers: int = 4, analyzer_timeout: Optional[float] = None,
+                      save: bool = True, analyzers: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        """Run the selected analyzers (default: all) on a bounded thread pool, saving each one's reports as soon as it finishes.
+
+        A failing or timed-out analyzer is logged and contributes empty reports,
+        without affecting the others. A timed-out analyzer's thread keeps running
+        until it finishes on its own, so resources it may still use (the price
+        index and the checkpoint) are left alone until then.
+        """
+        analyzers = self._select_analyzers(analyzers)
+        audit_results: Dict[str, pd.DataFrame] = {}
+        started: Dict[str, float] = {}
+        timed_out: set = set()
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analyzer')
+        futures = {executor.submit(self._run_analyzer, name, started, timed_out, save): name for name in analyzers}
+        pending = set(futures)
         try:
-            self.logger.info("Getting oldest EC2 instances...")
-            audit_results['oldest_instances'] = self.get_oldest_instances(200)
-            self.save_to_files(audit_results['oldest_instances'], 'oldest_instances')
-        except Exception as e:
-            self.logger.error(f"Error getting oldest instances: {e}")
-            audit_results['oldest_instances'] = pd.DataFrame()
+            while pending:
+                done, pending = wait(pending, timeout=1 if analyzer_timeout else None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures[future]
+                    try:
+                        audit_results.update(future.result())
+                    except Exception as e:
+                        self.logger.error(f"Error getting {self.ANALYZERS[name][0]}: {e}")
 
+                if analyzer_timeout:
+                    now = time.monotonic()
+                    for future in list(pending):
+                        name = futures[future]
+                        if name in started and now - started[name] > analyzer_timeout:
+                            timed_out.add(name)
+                            pending.discard(future)
+                            self._stragglers.append(future)
+                            self.logger.error(f"Timed out getting {self.ANALYZERS[name][0]} after {analyzer_timeout}s")
+        finally:
+            # Timed-out workers can't be interrupted; let them finish in the background
+            executor.shutdown(wait=False)
+
+        return {report_name: audit_results.get(report_name, pd.DataFrame())
+                for name in analyzers for report_name in self.ANALYZERS[name][1]}
+
+    @contextmanager
+    def _audit_log(self):
+        """Also write this module's log records to `audit.log` in the output directory while an audit runs."""
+        logger = logging.getLogger(__name__)
+        handler = logging.FileHandler(os.path.join(self.output_dir, 'audit.log'))
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
         try:
-            self.logger.info("Getting snapshot information...")
-            audit_results['duplicate_snapshots'] = self.get_snapshots_with_duplicates()
-            self.save_to_files(audit_results['duplicate_snapshots'], 'duplicate_snapshots')
-        except Exception as e:
-            self.logger.error(f"Error getting snapshot information: {e}")
-            audit_results['duplicate_snapshots'] = pd.DataFrame()
+            yield
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+    def _save_delta_report(self, audit_results: Dict[str, pd.DataFrame], scope: str):
+        if not self.inventory_store:
+            return
+        if any(report_name not in audit_results for report_name in self.WASTE_COLUMNS
+               if report_name not in self.CAPPED_REPORTS):
+            self.logger.info("Skipping the delta report: it needs every analyzer's results")
+            return
+        self.save_delta_report(audit_results, scope)
+
+    def _clear_checkpoint(self):
+        if not self.checkpoint:
+            return
+        if self._stragglers_running():
+            self.logger.warning("Keeping the checkpoint: timed-out analyzers are still running and may write to it")
+            return
+        self.checkpoint.clear()
+
+    def run_audit(self, max_workers: int = 4, analyzer_timeout: Optional[float] = None,
+                  analyzers: Optional[List[str]] = None):
+        """Run the complete audit, or only the named `analyzers`.
+
+        Analyzers run concurrently on up to `max_workers` threads; pass
+        `max_workers=1` to run them one after another. `analyzer_timeout` caps
+        the seconds any single analyzer may take.
+        """
+        with self._audit_log():
+            self.logger.info("Starting AWS resource audit...")
+
+            self._reset_inventory()
+            try:
+                audit_results = self.run_analyzers(max_workers=max_workers, analyzer_timeout=analyzer_timeout,
+                                                   analyzers=analyzers)
+            finally:
+                self._close_prices_db()
+            with self.metrics.stage('save:summaries'):
+                self._save_summaries(audit_results)
+                self._save_delta_report(audit_results, self.ec2.meta.region_name)
+            self.metrics.save(self.output_dir)
+            self._clear_checkpoint()
+
+            self.logger.info(f"Audit complete! Files saved in {self.output_dir}/")
+        return audit_results
+
+    def enabled_regions(self) -> List[str]:
+        return sorted(region['RegionName'] for region in self.ec2.describe_regions()['Regions'])
+
+    def run_multi_region_audit(self, regions: Optional[List[str]] = None, region_workers: int = 4,
+                               max_workers: int = 4, analyzer_timeout: Optional[float] = None,
+                               analyzers: Optional[List[str]] = None):
+        with self._audit_log():
+            return self._run_multi_region_audit(regions, region_workers, max_workers, analyzer_timeout,
+                                                self._select_analyzers(analyzers))
+
+    def _run_multi_region_audit(self, regions: Optional[List[str]], region_workers: int, max_workers: int,
+                                analyzer_timeout: Optional[float], analyzers: List[str]):
+        """Audit several regions in parallel and merge them into one set of reports.
+
+        Each region gets its own auditor with a pooled EC2 client and its own
+        regional pricing, fetched once. Reports gain a leading `Region` column.
+        `regions` defaults to every region enabled for the account.
+        """
+        regions = regions or self.enabled_regions()
+        self.logger.info(f"Starting multi-region AWS resource audit across {len(regions)} regions...")
 
+        def audit_region(region: str) -> Dict[str, pd.DataFrame]:
+            if region == self.ec2.meta.region_name:
+                # Reuse this auditor's client and already-fetched pricing for its own region
+                self._reset_inventory()
+                return self.run_analyzers(max_workers=max_workers, analyzer_timeout=analyzer_timeout, save=False,
+                                          analyzers=analyzers)
+            auditor = AWSResourceAuditor(
+                region_name=region,
+                output_dir=self.output_dir,
+                session=self.session,
+                pricing_client=self.pricing,
+                pricing_cache=self.pricing_cache or False,
+                price_index=self.price_index,
+                output_formats=self.output_formats,
+                compression=self.compression,
+                markdown_max_rows=self.markdown_max_rows,
+                max_pool_connections=self.max_pool_connections,
+                inventory_store=self.inventory_store,
+                metrics=self.metrics,
+                profile_analyzers=self.profile_analyzers,
+                rate_governor=self.rate_governor or False,
+                metric_workers=self.metric_workers,
+                checkpoint=self.checkpoint,
+                shard_listings=self.shard_listings
+            )
+            try:
+                results = auditor.run_analyzers(max_workers=max_workers, analyzer_timeout=analyzer_timeout,
+                                                save=False, analyzers=analyzers)
+            finally:
+                auditor._close_prices_db()
+            # Pricing is fetched on first use, so fallbacks are only known once the analyzers have run
+            self.pricing_fallbacks.extend(auditor.pricing_fallbacks)
+            self._stragglers.extend(auditor._stragglers)
+            return results
+
+        regional_results: Dict[str, Dict[str, pd.DataFrame]] = {}
         try:
-            self.logger.info("Getting GP2 instance information...")
-            audit_results['top_gp2_instances'] = self.get_top_gp2_instances()
-            self.save_to_files(audit_results['top_gp2_instances'], 'top_gp2_instances')
-        except Exception as e:
-            self.logger.error(f"Error getting GP2 instance information: {e}")
-            audit_results['top_gp2_instances'] = pd.DataFrame()
+            with ThreadPoolExecutor(max_workers=region_workers, thread_name_prefix='region') as executor:
+                futures = {executor.submit(audit_region, region): region for region in regions}
+                for future in futures:
+                    region = futures[future]
+                    try:
+                        regional_results[region] = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Error auditing region {region}: {e}")
+        finally:
+            self._close_prices_db()
+
+        audit_results = {}
+        for name in analyzers:
+            for report_name in self.ANALYZERS[name][1]:
+                frames = []
+                for region in regions:
+                    df = regional_results.get(region, {}).get(report_name)
+                    if df is not None and not df.empty:
+                        frames.append(df.assign(Region=region)[['Region'] + list(df.columns)])
+                audit_results[report_name] = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+        self.save_merged_reports(audit_results)
+        with self.metrics.stage('save:summaries'):
+            self._save_delta_report(audit_results, ','.join(sorted(regions)))
+        self.metrics.save(self.output_dir)
+        self._clear_checkpoint()
+
+        self.logger.info(f"Multi-region audit complete! Files saved in {self.output_dir}/")
+        return audit_results
+
+    def save_merged_reports(self, audit_results: Dict[str, pd.DataFrame]):
+        """Save reports merged from several audits, and their summaries, to the output directory."""
+        for report_name, df in audit_results.items():
+            with self.metrics.stage(f'save:{report_name}'):
+                if report_name in self.ANALYZERS['stopped_instances'][1]:
+                    self.save_stopped_instances_report(df, self.filter_stopped_instances(df)[1], report_name)
+                else:
+                    self.save_to_files(df, report_name)
+        with self.metrics.stage('save:summaries'):
+            self._save_summaries(audit_results)
 
+    def _save_summaries(self, audit_results: Dict[str, pd.DataFrame]):
         try:
-            self.logger.info("Getting Elastic IP information...")
-            audit_results['unused_elastic_ips'] = self.get_unused_elastic_ips()
-            self.save_to_files(audit_results['unused_elastic_ips'], 'unused_elastic_ips')
+            self.save_savings_summary(audit_results)
+            self.logger.info("Saved savings summaries")
         except Exception as e:
-            self.logger.error(f"Error getting Elastic IP information: {e}")
-            audit_results['unused_elastic_ips'] = pd.DataFrame()
+            self.logger.error(f"Error saving savings summaries: {e}")
+
+    # Report name -> (waste category, resource ID column, monthly cost column) recorded by incremental audits
+    WASTE_COLUMNS = {
+        'all_stopped_instances': ('stopped_instance', 'InstanceId', 'MonthlyCost'),
+        'duplicate_snapshots': ('duplicate_snapshot', 'SnapshotId', 'PotentialMonthlySavings'),
+        'top_gp2_instances': ('gp2_storage', 'InstanceId', 'MonthlySavings'),
+        'unused_elastic_ips': ('unused_elastic_ip', 'PublicIp', 'MonthlyCost'),
+        'idle_instances': ('idle_instance', 'InstanceId', 'MonthlyCost'),
+        'idle_volumes': ('idle_volume', 'VolumeId', 'MonthlyCost'),
+    }
+    # Reports that keep only their top rows; a row dropping out of the top isn't resolved waste,
+    # so these are left out of run-to-run deltas
+    CAPPED_REPORTS = ('top_gp2_instances',)
 
+    def _waste_rows(self, audit_results: Dict[str, pd.DataFrame], uncapped_only: bool = False) -> List[tuple]:
+        rows = []
+        for report_name, (category, id_column, cost_column) in self.WASTE_COLUMNS.items():
+            if uncapped_only and report_name in self.CAPPED_REPORTS:
+                continue
+            df = audit_results.get(report_name)
+            if df is None or df.empty:
+                continue
+            # The newest snapshot of each volume is kept, so it carries no savings
+            df = df[df[cost_column] > 0]
+            rows.extend(zip([category] * len(df), df[id_column].astype(str), df[cost_column].astype(float)))
+        return rows
+
+    def save_delta_report(self, audit_results: Dict[str, pd.DataFrame], scope: str):
+        """Record this run's waste in the inventory store and report what changed since the previous run."""
         try:
-            self.save_savings_summary(audit_results)
-            
-            summary = []
-            summary.append("# Stopped Instances Cost Analysis\n")
-            summary.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            
-            if not audit_results['all_stopped_instances'].empty:
-                total_monthly = audit_results['all_stopped_instances']['MonthlyCost'].sum()
-                total_storage = audit_results['all_stopped_instances']['TotalStorageGB'].sum()
-                total_instances = len(audit_results['all_stopped_instances'])
-                
-                summary.append("\n## All Stopped Instances")
-                summary.append(f"- Total Stopped Instances: {total_instances}")
-                summary.append(f"- Total Storage Used: {total_storage:.2f} GB")
-                summary.append(f"- Monthly Cost: ${total_monthly:.2f}")
-                summary.append(f"- Yearly Cost: ${total_monthly * 12:.2f}")
-            
-            if not audit_results['old_stopped_instances'].empty:
-                old_monthly = audit_results['old_stopped_instances']['MonthlyCost'].sum()
-                old_storage = audit_results['old_stopped_instances']['TotalStorageGB'].sum()
-                old_instances = len(audit_results['old_stopped_instances'])
-                
-                summary.append("\n## Old Stopped Instances (90+ days)")
-                summary.append(f"- Total Old Stopped Instances: {old_instances}")
-                summary.append(f"- Total Storage Used: {old_storage:.2f} GB")
-                summary.append(f"- Monthly Cost: ${old_monthly:.2f}")
-                summary.append(f"- Yearly Cost: ${old_monthly * 12:.2f}")
-            
-            with open(f"{self.output_dir}/stopped_instances_summary.md", 'w') as f:
-                f.write('\n'.join(summary))
-                
-            self.logger.info("Saved stopped instances summary")
+            run_id = self.inventory_store.record_run(scope, self._waste_rows(audit_results, uncapped_only=True))
+            delta = self.inventory_store.delta(scope, run_id)
+            columns = ['Category', 'ResourceId', 'MonthlyCost']
+            new_df = pd.DataFrame(delta['new'], columns=columns)
+            resolved_df = pd.DataFrame(delta['resolved'], columns=columns)
+            trend_df = pd.DataFrame(delta['trend'], columns=['RunStarted', 'MonthlyWaste'])
+
+            report = []
+            report.append("# Audit Delta Report\n")
+            report.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            if not delta['has_previous']:
+                report.append("First recorded run, so there is no previous run to compare with yet.\n")
+            report.append(f"- New Waste: {len(new_df)} resources, ${new_df['MonthlyCost'].sum():.2f}/month")
+            report.append(f"- Resolved Waste: {len(resolved_df)} resources, ${resolved_df['MonthlyCost'].sum():.2f}/month")
+
+            report.append("\n## Cost Trend\n")
+            report.append(trend_df.to_markdown(index=False, floatfmt='.2f'))
+
+            for title, name, df in (('New Waste', 'new_waste', new_df), ('Resolved Waste', 'resolved_waste', resolved_df)):
+                if df.empty:
+                    continue
+                by_category = df.groupby('Category')['MonthlyCost'].agg(Resources='count', MonthlyCost='sum').reset_index()
+                report.append(f"\n## {title}\n")
+                report.append(by_category.to_markdown(index=False, floatfmt='.2f'))
+                report.append("")
+                report.append(self._markdown_table(df, self._write_data_files(df, name)))
+
+            with open(f"{self.output_dir}/delta_report.md", 'w') as f:
+                f.write('\n'.join(report))
+
+            self.logger.info("Saved delta report")
         except Exception as e:
-            self.logger.error(f"Error saving stopped instances summary: {e}")
+            self.logger.error(f"Error saving delta report: {e}")
 
-        self.logger.info(f"Audit complete! Files saved in {self.output_dir}/")
-        return audit_results
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Find AWS resources that cost money without being used.")
+    analyzer_names = list(AWSResourceAuditor.ANALYZERS)
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument('--only', nargs='+', choices=analyzer_names, metavar='ANALYZER',
+                           help=f"run only these analyzers ({', '.join(analyzer_names)})")
+    selection.add_argument('--skip', nargs='+', choices=analyzer_names, metavar='ANALYZER',
+                           help="run every analyzer except these")
+    parser.add_argument('--region', help="region to audit (default: the session's region)")
+    parser.add_argument('--regions', nargs='*', metavar='REGION',
+                        help="audit several regions and merge them; with no names, every enabled region")
+    parser.add_argument('--profile', help="AWS named profile to use")
+    parser.add_argument('--output-dir')
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="checkpoint listings and finished analyzers so an interrupted audit can --resume")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted audit in --output-dir (default: the newest aws_audit_* directory)")
+    parser.add_argument('--formats', nargs='+', default=list(DEFAULT_OUTPUT_FORMATS),
+                        choices=list(REPORT_WRITERS) + ['md'])
+    parser.add_argument('--compression')
+    parser.add_argument('--price-index', help="price database built by aws_price_index.py")
+    parser.add_argument('--inventory-store', help="SQLite inventory for incremental audits")
+    parser.add_argument('--no-pricing-cache', action='store_true')
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--shard-listings', action='store_true',
+                        help="list volumes and snapshots as parallel streams split by resource ID")
+    parser.add_argument('--analyzer-timeout', type=float)
+    parser.add_argument('--profile-analyzers', action='store_true', help="write a cProfile dump per analyzer")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    # Warm pandas up while the first API calls are in flight
+    threading.Thread(target=importlib.import_module, args=('pandas',), daemon=True).start()
+
+    output_dir = args.output_dir
+    if args.resume and not output_dir:
+        previous = [path for path in sorted(glob.glob('aws_audit_*/checkpoints')) if os.listdir(path)]
+        if not previous:
+            parser.error("--resume found no interrupted audit; pass --output-dir")
+        output_dir = os.path.dirname(previous[-1])
+    analyzers = args.only
+    if args.skip:
+        analyzers = [name for name in analyzer_names if name not in args.skip]
+    auditor = AWSResourceAuditor(
+        region_name=args.region,
+        output_dir=output_dir,
+        session=boto3.session.Session(profile_name=args.profile) if args.profile else None,
+        pricing_cache=not args.no_pricing_cache,
+        price_index=args.price_index,
+        output_formats=args.formats,
+        compression=args.compression,
+        inventory_store=args.inventory_store,
+        profile_analyzers=args.profile_analyzers,
+        checkpoint=args.checkpoint or None,
+        resume=args.resume,
+        shard_listings=args.shard_listings
+    )
+    if args.regions is not None:
+        auditor.run_multi_region_audit(args.regions or None, max_workers=args.max_workers,
+                                       analyzer_timeout=args.analyzer_timeout, analyzers=analyzers)
+    else:
+        auditor.run_audit(max_workers=args.max_workers, analyzer_timeout=args.analyzer_timeout,
+                          analyzers=analyzers)
 
 
 if __name__ == "__main__":
-    auditor = AWSResourceAuditor()
-    auditor.run_audit()
+    main()
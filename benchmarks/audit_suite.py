@@ -0,0 +1,107 @@
+"""Wall time, API calls and peak RSS of every analyzer and a full audit, replayed offline.
+
+    python benchmarks/audit_suite.py                                  # synthetic 100k instances / 1M snapshots
+    python benchmarks/audit_suite.py --instances 10000 --snapshots 100000
+    python benchmarks/audit_suite.py --fleet fleet.jsonl.gz --json results.json
+
+Each target runs in its own process on a fresh auditor, so peak RSS is per
+target. `Baseline RSS` is the process after loading the recording, before
+the target starts. Synthetic fleets are generated once and cached in the
+system temp directory.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TARGETS = {
+    'get_stopped_instances_cost': lambda auditor: auditor.get_stopped_instances_cost(),
+    'get_oldest_instances': lambda auditor: auditor.get_oldest_instances(200),
+    'get_snapshots_with_duplicates': lambda auditor: auditor.get_snapshots_with_duplicates(),
+    'get_top_gp2_instances': lambda auditor: auditor.get_top_gp2_instances(),
+    'get_unused_elastic_ips': lambda auditor: auditor.get_unused_elastic_ips(),
+    'get_idle_resources': lambda auditor: auditor.get_idle_resources(),
+    'run_audit': lambda auditor: auditor.run_audit(),
+}
+
+
+def _peak_rss_mib() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+
+def _run_target(name: str, fleet_path: str, results):
+    import logging
+    from aws_audit_replay import Replayer
+    from aws_resource_auditor import AWSResourceAuditor
+
+    logging.disable(logging.INFO)
+    # The auditor imports pandas on first use; keep that out of the timed section
+    import pandas  # noqa: F401
+    replayer = Replayer.load(fleet_path)
+    baseline = _peak_rss_mib()
+    with tempfile.TemporaryDirectory() as output_dir:
+        auditor = AWSResourceAuditor(session=replayer.session(), output_dir=output_dir, pricing_cache=False)
+        # Match run_audit, which lists every volume once rather than filtering per instance
+        auditor._reset_inventory()
+        replayer.reset_counts()
+        start = time.perf_counter()
+        TARGETS[name](auditor)
+        elapsed = time.perf_counter() - start
+    results.put({
+        'Target': name, 'Seconds': round(elapsed, 3), 'API Calls': sum(replayer.calls.values()),
+        'Unreplayed Calls': sum(replayer.missing.values()),
+        'Baseline RSS MiB': round(baseline, 1), 'Peak RSS MiB': round(_peak_rss_mib(), 1)
+    })
+
+
+def synthetic_fleet_path(instances: int, snapshots: int) -> str:
+    from aws_audit_replay import save_records, synthetic_fleet
+
+    path = os.path.join(tempfile.gettempdir(), f'aws_audit_fleet_{instances}_{snapshots}.jsonl.gz')
+    if not os.path.exists(path):
+        print(f"Generating synthetic fleet of {instances:,} instances and {snapshots:,} snapshots...")
+        save_records(path + '.tmp', synthetic_fleet(instances, snapshots))
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--fleet', help="recording from aws_audit_replay.py (default: a synthetic fleet)")
+    parser.add_argument('--instances', type=int, default=100000)
+    parser.add_argument('--snapshots', type=int, default=1000000)
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    fleet_path = args.fleet or synthetic_fleet_path(args.instances, args.snapshots)
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    for name in args.targets:
+        results = context.Queue()
+        process = context.Process(target=_run_target, args=(name, fleet_path, results))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"{name} failed with exit code {process.exitcode}")
+            continue
+        rows.append(results.get())
+        print(f"{name}: {rows[-1]['Seconds']}s")
+
+    import pandas as pd
+    print(pd.DataFrame(rows).to_markdown(index=False))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Peak memory and runtime of the duplicate-snapshot engine on synthetic snapshot sets.
+
+    python benchmarks/duplicate_snapshots.py                # 1M and 10M snapshots
+    python benchmarks/duplicate_snapshots.py 1000000 --legacy
+
+`--legacy` also times the previous row-wise implementation for comparison.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_resource_auditor import find_duplicate_snapshots  # noqa: E402
+
+SNAPSHOT_PRICE = 0.05
+
+
+def synthetic_snapshots(count: int, seed: int = 0) -> pd.DataFrame:
+    """Snapshots over count / 5 volumes, so most volumes have several copies."""
+    rng = np.random.default_rng(seed)
+    volume_count = max(count // 5, 1)
+    volume_ids = np.char.add('vol-', np.char.zfill(np.arange(volume_count).astype(str), 17))
+    descriptions = np.array(['Created by CreateImage', 'Daily backup', 'Weekly backup', 'No description'])
+    start_times = pd.Timestamp('2020-01-01', tz=timezone.utc) + pd.to_timedelta(
+        rng.integers(0, 5 * 365 * 24 * 3600, count), unit='s'
+    )
+    return pd.DataFrame({
+        'SnapshotId': [f'snap-{i:017x}' for i in range(count)],
+        'VolumeId': pd.Categorical(volume_ids[rng.integers(0, volume_count, count)]),
+        'StartTime': start_times,
+        'Size': rng.choice([8, 30, 100, 500, 1000], count),
+        'Description': pd.Categorical(descriptions[rng.integers(0, len(descriptions), count)])
+    })
+
+
+def legacy_find_duplicate_snapshots(df: pd.DataFrame, snapshot_price: float) -> pd.DataFrame:
+    volume_counts = df['VolumeId'].value_counts()
+    duplicate_volumes = volume_counts[volume_counts > 1].index
+    duplicates = df[df['VolumeId'].isin(duplicate_volumes)].copy()
+    duplicates['DuplicateCount'] = duplicates['VolumeId'].map(volume_counts)
+    duplicates['StartTime'] = pd.to_datetime(duplicates['StartTime'])
+    duplicates['IsNewest'] = duplicates.groupby('VolumeId')['StartTime'].transform('max') == duplicates['StartTime']
+    duplicates['MonthlyCost'] = duplicates['Size'] * snapshot_price
+    duplicates['PotentialMonthlySavings'] = duplicates.apply(
+        lambda x: x['MonthlyCost'] if not x['IsNewest'] else 0,
+        axis=1
+    )
+    current_time = pd.Timestamp.now(tz=timezone.utc)
+    duplicates['Age_Days'] = (current_time - duplicates['StartTime']).dt.total_seconds() / (24 * 3600)
+    duplicates = duplicates.sort_values(['DuplicateCount', 'VolumeId', 'StartTime'], ascending=[False, True, True])
+    duplicates['StartTime'] = duplicates['StartTime'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    duplicates['Age_Days'] = duplicates['Age_Days'].round(2)
+    return duplicates
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[1000000, 10000000])
+    parser.add_argument('--legacy', action='store_true', help="also run the previous row-wise implementation")
+    args = parser.parse_args()
+
+    print(f"{'snapshots':>12} {'engine':>8} {'seconds':>9} {'peak MiB':>9} {'duplicates':>11}")
+    for size in args.sizes:
+        snapshots = synthetic_snapshots(size)
+        engines = [('vector', find_duplicate_snapshots)]
+        if args.legacy:
+            engines.append(('legacy', legacy_find_duplicate_snapshots))
+        for label, func in engines:
+            result, elapsed, peak = measure(func, snapshots, SNAPSHOT_PRICE)
+            print(f"{size:>12,} {label:>8} {elapsed:>9.2f} {peak / 2 ** 20:>9.1f} {len(result):>11,}")
+            del result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Wall time of an organization audit against the number of worker processes, replayed offline.
+
+    python benchmarks/org_audit.py                                    # 16 accounts, 1/2/4/8 workers
+    python benchmarks/org_audit.py --accounts 64 --workers 4 16 --latency 0.2
+
+Every account replays the same small synthetic fleet, and every call
+sleeps `--latency` seconds to stand in for the API round trip. Worker
+start-up (importing pandas and boto3) is included in the timings.
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit_suite import synthetic_fleet_path  # noqa: E402
+
+_replayers = {}
+
+
+def replay_session(fleet_path: str, latency: float, account_id: str, region: str):
+    """Session factory for the workers; each worker process loads the fleet once."""
+    from aws_audit_replay import Replayer
+
+    if fleet_path not in _replayers:
+        _replayers[fleet_path] = Replayer.load(fleet_path, latency=latency)
+    return _replayers[fleet_path].session(region)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--accounts', type=int, default=16)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--instances', type=int, default=500)
+    parser.add_argument('--snapshots', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.1, help="seconds each API call takes")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    import logging
+    from aws_audit_org import OrgAuditor
+
+    logging.basicConfig(level=logging.WARNING)
+    fleet_path = synthetic_fleet_path(args.instances, args.snapshots)
+    accounts = [f'{account:012d}' for account in range(1, args.accounts + 1)]
+    rows = []
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as output_dir:
+            auditor = OrgAuditor(output_dir, workers=workers, auditor_options={'pricing_cache': False},
+                                 session_factory=functools.partial(replay_session, fleet_path, args.latency))
+            auditor.enqueue(accounts, ['us-east-1'])
+            start = time.perf_counter()
+            auditor.run_workers()
+            elapsed = time.perf_counter() - start
+            done = auditor.queue.counts().get('done', 0)
+        rows.append({'Workers': workers, 'Work Items': done, 'Seconds': round(elapsed, 2),
+                     'Items per Minute': round(done / elapsed * 60, 1)})
+        print(f"{workers} workers: {rows[-1]['Seconds']}s")
+
+    import pandas as pd
+    df = pd.DataFrame(rows)
+    df['Speedup'] = (df['Seconds'].iloc[0] / df['Seconds']).round(1)
+    print(df.to_markdown(index=False))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(df.to_dict('records'), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Wall time of listing volumes and snapshots sequentially and sharded by ID, replayed offline.
+
+    python benchmarks/sharded_listing.py                              # 10k instances / 200k snapshots, 100ms a page
+    python benchmarks/sharded_listing.py --snapshots 1000000 --latency 0.5
+    python benchmarks/sharded_listing.py --fleet fleet.jsonl.gz --json results.json
+
+A replay answers instantly, so every call sleeps `--latency` seconds to
+stand in for the API round trip, which is what bounds a sequential listing.
+Both modes must list the same resources; the benchmark fails otherwise.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit_suite import synthetic_fleet_path  # noqa: E402
+
+# Resource -> (inventory attribute, ID key)
+LISTINGS = {'volumes': ('volumes', 'VolumeId'), 'snapshots': ('snapshots', 'SnapshotId')}
+
+
+def _list(replayer, resource: str, shard_listings: bool):
+    from aws_resource_auditor import ResourceInventory
+
+    attr, id_key = LISTINGS[resource]
+    inventory = ResourceInventory(replayer.session().client('ec2'), shard_listings=shard_listings)
+    replayer.reset_counts()
+    start = time.perf_counter()
+    items = getattr(inventory, attr)
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(replayer.calls.values()), sorted(item[id_key] for item in items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--fleet', help="synthetic recording from aws_audit_replay.py (default: a synthetic fleet)")
+    parser.add_argument('--instances', type=int, default=10000)
+    parser.add_argument('--snapshots', type=int, default=200000)
+    parser.add_argument('--latency', type=float, default=0.1, help="seconds each API call takes")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    from aws_audit_replay import Replayer
+
+    logging.disable(logging.INFO)
+    replayer = Replayer.load(args.fleet or synthetic_fleet_path(args.instances, args.snapshots))
+    rows = []
+    for resource in LISTINGS:
+        # Index the fleet for ID filters once, outside the timed runs
+        _list(replayer, resource, shard_listings=True)
+        replayer.latency = args.latency
+        sequential, sequential_calls, sequential_ids = _list(replayer, resource, shard_listings=False)
+        sharded, sharded_calls, sharded_ids = _list(replayer, resource, shard_listings=True)
+        replayer.latency = 0.0
+        if sharded_ids != sequential_ids:
+            sys.exit(f"Sharded {resource} listing differs from the sequential one")
+        rows.append({
+            'Listing': resource, 'Items': len(sequential_ids),
+            'Sequential Seconds': round(sequential, 3), 'Sequential Calls': sequential_calls,
+            'Sharded Seconds': round(sharded, 3), 'Sharded Calls': sharded_calls,
+            'Speedup': round(sequential / sharded, 1)
+        })
+        print(f"{resource}: {rows[-1]['Speedup']}x")
+
+    import pandas as pd
+    print(pd.DataFrame(rows).to_markdown(index=False))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
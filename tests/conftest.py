@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Never let a test reach a real account; moto and replayed sessions accept any credentials
+os.environ.update(AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing', AWS_DEFAULT_REGION='us-east-1')
+for name in ('AWS_PROFILE', 'AWS_SESSION_TOKEN', 'AWS_SECURITY_TOKEN'):
+    os.environ.pop(name, None)
+
+# Age columns depend on when a report is built, so report comparisons leave them out
+AGE_COLUMNS = ('Age_Days', 'StoppedDays')
+
+
+def without_ages(df):
+    return df.drop(columns=[column for column in AGE_COLUMNS if column in df.columns]).reset_index(drop=True)
+
+
+@pytest.fixture(scope='session')
+def recorded_fleet(tmp_path_factory):
+    """A small fleet audited live under moto with its API responses recorded: (recording path, live results)."""
+    moto = pytest.importorskip('moto')
+    import boto3
+    from aws_audit_replay import Recorder
+    from aws_resource_auditor import AWSResourceAuditor
+
+    directory = tmp_path_factory.mktemp('recorded')
+    with moto.mock_aws():
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        image_id = ec2.describe_images()['Images'][0]['ImageId']
+        instance_ids = [instance['InstanceId'] for instance in ec2.run_instances(
+            ImageId=image_id, MinCount=4, MaxCount=4, InstanceType='t3.micro',
+            TagSpecifications=[{'ResourceType': 'instance', 'Tags': [{'Key': 'Name', 'Value': 'web'}]}]
+        )['Instances']]
+        ec2.stop_instances(InstanceIds=instance_ids[:2])
+        volume_id = ec2.create_volume(AvailabilityZone='us-east-1a', Size=100, VolumeType='gp2')['VolumeId']
+        ec2.attach_volume(VolumeId=volume_id, InstanceId=instance_ids[0], Device='/dev/sdf')
+        for _ in range(3):
+            ec2.create_snapshot(VolumeId=volume_id)
+        ec2.allocate_address(Domain='vpc')
+
+        recorder = Recorder()
+        session = recorder.attach(boto3.session.Session(region_name='us-east-1'))
+        live = AWSResourceAuditor(session=session, output_dir=str(directory / 'live'),
+                                  pricing_cache=False).run_audit(max_workers=1)
+        path = str(directory / 'fleet.jsonl.gz')
+        recorder.save(path)
+    return path, live, instance_ids
@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+
+import pytest
+
+from aws_audit_service import AuditService, QueueEventSource, SqsEventSource
+from aws_resource_auditor import AWSResourceAuditor
+
+
+class FlakyEventSource(QueueEventSource):
+    """A queue whose first poll fails, as a dropped connection to SQS would."""
+
+    def __init__(self):
+        super().__init__()
+        self.failures = 0
+
+    def poll(self, timeout):
+        if not self.failures:
+            self.failures += 1
+            raise ConnectionError('connection reset')
+        return super().poll(timeout)
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def report_rows(service, name):
+    status, body, _ = service.handle('GET', f'/reports/{name}')
+    assert status == 200
+    return json.loads(body)['records']
+
+
+def stop_event(instance_id):
+    return {
+        'detail-type': 'EC2 Instance State-change Notification', 'region': 'us-east-1',
+        'resources': [f'arn:aws:ec2:us-east-1:123456789012:instance/{instance_id}'],
+        'detail': {'instance-id': instance_id, 'state': 'stopped'},
+    }
+
+
+def test_service_applies_events_and_serves_reports(tmp_path):
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    with moto.mock_aws():
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        image_id = ec2.describe_images()['Images'][0]['ImageId']
+        instance_ids = [instance['InstanceId'] for instance in ec2.run_instances(
+            ImageId=image_id, MinCount=2, MaxCount=2, InstanceType='t3.micro'
+        )['Instances']]
+        auditor = AWSResourceAuditor(session=boto3.session.Session(region_name='us-east-1'),
+                                     output_dir=str(tmp_path), pricing_cache=False)
+        service = AuditService(auditor, analyzers=['stopped_instances'], max_workers=1, poll_seconds=0.05,
+                               refresh_seconds=0)
+        source = FlakyEventSource()
+        thread = threading.Thread(target=service.run, args=(source,), daemon=True)
+        thread.start()
+        try:
+            wait_for(lambda: service.refreshed_at)
+            assert report_rows(service, 'all_stopped_instances') == []
+
+            ec2.stop_instances(InstanceIds=instance_ids[:1])
+            source.put(stop_event(instance_ids[0]))
+            wait_for(lambda: report_rows(service, 'all_stopped_instances'))
+        finally:
+            service.stop()
+            thread.join(10)
+
+    # The failed poll was retried rather than ending the service
+    assert source.failures == 1
+    assert not thread.is_alive()
+    assert [row['InstanceId'] for row in report_rows(service, 'all_stopped_instances')] == instance_ids[:1]
+    status, body, _ = service.handle('GET', '/health')
+    assert status == 200 and json.loads(body)['events_applied'] == 1
+    status, body, _ = service.handle('GET', '/summary')
+    assert status == 200 and 'refreshed_at' in json.loads(body)
+
+
+def test_failed_sqs_batch_is_delivered_again(tmp_path):
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    with moto.mock_aws():
+        session = boto3.session.Session(region_name='us-east-1')
+        ec2 = session.client('ec2')
+        image_id = ec2.describe_images()['Images'][0]['ImageId']
+        instance_id = ec2.run_instances(ImageId=image_id, MinCount=1, MaxCount=1,
+                                        InstanceType='t3.micro')['Instances'][0]['InstanceId']
+        sqs = session.client('sqs')
+        queue_url = sqs.create_queue(QueueName='ec2-changes', Attributes={'VisibilityTimeout': '1'})['QueueUrl']
+        service = AuditService(AWSResourceAuditor(session=session, output_dir=str(tmp_path), pricing_cache=False),
+                               analyzers=['stopped_instances'], max_workers=1, poll_seconds=0.05,
+                               refresh_seconds=0)
+        applied = []
+        apply_events = service.apply_events
+
+        def fail_once(events):
+            applied.append([event['detail']['instance-id'] for event in events])
+            if len(applied) == 1:
+                raise RuntimeError('describe failed')
+            return apply_events(events)
+        service.apply_events = fail_once
+
+        ec2.stop_instances(InstanceIds=[instance_id])
+        sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(stop_event(instance_id)))
+        thread = threading.Thread(target=service.run, args=(SqsEventSource(queue_url, session),), daemon=True)
+        thread.start()
+        try:
+            wait_for(lambda: service.events_applied)
+            wait_for(lambda: report_rows(service, 'all_stopped_instances'))
+        finally:
+            service.stop()
+            thread.join(30)
+        left = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['All'])['Attributes']
+
+    # The failed batch was redelivered and applied, and only then deleted
+    assert applied == [[instance_id], [instance_id]]
+    assert left['ApproximateNumberOfMessages'] == '0' and left['ApproximateNumberOfMessagesNotVisible'] == '0'
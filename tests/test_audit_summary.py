@@ -0,0 +1,71 @@
+import json
+
+import pandas as pd
+import pytest
+
+from aws_resource_auditor import AuditSummary, ReportSummary
+
+NAN = float('nan')
+
+
+@pytest.fixture
+def summary():
+    stopped = pd.DataFrame({'InstanceId': ['i-1', 'i-2'], 'MonthlyCost': [3.0, 1.0], 'TotalStorageGB': [30, 10],
+                            'Age_Days': [100.0, 20.0], 'StoppedDays': [95.0, 5.0]})
+    return AuditSummary.from_results({
+        'all_stopped_instances': stopped,
+        'old_stopped_instances': stopped.head(1),
+        'oldest_instances': pd.DataFrame({'InstanceId': ['i-1', 'i-2', 'i-3', 'i-4']}),
+        'duplicate_snapshots': pd.DataFrame({'IsNewest': [False, False, True], 'Size': [10, 10, 10],
+                                             'PotentialMonthlySavings': [0.5, 0.5, 0.0]}),
+        'top_gp2_instances': pd.DataFrame({'MonthlySavings': [2.0], 'TotalGP2Storage': [100]}),
+        'unused_elastic_ips': pd.DataFrame({'MonthlyCost': [3.65]}),
+        'idle_instances': pd.DataFrame({'MonthlyCost': [7.592, NAN]}),
+        'idle_volumes': pd.DataFrame(),
+    }, pricing_fallbacks=['gp2 (us-east-1, default)'])
+
+
+def test_report_totals(summary):
+    assert summary.report('all_stopped_instances') == ReportSummary(
+        rows=2, actionable=2, monthly_savings=4.0, storage_gb=40, avg_age_days=60.0, avg_stopped_days=50.0
+    )
+    # The newest copy of a duplicated snapshot is kept, so neither it nor its storage is actionable
+    duplicates = summary.report('duplicate_snapshots')
+    assert (duplicates.rows, duplicates.actionable, duplicates.storage_gb, duplicates.monthly_savings) == (3, 2, 20, 1.0)
+    idle = summary.report('idle_instances')
+    assert (idle.rows, idle.unpriced, idle.monthly_savings) == (2, 1, 7.592)
+    assert summary.report('idle_volumes') == ReportSummary()
+    assert summary.report('not_run') == ReportSummary()
+
+
+def test_savings_and_recommendations(summary):
+    # Old stopped instances are already among all stopped instances, so they aren't added again
+    assert summary.monthly_savings == pytest.approx(4.0 + 1.0 + 2.0 + 3.65 + 7.592)
+    assert summary.yearly_savings == pytest.approx(summary.monthly_savings * 12)
+    assert [(r.title, r.monthly_savings) for r in summary.recommendations()] == [
+        ("Stop or downsize idle resources", 7.592),
+        ("Release unused Elastic IPs", 3.65),
+        ("Delete old stopped instances (90+ days inactive)", 3.0),
+        ("Convert GP2 volumes to GP3", 2.0),
+        ("Remove duplicate snapshots", 1.0),
+    ]
+    assert summary.recommendations()[-1].action == "Delete 2 duplicate snapshots while keeping the newest copy"
+
+
+def test_renderings_share_the_same_figures(summary, tmp_path):
+    summary.save(str(tmp_path))
+    data = json.loads((tmp_path / 'savings_summary.json').read_text())
+    assert data == json.loads(json.dumps(summary.to_dict()))
+    assert data['monthly_savings'] == 18.24 and data['yearly_savings'] == 218.9
+    assert data['reports']['idle_instances']['unpriced'] == 1
+
+    frame = pd.read_csv(tmp_path / 'savings_summary.csv')
+    assert list(frame['Report']) == list(summary.reports)
+    assert frame.set_index('Report').loc['duplicate_snapshots', 'Actionable'] == 2
+
+    markdown = (tmp_path / 'savings_summary.md').read_text()
+    assert "live pricing was unavailable for gp2 (us-east-1, default)" in markdown
+    assert "- Duplicate Snapshots That Can Be Removed: 2" in markdown
+    assert "- Instances Without a Price: 1" in markdown
+    assert "- Monthly: $18.24" in markdown
+    assert "- Total Old Stopped Instances: 1" in (tmp_path / 'stopped_instances_summary.md').read_text()
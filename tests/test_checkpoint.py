@@ -0,0 +1,67 @@
+import os
+import threading
+
+import pytest
+from conftest import without_ages
+
+from aws_audit_checkpoint import AuditCheckpoint
+from aws_audit_replay import Replayer, synthetic_fleet
+from aws_resource_auditor import AWSResourceAuditor
+
+
+def test_interrupted_audit_resumes_where_it_stopped(tmp_path):
+    replayer = Replayer(synthetic_fleet(instances=1500, snapshots=12000))
+    resumed_dir, full_dir = str(tmp_path / 'resumed'), str(tmp_path / 'full')
+
+    def interrupt(**kwargs):
+        interrupt.pages += 1
+        if interrupt.pages == 8:
+            raise KeyboardInterrupt
+    interrupt.pages = 0
+    session = replayer.session()
+    session.events.register_first('before-call.ec2.DescribeSnapshots', interrupt)
+    checkpoint = AuditCheckpoint(os.path.join(resumed_dir, 'checkpoints'), save_every_pages=2)
+    with pytest.raises(KeyboardInterrupt):
+        AWSResourceAuditor(session=session, output_dir=resumed_dir, pricing_cache=False,
+                           checkpoint=checkpoint).run_audit(max_workers=1)
+    assert os.listdir(os.path.join(resumed_dir, 'checkpoints'))
+
+    replayer.reset_counts()
+    resumed = AWSResourceAuditor(session=replayer.session(), output_dir=resumed_dir, pricing_cache=False,
+                                 resume=True).run_audit(max_workers=1)
+    resumed_calls = dict(replayer.calls)
+    replayer.reset_counts()
+    full = AWSResourceAuditor(session=replayer.session(), output_dir=full_dir,
+                              pricing_cache=False).run_audit(max_workers=1)
+
+    # Snapshot pages saved before the interrupt are read back rather than listed again
+    assert resumed_calls['DescribeSnapshots'] < replayer.calls['DescribeSnapshots']
+    assert set(resumed) == set(full)
+    for report_name, df in full.items():
+        assert without_ages(resumed[report_name]).equals(without_ages(df)), report_name
+    # A completed audit removes its checkpoints
+    assert not os.listdir(os.path.join(resumed_dir, 'checkpoints'))
+
+
+def test_timed_out_analyzer_keeps_the_checkpoint_until_it_finishes(tmp_path):
+    replayer = Replayer(synthetic_fleet(instances=10, snapshots=20))
+    release = threading.Event()
+
+    def stall(**kwargs):
+        release.wait(30)
+    session = replayer.session()
+    session.events.register_first('before-call.ec2.DescribeSnapshots', stall)
+    checkpoint = AuditCheckpoint(str(tmp_path / 'checkpoints'))
+    checkpoint.save_results('earlier', {})
+    auditor = AWSResourceAuditor(session=session, output_dir=str(tmp_path), pricing_cache=False,
+                                 checkpoint=checkpoint)
+    try:
+        results = auditor.run_audit(analyzer_timeout=0.5, analyzers=['duplicate_snapshots', 'unused_elastic_ips'])
+        assert results['duplicate_snapshots'].empty
+        # The snapshot analyzer is still paging through the checkpoint, so it isn't cleared under it
+        assert os.listdir(tmp_path / 'checkpoints')
+    finally:
+        release.set()
+    auditor._stragglers[0].result(timeout=30)
+    auditor._clear_checkpoint()
+    assert not os.listdir(tmp_path / 'checkpoints')
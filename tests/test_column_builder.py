@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+from operator import itemgetter
+
+import pytest
+
+import aws_resource_auditor
+from aws_resource_auditor import ColumnBuilder, _field
+
+UTC = timezone.utc
+KINDS = {'Id': 'object', 'Type': 'category', 'Size': 'int', 'Price': 'float', 'Launched': 'datetime'}
+ITEMS = [
+    {'Id': 'i-1', 'Type': 't3.micro', 'Size': 8, 'Price': 0.0104, 'Launched': datetime(2024, 1, 1, tzinfo=UTC)},
+    {'Id': 'i-2', 'Type': 'm5.large', 'Size': 100, 'Launched': datetime(2024, 2, 1, tzinfo=UTC)},
+    {'Id': 'i-3', 'Type': 't3.micro', 'Size': 30, 'Price': 0.0104, 'Launched': datetime(2024, 3, 1, tzinfo=UTC)},
+]
+GETTERS = (itemgetter('Id'), itemgetter('Type'), itemgetter('Size'), _field('Price', float('nan')),
+           itemgetter('Launched'))
+
+
+def test_extend_and_append_build_typed_columns(monkeypatch):
+    # Chunks smaller than the items, so extend() fills the columns over several passes
+    monkeypatch.setattr(aws_resource_auditor, 'COLUMN_CHUNK_ROWS', 2)
+    rows = ColumnBuilder(KINDS)
+    rows.extend(ITEMS, *GETTERS)
+    rows.append('i-4', 'm5.large', 16, 0.096, datetime(2024, 4, 1, tzinfo=UTC))
+    assert len(rows) == 4
+
+    df = rows.build()
+    assert list(df.columns) == list(KINDS)
+    assert list(df['Id']) == ['i-1', 'i-2', 'i-3', 'i-4']
+    assert list(df['Type'].cat.categories) == ['m5.large', 't3.micro']
+    assert list(df['Type']) == ['t3.micro', 'm5.large', 't3.micro', 'm5.large']
+    assert str(df['Size'].dtype) == 'int64' and list(df['Size']) == [8, 100, 30, 16]
+    assert str(df['Price'].dtype) == 'float64' and df['Price'].isna().tolist() == [False, True, False, False]
+    assert str(df['Launched'].dt.tz) == 'UTC' and df['Launched'].iloc[3].month == 4
+
+
+def test_extend_needs_a_getter_per_column():
+    rows = ColumnBuilder(KINDS)
+    with pytest.raises(ValueError, match='Expected 5 getters, got 4'):
+        rows.extend(ITEMS, *GETTERS[:4])
+    assert len(rows) == 0
+
+
+def test_unknown_column_kind():
+    with pytest.raises(ValueError, match='Unknown column kinds: decimal'):
+        ColumnBuilder({'Id': 'object', 'Cost': 'decimal'})
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from aws_resource_auditor import DEFAULT_PRICES, CostModel
+
+NAN = float('nan')
+PRICES = {
+    'us-east-1': {'gp2': 0.10, 'gp3': 0.08, 'gp3_iops': 0.005, 'gp3_throughput': 0.04, 'io1': 0.125,
+                  'io1_iops': 0.065, 'snapshot': 0.05, 'eip': 0.005},
+    # Only gp3 storage and Elastic IPs priced; everything else falls back to DEFAULT_PRICES
+    'eu-west-1': {'gp3': 0.088, 'eip': 0.006},
+}
+
+
+def test_volume_costs_add_iops_and_throughput_beyond_the_included_baseline():
+    costs = CostModel(PRICES).volume_costs(
+        ['gp3', 'gp3', 'io1', 'gp2', 'magnetic-tape'], [100, 100, 50, 10, 10],
+        iops=[3000, 6000, 1000, NAN, NAN], throughput=[125, 250, NAN, NAN, NAN]
+    )
+    np.testing.assert_allclose(costs, [
+        8.0,                            # 100 GB, baseline IOPS and throughput
+        8.0 + 3000 * 0.005 + 125 * 0.04,
+        6.25 + 1000 * 0.065,            # io1 has no included IOPS
+        1.0,
+        1.0,                            # unknown types cost the gp2 rate per GB
+    ])
+
+
+def test_volume_costs_per_region():
+    regions = ['us-east-1', 'eu-west-1', 'eu-west-1']
+    costs = CostModel(PRICES).volume_costs(['gp3', 'gp3', 'io1'], [100, 100, 10], regions=regions)
+    np.testing.assert_allclose(costs, [8.0, 8.8, 10 * DEFAULT_PRICES['io1']])
+    with pytest.raises(ValueError, match='ap-south-1'):
+        CostModel(PRICES).volume_costs(['gp3'], [1], regions=['ap-south-1'])
+
+
+def test_conversion_savings_keep_provisioned_performance():
+    savings = CostModel(PRICES).conversion_savings('gp2', 'gp3', [100, 100], iops=[3000, 6000])
+    np.testing.assert_allclose(savings, [10.0 - 8.0, 10.0 - (8.0 + 3000 * 0.005)])
+
+
+def test_eip_instance_snapshot_and_yearly_costs():
+    model = CostModel(PRICES)
+    # 730 hours a month
+    np.testing.assert_allclose(model.eip_costs(2), [3.65, 3.65])
+    np.testing.assert_allclose(model.eip_costs(2, regions=['us-east-1', 'eu-west-1']), [3.65, 4.38])
+    np.testing.assert_allclose(CostModel.instance_costs([0.0104, NAN]), [7.592, NAN])
+    np.testing.assert_allclose(model.snapshot_costs([100, 20]), [5.0, 1.0])
+    assert CostModel.yearly(2.5) == 30.0
+    assert model.volume_costs([], []).size == 0
+
+
+def test_needs_prices():
+    with pytest.raises(ValueError):
+        CostModel({})
@@ -0,0 +1,49 @@
+import pandas as pd
+
+from aws_resource_auditor import find_duplicate_snapshots
+
+NOW = pd.Timestamp('2024-03-01', tz='UTC')
+
+
+def snapshots(*rows):
+    return pd.DataFrame(rows, columns=['SnapshotId', 'VolumeId', 'StartTime', 'Size', 'Description'])
+
+
+def test_groups_by_volume_and_costs_all_but_the_newest():
+    df = find_duplicate_snapshots(snapshots(
+        ('snap-b2', 'vol-b', '2024-02-01T00:00:00Z', 20, 'b'),
+        ('snap-a1', 'vol-a', '2024-01-01T00:00:00Z', 10, 'a'),
+        ('snap-single', 'vol-c', '2024-01-01T00:00:00Z', 99, 'only one'),
+        ('snap-b1', 'vol-b', '2024-01-01T00:00:00Z', 20, 'b'),
+        ('snap-a3', 'vol-a', '2024-02-15T00:00:00Z', 10, 'a'),
+        ('snap-a2', 'vol-a', '2024-01-15T00:00:00Z', 10, 'a'),
+    ), snapshot_price=0.05, now=NOW)
+
+    # Volumes with the most copies first, then each volume's copies oldest first
+    assert list(df['SnapshotId']) == ['snap-a1', 'snap-a2', 'snap-a3', 'snap-b1', 'snap-b2']
+    assert list(df['VolumeId']) == ['vol-a'] * 3 + ['vol-b'] * 2
+    assert list(df['DuplicateCount']) == [3, 3, 3, 2, 2]
+    assert list(df['IsNewest']) == [False, False, True, False, True]
+    assert list(df['MonthlyCost']) == [0.5, 0.5, 0.5, 1.0, 1.0]
+    assert list(df['PotentialMonthlySavings']) == [0.5, 0.5, 0.0, 1.0, 0.0]
+    assert list(df['Age_Days']) == [60.0, 46.0, 15.0, 60.0, 29.0]
+    assert str(df['StartTime'].iloc[0]) == '2024-01-01 00:00:00'
+
+
+def test_copies_sharing_the_newest_start_time_are_all_kept():
+    df = find_duplicate_snapshots(snapshots(
+        ('snap-1', 'vol-a', '2024-01-01T00:00:00Z', 10, ''),
+        ('snap-2', 'vol-a', '2024-02-01T00:00:00Z', 10, ''),
+        ('snap-3', 'vol-a', '2024-02-01T00:00:00Z', 10, ''),
+    ), snapshot_price=0.05, now=NOW)
+
+    assert dict(zip(df['SnapshotId'], df['IsNewest'])) == {'snap-1': False, 'snap-2': True, 'snap-3': True}
+    assert df['PotentialMonthlySavings'].sum() == 0.5
+
+
+def test_no_duplicates():
+    assert find_duplicate_snapshots(snapshots(), 0.05).empty
+    assert find_duplicate_snapshots(snapshots(
+        ('snap-1', 'vol-a', '2024-01-01T00:00:00Z', 10, ''),
+        ('snap-2', 'vol-b', '2024-01-01T00:00:00Z', 10, ''),
+    ), 0.05).empty
@@ -0,0 +1,29 @@
+import pytest
+
+from aws_inventory_store import InventoryStore
+from aws_resource_auditor import AWSResourceAuditor
+
+
+def test_incremental_audit_drops_deleted_snapshots(tmp_path):
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    with moto.mock_aws():
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        volume_id = ec2.create_volume(AvailabilityZone='us-east-1a', Size=10, VolumeType='gp2')['VolumeId']
+        snapshot_ids = [ec2.create_snapshot(VolumeId=volume_id)['SnapshotId'] for _ in range(3)]
+        store_path = str(tmp_path / 'inventory.db')
+
+        def duplicates(run):
+            auditor = AWSResourceAuditor(session=boto3.session.Session(region_name='us-east-1'),
+                                         output_dir=str(tmp_path / run), pricing_cache=False,
+                                         inventory_store=store_path)
+            return auditor.run_audit(max_workers=1, analyzers=['duplicate_snapshots'])['duplicate_snapshots']
+
+        assert sorted(duplicates('full')['SnapshotId']) == sorted(snapshot_ids)
+        ec2.delete_snapshot(SnapshotId=snapshot_ids[0])
+        # The second run lists only recent snapshots and reads the rest from the store
+        assert sorted(duplicates('incremental')['SnapshotId']) == sorted(snapshot_ids[1:])
+
+    stored = {snapshot['SnapshotId'] for snapshot in InventoryStore(store_path).load_snapshots('us-east-1')}
+    assert snapshot_ids[0] not in stored and set(snapshot_ids[1:]) <= stored
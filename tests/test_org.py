@@ -0,0 +1,42 @@
+import functools
+import os
+
+import pandas as pd
+
+from aws_audit_org import OrgAuditor
+from aws_audit_replay import save_records, synthetic_fleet
+
+ACCOUNTS = ['111111111111', '222222222222', '333333333333']
+
+_replayers = {}
+
+
+def replay_session(fleet_path, account_id, region):
+    """Session factory for the spawned workers, which import it from this module; each loads the fleet once."""
+    from aws_audit_replay import Replayer
+
+    if fleet_path not in _replayers:
+        _replayers[fleet_path] = Replayer.load(fleet_path)
+    return _replayers[fleet_path].session(region)
+
+
+def test_org_audit_merges_every_account(tmp_path):
+    fleet_path = str(tmp_path / 'fleet.jsonl.gz')
+    save_records(fleet_path, synthetic_fleet(instances=60, snapshots=300))
+    output_dir = str(tmp_path / 'org')
+
+    auditor = OrgAuditor(output_dir, workers=2, auditor_options={'pricing_cache': False},
+                         session_factory=functools.partial(replay_session, fleet_path))
+    results = auditor.run(ACCOUNTS, ['us-east-1'], max_workers=1)
+
+    assert auditor.queue.counts() == {'done': len(ACCOUNTS)}
+    stopped = results['all_stopped_instances']
+    assert list(stopped.columns[:2]) == ['Account', 'Region']
+    # Every account replays the same fleet, so each contributes the same rows
+    assert sorted(stopped['Account'].unique()) == ACCOUNTS
+    assert len(stopped) % len(ACCOUNTS) == 0 and not stopped.empty
+    savings = pd.read_csv(os.path.join(output_dir, 'account_savings.csv'), dtype={'Account': str})
+    assert sorted(savings['Account']) == ACCOUNTS
+    assert savings['MonthlySavings'].nunique() == 1
+    for account_id in ACCOUNTS:
+        assert os.path.isdir(os.path.join(output_dir, 'accounts', account_id))
@@ -0,0 +1,95 @@
+import io
+import json
+
+import pytest
+
+import aws_price_index
+from aws_price_index import PriceIndex, _JSONStream
+
+REGION = {'locationType': 'AWS Region', 'regionCode': 'us-east-1'}
+INSTANCE = dict(REGION, instanceType='m5.large', operatingSystem='Linux', tenancy='Shared', preInstalledSw='NA',
+                capacitystatus='Used')
+
+
+def on_demand(sku, *dimensions):
+    """OnDemand terms of one SKU, a price dimension per (USD, unit, beginRange)."""
+    return {f'{sku}.JRTCKXETXF': {'sku': sku, 'priceDimensions': {
+        f'{sku}.{n}': {'unit': unit, 'pricePerUnit': {'USD': usd}, 'beginRange': begin}
+        for n, (usd, unit, begin) in enumerate(dimensions)
+    }}}
+
+
+OFFER = {
+    'formatVersion': 'v1.0',
+    # Skipped numbers, which tiny read chunks cut at every possible offset
+    'schemaVersion': 1234567890,
+    'scale': [1.25e3, -0.5, {}],
+    'products': {
+        'IO1': {'productFamily': 'Storage', 'attributes': dict(REGION, volumeApiName='io1')},
+        'IO1-IOPS': {'productFamily': 'System Operation',
+                     'attributes': dict(REGION, volumeApiName='io1', group='EBS IOPS')},
+        'GP3-TPUT': {'productFamily': 'Provisioned Throughput', 'attributes': dict(REGION, volumeApiName='gp3')},
+        'SNAP': {'productFamily': 'Storage Snapshot', 'attributes': dict(REGION, usagetype='EBS:SnapshotUsage')},
+        'EIP': {'productFamily': 'IP Address', 'attributes': dict(REGION, usagetype='USE1-ElasticIP:IdleAddress')},
+        'M5': {'productFamily': 'Compute Instance', 'attributes': INSTANCE},
+        'M5-RESERVED': {'productFamily': 'Compute Instance', 'attributes': dict(INSTANCE, capacitystatus='Reserved')},
+        'LZ-IO1': {'productFamily': 'Storage',
+                   'attributes': dict(REGION, locationType='AWS Local Zone', volumeApiName='io1')},
+        'LZ-M5': {'productFamily': 'Compute Instance', 'attributes': dict(INSTANCE, locationType='AWS Local Zone')},
+        'TRANSFER': {'productFamily': 'Data Transfer', 'attributes': REGION},
+        'EMPTY': {},
+    },
+    'terms': {
+        # Cheaper than every on-demand price, so any of them leaking in would show in the lookups
+        'Reserved': {'M5': {'M5.RI': {'priceDimensions': {'M5.RI.0': {
+            'unit': 'Hrs', 'pricePerUnit': {'USD': '0.0001'}, 'beginRange': '0', 'nested': {'deeper': [{}, []]}
+        }}, 'termAttributes': {}}}, 'IO1': {}},
+        'OnDemand': {
+            'IO1': on_demand('IO1', ('0.125', 'GB-Mo', '0'), ('0.1', 'GB-Mo', '1000')),
+            'IO1-IOPS': on_demand('IO1-IOPS', ('0.065', 'IOPS-Mo', '0')),
+            'GP3-TPUT': on_demand('GP3-TPUT', ('40.96', 'GiBps-mo', '0')),
+            'SNAP': on_demand('SNAP', ('0.05', 'GB-Mo', '0')),
+            'EIP': on_demand('EIP', ('0.0', 'Hrs', '0'), ('0.005', 'Hrs', '1')),
+            'M5': on_demand('M5', ('0.096', 'Hrs', '0')),
+            'M5-RESERVED': on_demand('M5-RESERVED', ('0.001', 'Hrs', '0')),
+            'LZ-IO1': on_demand('LZ-IO1', ('0.01', 'GB-Mo', '0')),
+            'LZ-M5': on_demand('LZ-M5', ('0.001', 'Hrs', '0')),
+            'TRANSFER': on_demand('TRANSFER', ('0.09', 'GB', '0')),
+            'EMPTY': {},
+        },
+    },
+    'attributesList': {},
+}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 1 << 20])
+def test_stream_reads_values_across_chunk_boundaries(monkeypatch, chunk_size):
+    monkeypatch.setattr(aws_price_index, 'READ_CHUNK_SIZE', chunk_size)
+    stream = _JSONStream(io.StringIO('{"n": 12345, "f": 1.5e3, "empty": {}, "s": "x", "last": 7}'))
+    values = {}
+    for key in stream.members():
+        values[key] = stream.value()
+    assert values == {'n': 12345, 'f': 1500.0, 'empty': {}, 's': 'x', 'last': 7}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 1 << 20])
+def test_index_answers_region_prices(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(aws_price_index, 'READ_CHUNK_SIZE', chunk_size)
+    offer_path, db_path = tmp_path / 'offer.json', str(tmp_path / 'prices.db')
+    offer_path.write_text(json.dumps(OFFER, indent=1))
+    PriceIndex(db_path, read_only=False).ingest(str(offer_path))
+
+    index = PriceIndex(db_path)
+    assert index.pricing_data('us-east-1') == {
+        'io1': 0.125, 'io1_iops': 0.065, 'gp3_throughput': 0.04, 'snapshot': 0.05, 'eip': 0.005
+    }
+    assert index.instance_hourly_price('us-east-1', 'm5.large') == 0.096
+    assert index.instance_hourly_price('us-east-1', 'm5.large', 'Windows') is None
+    assert index.pricing_data('eu-west-1') == {}
+    index.close()
+
+
+def test_read_only_index_must_exist(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        PriceIndex(str(tmp_path / 'missing.db'))
+    assert not (tmp_path / 'missing.db').exists()
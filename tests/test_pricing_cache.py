@@ -0,0 +1,70 @@
+import json
+import logging
+import multiprocessing
+import time
+
+from aws_resource_auditor import PricingCache
+
+FILTERS = [{'Type': 'TERM_MATCH', 'Field': 'volumeApiName', 'Value': 'gp3'}]
+
+
+def test_key_ignores_filter_member_order():
+    reordered = [{'Value': 'gp3', 'Field': 'volumeApiName', 'Type': 'TERM_MATCH'}]
+    assert PricingCache.key('us-east-1', FILTERS) == PricingCache.key('us-east-1', reordered)
+    assert PricingCache.key('us-east-1', FILTERS) != PricingCache.key('eu-west-1', FILTERS)
+
+
+def test_entries_go_stale_after_the_ttl(tmp_path):
+    path = tmp_path / 'cache' / 'pricing.json'
+    key = PricingCache.key('us-east-1', FILTERS)
+    PricingCache(str(path), ttl=60).put(key, 0.08)
+
+    # A new cache instance reads the entry back from disk
+    assert PricingCache(str(path), ttl=60).get(key) == {'price': 0.08, 'fresh': True}
+    entries = json.loads(path.read_text())
+    entries[key]['fetched_at'] -= 61
+    path.write_text(json.dumps(entries))
+    assert PricingCache(str(path), ttl=60).get(key) == {'price': 0.08, 'fresh': False}
+    assert PricingCache(str(path), ttl=60).get(PricingCache.key('eu-west-1', FILTERS)) is None
+
+
+def test_writers_merge_with_the_file(tmp_path):
+    path = str(tmp_path / 'pricing.json')
+    first, second = PricingCache(path), PricingCache(path)
+    first.put('a', 1.0)
+    second.put('b', 2.0)
+    assert PricingCache(path).get('a')['price'] == 1.0
+    assert PricingCache(path).get('b')['price'] == 2.0
+
+
+def put_many(path, prefix):
+    cache = PricingCache(path)
+    for i in range(20):
+        cache.put(f'{prefix}{i}', float(i))
+
+
+def test_writers_in_other_processes_merge_with_the_file(tmp_path):
+    path = str(tmp_path / 'pricing.json')
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=put_many, args=(path, prefix)) for prefix in 'abcd']
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(json.loads(open(path).read())) == 80
+
+
+def test_unreadable_cache_is_empty(tmp_path):
+    path = tmp_path / 'pricing.json'
+    path.write_text('{not json')
+    assert PricingCache(str(path)).get('a') is None
+
+
+def test_revalidate_refreshes_in_the_background(tmp_path):
+    cache = PricingCache(str(tmp_path / 'pricing.json'), ttl=0, stale_while_revalidate=True)
+    cache.put('a', 1.0)
+    cache.revalidate('a', lambda: 2.0, logging.getLogger(__name__))
+    deadline = time.monotonic() + 5
+    while cache.get('a')['price'] != 2.0:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
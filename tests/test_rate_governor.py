@@ -0,0 +1,45 @@
+import boto3
+import pytest
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from aws_resource_auditor import RateGovernor
+
+THROTTLED = (b'<Response><Errors><Error><Code>RequestLimitExceeded</Code>'
+             b'<Message>Request limit exceeded.</Message></Error></Errors></Response>')
+EMPTY = (b'<DescribeInstancesResponse xmlns="http://ec2.amazonaws.com/doc/2016-11-15/">'
+         b'<reservationSet/></DescribeInstancesResponse>')
+
+
+class _Raw:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def governed_client(governor, region, status, body):
+    client = boto3.client('ec2', region_name=region, config=Config(retries={'total_max_attempts': 1}))
+    governor.attach(client)
+    client.meta.events.register(
+        'before-send.ec2.DescribeInstances',
+        lambda request, **kwargs: AWSResponse(request.url, status, {}, _Raw(body)))
+    return client
+
+
+def test_throttling_one_region_leaves_the_others_alone():
+    governor = RateGovernor(initial_rate=8)
+    east = governed_client(governor, 'us-east-1', 503, THROTTLED)
+    west = governed_client(governor, 'eu-west-1', 200, EMPTY)
+
+    with pytest.raises(ClientError):
+        east.describe_instances()
+    west.describe_instances()
+
+    rates = governor.rates()
+    assert rates['us-east-1/ec2/DescribeInstances']['rate'] == 4
+    assert rates['us-east-1/ec2/DescribeInstances']['throttles'] == 1
+    assert rates['eu-west-1/ec2/DescribeInstances']['rate'] > 8
+    assert rates['eu-west-1/ec2/DescribeInstances']['throttles'] == 0